@@ -0,0 +1,47 @@
+-- Recommended secondary indexes for Command Center
+-- Generated by Anders query_planner.py
+-- schema.sql sha256: 625206754c374f3e4e7451cd395bd0ebb0fccc87e7b93a9ae4a853dc86a07f1e
+
+USE command_center;
+
+-- Serves: GET /api/projects
+SET @ddl = IF((SELECT COUNT(*) FROM information_schema.STATISTICS
+             WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'projects' AND INDEX_NAME = 'idx_projects_created_at') = 0,
+            'CREATE INDEX idx_projects_created_at ON projects (created_at)', 'DO 0');
+PREPARE ddl FROM @ddl; EXECUTE ddl; DEALLOCATE PREPARE ddl;
+
+-- Serves: GET /api/agents
+SET @ddl = IF((SELECT COUNT(*) FROM information_schema.STATISTICS
+             WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'agents' AND INDEX_NAME = 'idx_agents_created_at') = 0,
+            'CREATE INDEX idx_agents_created_at ON agents (created_at)', 'DO 0');
+PREPARE ddl FROM @ddl; EXECUTE ddl; DEALLOCATE PREPARE ddl;
+
+-- Serves: task scheduler dispatch
+SET @ddl = IF((SELECT COUNT(*) FROM information_schema.STATISTICS
+             WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'tasks' AND INDEX_NAME = 'idx_tasks_status_priority_due_date') = 0,
+            'CREATE INDEX idx_tasks_status_priority_due_date ON tasks (status, priority, due_date)', 'DO 0');
+PREPARE ddl FROM @ddl; EXECUTE ddl; DEALLOCATE PREPARE ddl;
+
+-- Serves: GET /api/tasks
+SET @ddl = IF((SELECT COUNT(*) FROM information_schema.STATISTICS
+             WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'tasks' AND INDEX_NAME = 'idx_tasks_created_at') = 0,
+            'CREATE INDEX idx_tasks_created_at ON tasks (created_at)', 'DO 0');
+PREPARE ddl FROM @ddl; EXECUTE ddl; DEALLOCATE PREPARE ddl;
+
+-- Serves: latest check per site
+SET @ddl = IF((SELECT COUNT(*) FROM information_schema.STATISTICS
+             WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'site_monitoring' AND INDEX_NAME = 'idx_site_monitoring_url_last_check') = 0,
+            'CREATE INDEX idx_site_monitoring_url_last_check ON site_monitoring (url, last_check)', 'DO 0');
+PREPARE ddl FROM @ddl; EXECUTE ddl; DEALLOCATE PREPARE ddl;
+
+-- Serves: GET /api/site_monitoring
+SET @ddl = IF((SELECT COUNT(*) FROM information_schema.STATISTICS
+             WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'site_monitoring' AND INDEX_NAME = 'idx_site_monitoring_created_at') = 0,
+            'CREATE INDEX idx_site_monitoring_created_at ON site_monitoring (created_at)', 'DO 0');
+PREPARE ddl FROM @ddl; EXECUTE ddl; DEALLOCATE PREPARE ddl;
+
+-- Serves: agent activity feed
+SET @ddl = IF((SELECT COUNT(*) FROM information_schema.STATISTICS
+             WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'agent_logs' AND INDEX_NAME = 'idx_agent_logs_agent_id_created_at') = 0,
+            'CREATE INDEX idx_agent_logs_agent_id_created_at ON agent_logs (agent_id, created_at)', 'DO 0');
+PREPARE ddl FROM @ddl; EXECUTE ddl; DEALLOCATE PREPARE ddl;
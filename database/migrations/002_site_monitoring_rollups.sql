@@ -0,0 +1,28 @@
+-- Rollup tables for site_monitoring history (see scripts/monitoring_rollup.py)
+
+USE command_center;
+
+-- Site monitoring rollups (1m/1h/1d buckets, maintained by scripts/monitoring_rollup.py)
+CREATE TABLE IF NOT EXISTS site_monitoring_rollups (
+    id INT PRIMARY KEY AUTO_INCREMENT,
+    site_name VARCHAR(255) NOT NULL,
+    url VARCHAR(500) NOT NULL,
+    bucket_size ENUM('1m', '1h', '1d') NOT NULL,
+    bucket_start DATETIME NOT NULL,
+    checks INT NOT NULL DEFAULT 0,
+    up_checks INT NOT NULL DEFAULT 0,
+    p50_ms INT,
+    p95_ms INT,
+    p99_ms INT,
+    latency_sketch JSON,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    UNIQUE KEY uniq_site_rollup_bucket (url(191), bucket_size, bucket_start),
+    KEY idx_site_rollup_window (bucket_size, bucket_start)
+);
+
+-- Progress markers for incremental jobs (last raw row id each job has processed)
+CREATE TABLE IF NOT EXISTS rollup_watermarks (
+    name VARCHAR(100) PRIMARY KEY,
+    last_id INT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
@@ -0,0 +1,14 @@
+-- Task scheduler bookkeeping (see scripts/task_scheduler.py)
+-- The dispatch index, idx_tasks_status_priority_due_date, is created by 001.
+
+USE command_center;
+
+SET @ddl = IF((SELECT COUNT(*) FROM information_schema.COLUMNS
+             WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'tasks' AND COLUMN_NAME = 'attempts') = 0,
+            'ALTER TABLE tasks ADD COLUMN attempts INT DEFAULT 0 AFTER due_date', 'DO 0');
+PREPARE ddl FROM @ddl; EXECUTE ddl; DEALLOCATE PREPARE ddl;
+
+SET @ddl = IF((SELECT COUNT(*) FROM information_schema.COLUMNS
+             WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'tasks' AND COLUMN_NAME = 'run_after') = 0,
+            'ALTER TABLE tasks ADD COLUMN run_after DATETIME AFTER attempts', 'DO 0');
+PREPARE ddl FROM @ddl; EXECUTE ddl; DEALLOCATE PREPARE ddl;
@@ -0,0 +1,19 @@
+-- Token and cost accounting for code generation (see scripts/token_budget.py)
+
+USE command_center;
+
+-- Token usage and estimated cost per model call (written by scripts/token_budget.py)
+CREATE TABLE IF NOT EXISTS token_usage (
+    id INT PRIMARY KEY AUTO_INCREMENT,
+    agent_id INT NOT NULL,
+    task_id INT,
+    model VARCHAR(100) NOT NULL,
+    prompt_tokens INT NOT NULL DEFAULT 0,
+    completion_tokens INT NOT NULL DEFAULT 0,
+    cost_usd DECIMAL(12,6) NOT NULL DEFAULT 0,
+    estimated BOOLEAN DEFAULT FALSE, -- counted locally because the response had no usage block
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    KEY idx_token_usage_created (created_at),
+    FOREIGN KEY (agent_id) REFERENCES agents(id) ON DELETE CASCADE,
+    FOREIGN KEY (task_id) REFERENCES tasks(id) ON DELETE SET NULL
+);
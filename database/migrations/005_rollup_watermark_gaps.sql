@@ -0,0 +1,8 @@
+-- Ids the rollup watermark skipped because they were not yet committed (see scripts/monitoring_rollup.py)
+
+USE command_center;
+
+SET @ddl = IF((SELECT COUNT(*) FROM information_schema.COLUMNS
+             WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'rollup_watermarks' AND COLUMN_NAME = 'gaps') = 0,
+            'ALTER TABLE rollup_watermarks ADD COLUMN gaps JSON AFTER last_id', 'DO 0');
+PREPARE ddl FROM @ddl; EXECUTE ddl; DEALLOCATE PREPARE ddl;
@@ -0,0 +1,14 @@
+-- Indexes an earlier 001 created for GET routes that are never generated (users, agent_logs).
+-- On agent_logs, the busiest insert target, they only cost writes.
+
+USE command_center;
+
+SET @ddl = IF((SELECT COUNT(*) FROM information_schema.STATISTICS
+             WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'users' AND INDEX_NAME = 'idx_users_created_at') > 0,
+            'DROP INDEX idx_users_created_at ON users', 'DO 0');
+PREPARE ddl FROM @ddl; EXECUTE ddl; DEALLOCATE PREPARE ddl;
+
+SET @ddl = IF((SELECT COUNT(*) FROM information_schema.STATISTICS
+             WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'agent_logs' AND INDEX_NAME = 'idx_agent_logs_created_at') > 0,
+            'DROP INDEX idx_agent_logs_created_at ON agent_logs', 'DO 0');
+PREPARE ddl FROM @ddl; EXECUTE ddl; DEALLOCATE PREPARE ddl;
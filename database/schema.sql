@@ -1,5 +1,8 @@
 -- Command Center Database Schema
 -- MySQL Database for Simon's Command Center
+-- The complete current schema, indexes included: new installs load only this file.
+-- database/migrations/ brings a database created from an older version of it up to date;
+-- every migration checks before it changes anything, so applying one twice is harmless.
 
 CREATE DATABASE IF NOT EXISTS command_center;
 USE command_center;
@@ -25,7 +28,8 @@ CREATE TABLE projects (
     start_date DATE,
     deadline DATE,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    KEY idx_projects_created_at (created_at)
 );
 
 -- Agents table
@@ -40,7 +44,8 @@ CREATE TABLE agents (
     config JSON, -- Agent-specific configuration
     last_seen TIMESTAMP,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    KEY idx_agents_created_at (created_at)
 );
 
 -- Tasks table
@@ -56,9 +61,13 @@ CREATE TABLE tasks (
     estimated_hours DECIMAL(4,1),
     actual_hours DECIMAL(4,1),
     due_date DATETIME,
+    attempts INT DEFAULT 0, -- dispatch attempts by scripts/task_scheduler.py
+    run_after DATETIME, -- retry backoff: not dispatched again before this time (UTC)
     completed_at TIMESTAMP NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    KEY idx_tasks_created_at (created_at),
+    KEY idx_tasks_status_priority_due_date (status, priority, due_date),
     FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE SET NULL,
     FOREIGN KEY (assigned_agent_id) REFERENCES agents(id) ON DELETE SET NULL,
     FOREIGN KEY (assigned_user_id) REFERENCES users(id) ON DELETE SET NULL
@@ -74,6 +83,7 @@ CREATE TABLE agent_logs (
     level ENUM('info', 'warning', 'error', 'success') DEFAULT 'info',
     metadata JSON,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    KEY idx_agent_logs_agent_id_created_at (agent_id, created_at),
     FOREIGN KEY (agent_id) REFERENCES agents(id) ON DELETE CASCADE,
     FOREIGN KEY (task_id) REFERENCES tasks(id) ON DELETE SET NULL
 );
@@ -105,7 +115,51 @@ CREATE TABLE site_monitoring (
     is_up BOOLEAN DEFAULT TRUE,
     last_check TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     error_message TEXT,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    KEY idx_site_monitoring_url_last_check (url, last_check),
+    KEY idx_site_monitoring_created_at (created_at)
+);
+
+-- Site monitoring rollups (1m/1h/1d buckets, maintained by scripts/monitoring_rollup.py)
+CREATE TABLE site_monitoring_rollups (
+    id INT PRIMARY KEY AUTO_INCREMENT,
+    site_name VARCHAR(255) NOT NULL,
+    url VARCHAR(500) NOT NULL,
+    bucket_size ENUM('1m', '1h', '1d') NOT NULL,
+    bucket_start DATETIME NOT NULL,
+    checks INT NOT NULL DEFAULT 0,
+    up_checks INT NOT NULL DEFAULT 0,
+    p50_ms INT,
+    p95_ms INT,
+    p99_ms INT,
+    latency_sketch JSON,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    UNIQUE KEY uniq_site_rollup_bucket (url(191), bucket_size, bucket_start),
+    KEY idx_site_rollup_window (bucket_size, bucket_start)
+);
+
+-- Progress markers for incremental jobs (last raw row id each job has processed)
+CREATE TABLE rollup_watermarks (
+    name VARCHAR(100) PRIMARY KEY,
+    last_id INT NOT NULL DEFAULT 0,
+    gaps JSON, -- {"id": first seen (epoch)} for ids below last_id that were not yet committed
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+-- Token usage and estimated cost per model call (written by scripts/token_budget.py)
+CREATE TABLE token_usage (
+    id INT PRIMARY KEY AUTO_INCREMENT,
+    agent_id INT NOT NULL,
+    task_id INT,
+    model VARCHAR(100) NOT NULL,
+    prompt_tokens INT NOT NULL DEFAULT 0,
+    completion_tokens INT NOT NULL DEFAULT 0,
+    cost_usd DECIMAL(12,6) NOT NULL DEFAULT 0,
+    estimated BOOLEAN DEFAULT FALSE, -- counted locally because the response had no usage block
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    KEY idx_token_usage_created (created_at),
+    FOREIGN KEY (agent_id) REFERENCES agents(id) ON DELETE CASCADE,
+    FOREIGN KEY (task_id) REFERENCES tasks(id) ON DELETE SET NULL
 );
 
 -- Initial data
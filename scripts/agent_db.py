@@ -0,0 +1,494 @@
+#!/usr/bin/env python3
+"""
+Agent Database for Anders
+Pooled data access (SQLite or MySQL) with sync and async APIs for the agent tables
+"""
+
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import unquote, urlparse
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+def database_url():
+    """ANDERS_DATABASE_URL, else the app's DATABASE_* settings, else None (recording disabled)"""
+    url = os.getenv('ANDERS_DATABASE_URL')
+    if url:
+        return url
+    if os.getenv('DATABASE_HOST'):
+        return "mysql://{user}:{password}@{host}/{name}".format(
+            user=os.getenv('DATABASE_USER', 'root'),
+            password=os.getenv('DATABASE_PASSWORD', ''),
+            host=os.getenv('DATABASE_HOST'),
+            name=os.getenv('DATABASE_NAME', 'command_center')
+        )
+    return None
+
+
+def running_loop():
+    # Only the a* methods need asyncio; importing it up front would dominate CLI start-up
+    import asyncio
+    return asyncio.get_running_loop()
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+class SQLiteBackend:
+    placeholder = "?"
+    # Discarding a connection on these is cheap and clears any wedged state
+    connection_errors = (sqlite3.OperationalError, sqlite3.InterfaceError)
+    # Bound parameters per statement (SQLITE_MAX_VARIABLE_NUMBER)
+    max_params = 32766 if sqlite3.sqlite_version_info >= (3, 32) else 999
+
+    def __init__(self, path):
+        self.path = path
+
+    def connect(self):
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(
+            self.path,
+            check_same_thread=False,
+            isolation_level=None,
+            timeout=30,
+            cached_statements=512  # sqlite3 keeps prepared statements per connection
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    def cursor(self, conn, sql):
+        return conn.cursor()
+
+    def begin(self, conn):
+        conn.execute("BEGIN IMMEDIATE")
+
+
+class MySQLBackend:
+    placeholder = "%s"
+    max_params = 65535
+
+    def __init__(self, url):
+        parsed = urlparse(url)
+        self.params = {
+            "host": parsed.hostname or "localhost",
+            "port": parsed.port or 3306,
+            "user": unquote(parsed.username or "root"),
+            "password": unquote(parsed.password or ""),
+            "database": parsed.path.lstrip("/") or "command_center"
+        }
+        try:
+            import mysql.connector as driver
+            self.prepared = True
+        except ImportError:
+            try:
+                import pymysql as driver
+                self.prepared = False
+            except ImportError:
+                raise RuntimeError("MySQL support needs mysql-connector-python or PyMySQL installed")
+        self.driver = driver
+        self.connection_errors = (driver.OperationalError, driver.InterfaceError)
+
+    def connect(self):
+        conn = self.driver.connect(**self.params, autocommit=True)
+        if self.prepared:
+            conn.statements = {}
+        return conn
+
+    def cursor(self, conn, sql):
+        if not self.prepared:
+            return conn.cursor()
+        # Server-side prepared statement, reused for the lifetime of the connection
+        cursor = conn.statements.get(sql)
+        if cursor is None:
+            cursor = conn.cursor(prepared=True)
+            conn.statements[sql] = cursor
+        return cursor
+
+    def begin(self, conn):
+        conn.start_transaction() if self.prepared else conn.begin()
+
+
+class ConnectionPool:
+    def __init__(self, backend, min_size=1, max_size=8, idle_timeout=300.0,
+                 health_check_after=30.0, acquire_timeout=10.0, reap_interval=30.0):
+        self.backend = backend
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.health_check_after = health_check_after
+        self.acquire_timeout = acquire_timeout
+        self.condition = threading.Condition()
+        self.idle = deque()  # (connection, last_used)
+        self.size = 0
+        self.closed = False
+        self.metrics = {"acquired": 0, "created": 0, "discarded": 0, "reaped": 0, "timeouts": 0}
+        self.wait_times = deque(maxlen=10000)
+
+        for _ in range(min_size):
+            self.idle.append((self.create(), time.monotonic()))
+        self.reaper = threading.Thread(target=self.reap_loop, args=(reap_interval,), daemon=True)
+        self.reaper.start()
+
+    def create(self):
+        conn = self.backend.connect()
+        with self.condition:
+            self.size += 1
+            self.metrics["created"] += 1
+        return conn
+
+    def discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self.condition:
+            self.size -= 1
+            self.metrics["discarded"] += 1
+            self.condition.notify()
+
+    def healthy(self, conn):
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+            cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def acquire(self):
+        started = time.monotonic()
+        deadline = started + self.acquire_timeout
+        while True:
+            conn = None
+            create = False
+            with self.condition:
+                while not self.idle and self.size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.metrics["timeouts"] += 1
+                        raise PoolTimeout(f"No connection available within {self.acquire_timeout}s")
+                    self.condition.wait(remaining)
+                if self.idle:
+                    conn, last_used = self.idle.pop()
+                else:
+                    create = True
+                    self.size += 1  # reserve the slot before connecting outside the lock
+
+            if create:
+                try:
+                    conn = self.backend.connect()
+                except Exception:
+                    with self.condition:
+                        self.size -= 1
+                        self.condition.notify()
+                    raise
+                with self.condition:
+                    self.metrics["created"] += 1
+            elif time.monotonic() - last_used > self.health_check_after and not self.healthy(conn):
+                self.discard(conn)
+                continue
+
+            with self.condition:
+                self.metrics["acquired"] += 1
+                self.wait_times.append(time.monotonic() - started)
+            return conn
+
+    def release(self, conn, broken=False):
+        if broken or self.closed:
+            self.discard(conn)
+            return
+        with self.condition:
+            self.idle.append((conn, time.monotonic()))
+            self.condition.notify()
+
+    def reap_loop(self, interval):
+        while not self.closed:
+            time.sleep(interval)
+            self.reap()
+
+    def reap(self):
+        """Close connections idle past idle_timeout, keeping at least min_size open"""
+        now = time.monotonic()
+        expired = []
+        with self.condition:
+            keep = deque()
+            while self.idle:
+                conn, last_used = self.idle.popleft()
+                if now - last_used > self.idle_timeout and self.size - len(expired) > self.min_size:
+                    expired.append(conn)
+                else:
+                    keep.append((conn, last_used))
+            self.idle = keep
+        for conn in expired:
+            self.discard(conn)
+        with self.condition:
+            self.metrics["reaped"] += len(expired)
+        return len(expired)
+
+    def stats(self):
+        with self.condition:
+            waits = list(self.wait_times)
+            return {
+                **self.metrics,
+                "size": self.size,
+                "idle": len(self.idle),
+                "in_use": self.size - len(self.idle),
+                "max_size": self.max_size,
+                "wait_ms_avg": round(sum(waits) / len(waits) * 1000, 3) if waits else 0.0,
+                "wait_ms_p95": round(percentile(waits, 0.95) * 1000, 3),
+                "wait_ms_max": round(max(waits) * 1000, 3) if waits else 0.0
+            }
+
+    def close(self):
+        self.closed = True
+        with self.condition:
+            idle = [conn for conn, _ in self.idle]
+            self.idle.clear()
+        for conn in idle:
+            self.discard(conn)
+
+
+class Transaction:
+    """Statements issued inside AgentDatabase.transaction()"""
+
+    def __init__(self, database, conn):
+        self.database = database
+        self.conn = conn
+
+    def run(self, query, params=(), many=False, fetch=None):
+        return self.database.statement(self.conn, query, params, many, fetch)
+
+    def execute(self, query, params=()):
+        return self.run(query, params)
+
+    def executemany(self, query, rows):
+        return self.run(query, rows, many=True)
+
+    def fetchall(self, query, params=()):
+        return self.run(query, params, fetch="all")
+
+    def fetchone(self, query, params=()):
+        return self.run(query, params, fetch="one")
+
+
+class AgentDatabase:
+    def __init__(self, url=None, min_size=None, max_size=None):
+        self.url = url or database_url()
+        if not self.url:
+            raise RuntimeError("No database configured. Set ANDERS_DATABASE_URL or DATABASE_HOST.")
+        if self.url.startswith("sqlite:///"):
+            self.backend = SQLiteBackend(self.url[len("sqlite:///"):])
+        elif self.url.startswith("mysql://"):
+            self.backend = MySQLBackend(self.url)
+        else:
+            raise RuntimeError(f"Unsupported database URL: {self.url}")
+        self.dialect = "sqlite" if isinstance(self.backend, SQLiteBackend) else "mysql"
+        self.pool = ConnectionPool(
+            self.backend,
+            min_size=min_size or int(os.getenv('ANDERS_DB_POOL_MIN', '1')),
+            max_size=max_size or int(os.getenv('ANDERS_DB_POOL_MAX', '8'))
+        )
+        self.executor = ThreadPoolExecutor(max_workers=self.pool.max_size, thread_name_prefix="anders-db")
+        self.agent_ids = {}
+
+    def sql(self, query):
+        """Queries are written with ? placeholders; translate for drivers using %s"""
+        if self.backend.placeholder == "?":
+            return query
+        return query.replace("?", self.backend.placeholder)
+
+    def statement(self, conn, query, params=(), many=False, fetch=None):
+        sql = self.sql(query)
+        cursor = self.backend.cursor(conn, sql)
+        if many:
+            cursor.executemany(sql, params)
+        else:
+            cursor.execute(sql, params)
+        if fetch == "all":
+            return cursor.fetchall()
+        if fetch == "one":
+            return cursor.fetchone()
+        return {"rowcount": cursor.rowcount, "lastrowid": cursor.lastrowid}
+
+    def run(self, query, params=(), many=False, fetch=None, transaction=False):
+        if transaction:
+            with self.transaction() as tx:
+                return tx.run(query, params, many, fetch)
+        conn = self.pool.acquire()
+        broken = False
+        try:
+            return self.statement(conn, query, params, many, fetch)
+        except self.backend.connection_errors + (OSError,):
+            broken = True
+            raise
+        finally:
+            self.pool.release(conn, broken=broken)
+
+    @contextmanager
+    def transaction(self):
+        """Several statements on one pooled connection, committed together or rolled back"""
+        conn = self.pool.acquire()
+        broken = False
+        try:
+            self.backend.begin(conn)
+            try:
+                yield Transaction(self, conn)
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+        except self.backend.connection_errors + (OSError,):
+            broken = True
+            raise
+        finally:
+            self.pool.release(conn, broken=broken)
+
+    def execute(self, query, params=()):
+        return self.run(query, params)
+
+    def executemany(self, query, rows):
+        return self.run(query, rows, many=True, transaction=True)
+
+    def fetchall(self, query, params=()):
+        return self.run(query, params, fetch="all")
+
+    def fetchone(self, query, params=()):
+        return self.run(query, params, fetch="one")
+
+    async def aexecute(self, query, params=()):
+        return await running_loop().run_in_executor(self.executor, self.execute, query, params)
+
+    async def aexecutemany(self, query, rows):
+        return await running_loop().run_in_executor(self.executor, self.executemany, query, rows)
+
+    async def afetchall(self, query, params=()):
+        return await running_loop().run_in_executor(self.executor, self.fetchall, query, params)
+
+    async def afetchone(self, query, params=()):
+        return await running_loop().run_in_executor(self.executor, self.fetchone, query, params)
+
+    def ensure_schema(self, seed=True):
+        """Create the Command Center tables (SQLite only) and load schema.sql's seed rows"""
+        if self.dialect != "sqlite":
+            return False
+        from schema_parser import default_schema_path, load_schema, to_sqlite
+        schema_path = default_schema_path()
+        conn = self.pool.acquire()
+        try:
+            conn.executescript(to_sqlite(load_schema(schema_path)))
+            empty = conn.execute("SELECT COUNT(*) FROM agents").fetchone()[0] == 0
+            if seed and empty:
+                for statement in re.findall(r"INSERT INTO .*?;", schema_path.read_text(), re.S):
+                    conn.execute(statement)
+        finally:
+            self.pool.release(conn)
+        return True
+
+    def agent_id(self, name):
+        """Resolve an agent name to its id, cached for the life of the process"""
+        if name not in self.agent_ids:
+            row = self.fetchone("SELECT id FROM agents WHERE name = ?", (name,))
+            self.agent_ids[name] = row[0] if row else None
+        return self.agent_ids[name]
+
+    def log_action(self, agent, action, message=None, level="info", metadata=None, task_id=None):
+        agent_id = agent if isinstance(agent, int) else self.agent_id(agent)
+        if agent_id is None:
+            return None
+        return self.execute(
+            "INSERT INTO agent_logs (agent_id, task_id, action, message, level, metadata) VALUES (?, ?, ?, ?, ?, ?)",
+            (agent_id, task_id, action, message, level, json.dumps(metadata) if metadata is not None else None)
+        )["lastrowid"]
+
+    async def alog_action(self, *args, **kwargs):
+        return await running_loop().run_in_executor(
+            self.executor, lambda: self.log_action(*args, **kwargs)
+        )
+
+    def stats(self):
+        return {"url": re.sub(r"//([^:/@]+):[^@]*@", r"//\1:***@", self.url), "pool": self.pool.stats()}
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.pool.close()
+
+
+_shared_database = None
+_shared_lock = threading.Lock()
+# After a failed connect, callers get None until _retry_at instead of blocking on another connect timeout
+_retry_at = 0.0
+_retry_delay = 0.0
+RETRY_MIN_SECONDS = 5.0
+RETRY_MAX_SECONDS = 300.0
+
+
+def get_database():
+    """Shared pooled database, or None when no database is configured or it is backing off after a failure
+
+    The failure itself is raised once (so callers warn once); the next attempt waits 5s, doubling up to 5 min.
+    A SQLite database missing the agent tables gets them on first use.
+    """
+    global _shared_database, _retry_at, _retry_delay
+    with _shared_lock:
+        if _shared_database is not None or not database_url():
+            return _shared_database
+        if time.monotonic() < _retry_at:
+            return None
+        try:
+            database = AgentDatabase()
+        except Exception:
+            _retry_delay = min(max(_retry_delay * 2, RETRY_MIN_SECONDS), RETRY_MAX_SECONDS)
+            _retry_at = time.monotonic() + _retry_delay
+            raise
+        _retry_delay = 0.0
+        if database.dialect == "sqlite" and not database.fetchone(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'agent_logs'"):
+            try:
+                database.ensure_schema()
+            except Exception as e:
+                print(f"⚠️ Could not create the agent tables: {e}", file=sys.stderr)
+        _shared_database = database
+        return _shared_database
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    database = get_database()
+    if database is None:
+        print("❌ No database configured. Set ANDERS_DATABASE_URL (e.g. sqlite:///anders.db) or DATABASE_HOST.")
+        sys.exit(1)
+
+    if command == "init":
+        created = database.ensure_schema()
+        print("✅ Schema created" if created else "ℹ️ Schema is managed by MySQL (database/schema.sql)")
+    elif command == "logs":
+        rows = database.fetchall(
+            "SELECT created_at, action, level, message FROM agent_logs ORDER BY id DESC LIMIT 20"
+        )
+        for row in rows:
+            print(" | ".join(str(value) for value in row))
+    elif command == "stats":
+        print("🗄️ Agent Database:")
+        print(json.dumps(database.stats(), indent=2))
+    else:
+        print(f"❌ Unknown command: {command}")
+        print("Available: init, logs, stats")
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Anders Command Line
+One entry point for every agent script; a subcommand's module is imported only when it runs
+"""
+
+import os
+import sys
+import time
+
+# name -> (module, leading arguments, help). Only strings here: nothing is imported until dispatch,
+# then the module's own command line runs with the leading arguments plus whatever followed the name.
+COMMANDS = {
+    "status": ("hybrid_coding_agent", ["status"], "Project state and agent capabilities"),
+    "create_api": ("hybrid_coding_agent", ["create_api"], "Generate CRUD API routes from the schema"),
+    "setup_db": ("hybrid_coding_agent", ["setup_db"], "Write the database connection utility"),
+    "init_git": ("hybrid_coding_agent", ["init_git"], "Write .gitignore and take the initial commit"),
+    "phase_two": ("phase_two_setup", [], "Dashboard components, dashboard page and commit"),
+    "agent": ("anders_agent", [], "Original agent methods (introduce, check_git_status, ...)"),
+    "openai": ("openai_integration", [], "OpenAI code generation"),
+    "codex": ("codex_integration", [], "Codex CLI code generation"),
+    "daemon": ("anders_daemon", [], "Long-running daemon with warm clients"),
+    "client": ("anders_client", [], "Call the daemon: <object.method> [json | key=value ...]"),
+    "db": ("agent_db", [], "Agent database: init, stats"),
+    "logs": ("log_sink", [], "Agent log sink benchmark"),
+    "monitor": ("site_monitor", [], "Site monitoring: once, run, add, check, bench"),
+    "rollup": ("monitoring_rollup", [], "Monitoring rollups: run, uptime"),
+    "tasks": ("task_scheduler", [], "Task scheduler: run, drain, stats"),
+    "queries": ("query_planner", [], "Index report and migrations for the app's queries"),
+    "templates": ("template_engine", [], "Render routes and components from the schema"),
+    "scan": ("project_scanner", [], "Project tree and git status scan"),
+    "cache": ("response_cache", [], "Response cache"),
+    "workers": ("worker_pool", [], "Worker pool: bench, postprocess"),
+    "context": ("context_packer", [], "Context packer: pack, index, bench"),
+    "tokens": ("token_budget", [], "Token usage: report, tasks, count"),
+    "trace": ("tracing", [], "Traces: summary, overhead"),
+    "git": ("git_engine", [], "Git engine: status, bench"),
+    "deploy": ("delta_deploy", [], "Delta deploy of out/ to SiteGround"),
+    "writes": ("write_set", [], "Write set benchmark"),
+    "flights": ("single_flight", [], "Single-flight coalescing benchmark"),
+    "bench": ("benchmarks", [], "Benchmark harness: run, compare, list")
+}
+
+
+def usage():
+    lines = ["🤖 Anders", "Usage: anders.py [--import-profile] <command> [args...]", "", "Commands:"]
+    lines += [f"  {name:<11} {help_text}" for name, (_, _, help_text) in COMMANDS.items()]
+    return "\n".join(lines)
+
+
+def run(name, args):
+    import runpy
+    module, leading, _ = COMMANDS[name]
+    sys.argv = [f"{module}.py", *leading, *args]
+    runpy.run_module(module, run_name="__main__", alter_sys=True)
+
+
+def parse_importtime(stderr):
+    """`-X importtime` lines -> ([(module, self_us, cumulative_us, depth)], other stderr lines)"""
+    modules, other = [], []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            other.append(line)
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue  # the header row
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return modules, other
+
+
+def import_profile(args, top=20):
+    """Run the command in a child interpreter under -X importtime and report where start-up went"""
+    import subprocess
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", os.path.abspath(__file__), *args],
+                            stderr=subprocess.PIPE, text=True)
+    wall_ms = (time.perf_counter() - started) * 1000
+    modules, other = parse_importtime(result.stderr)
+    if other:
+        print("\n".join(other), file=sys.stderr)
+
+    scripts = {name[:-3] for name in os.listdir(os.path.dirname(os.path.abspath(__file__))) if name.endswith(".py")}
+    total_ms = sum(cumulative for _, _, cumulative, depth in modules if depth == 0) / 1000
+    print(f"\n⏱️ Import profile: {len(modules)} modules, {total_ms:.1f}ms importing, {wall_ms:.1f}ms wall")
+    print(f"  {'module':<40} {'self ms':>8} {'cumul ms':>9}")
+    for name, self_us, cumulative_us, depth in sorted(modules, key=lambda m: -m[2])[:top]:
+        marker = "*" if name in scripts else " "
+        print(f" {marker}{'  ' * min(depth, 4)}{name:<{40 - 2 * min(depth, 4)}} {self_us / 1000:>8.1f} "
+              f"{cumulative_us / 1000:>9.1f}")
+    print("  (* = Anders script)")
+    return result.returncode
+
+
+def main(argv):
+    profile = "--import-profile" in argv
+    args = [arg for arg in argv if arg != "--import-profile"]
+    if not args or args[0] in ("help", "-h", "--help"):
+        print(usage())
+        return 0
+    if args[0] not in COMMANDS:
+        print(f"❌ Unknown command: {args[0]}")
+        print(usage())
+        return 1
+    if profile:
+        return import_profile(args)
+    run(args[0], args[1:])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -4,19 +4,22 @@ Anders - Simon's Coding Agent
 AI-powered development assistant for Command Center project
 """
 
-import os
 import sys
 import json
-import subprocess
 from datetime import datetime
 from pathlib import Path
 
+from git_engine import get_git_engine
+from project_scanner import get_scanner
+from workspace_manager import default_project_root
+
 class AndersAgent:
-    def __init__(self):
+    def __init__(self, project_root=None):
         self.name = "Anders"
         self.role = "Coding Agent"
-        self.project_root = Path("/home/ubuntu/simon-command-center")
+        self.project_root = Path(project_root or default_project_root())
         self.status = "🤖 Ready"
+        self.scanner = get_scanner(self.project_root)
         
     def introduce(self):
         """Introduce Anders to Simon"""
@@ -54,13 +57,11 @@ class AndersAgent:
     def setup_github(self):
         """Setup GitHub repository"""
         try:
-            os.chdir(self.project_root)
-            
             # Initialize git if not already done
-            if not (self.project_root / ".git").exists():
-                subprocess.run(["git", "init"], check=True)
-                subprocess.run(["git", "add", "."], check=True)
-                subprocess.run(["git", "commit", "-m", "🚀 Initial Command Center setup"], check=True)
+            git = get_git_engine(self.project_root)
+            if not git.is_repo():
+                git.init()
+                git.commit("🚀 Initial Command Center setup")
             
             print("✅ Git repository initialized")
             print("📝 Next: Add GitHub remote and push")
@@ -129,7 +130,7 @@ export async function POST(request: NextRequest) {
             "project_root": str(self.project_root),
             "git_status": self.check_git_status(),
             "next_js_status": self.check_nextjs_status(),
-            "database_ready": (self.project_root / "database/schema.sql").exists(),
+            "database_ready": self.scanner.exists("database/schema.sql"),
             "timestamp": datetime.now().isoformat()
         }
         return status
@@ -137,20 +138,13 @@ export async function POST(request: NextRequest) {
     def check_git_status(self):
         """Check Git repository status"""
         try:
-            result = subprocess.run(
-                ["git", "status", "--porcelain"], 
-                cwd=self.project_root,
-                capture_output=True, 
-                text=True
-            )
-            return "clean" if not result.stdout.strip() else "changes"
+            return self.scanner.git_status()["state"]
         except:
             return "no_git"
     
     def check_nextjs_status(self):
         """Check Next.js status"""
-        package_json = self.project_root / "package.json"
-        if package_json.exists():
+        if self.scanner.exists("package.json"):
             return "ready"
         return "missing"
 
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Anders Client
+Thin JSON-RPC client for the resident Anders daemon (stdlib only, starts in milliseconds)
+"""
+
+import json
+import os
+import socket
+import sys
+
+
+def default_socket_path():
+    runtime_dir = os.getenv('XDG_RUNTIME_DIR') or "/tmp"
+    return os.getenv('ANDERS_SOCKET', os.path.join(runtime_dir, f"anders-{os.getuid()}.sock"))
+
+
+class DaemonError(Exception):
+    pass
+
+
+class AndersClient:
+    def __init__(self, socket_path=None, timeout=None):
+        self.socket_path = socket_path or default_socket_path()
+        self.timeout = timeout
+        self.sock = None
+        self.reader = None
+        self.next_id = 0
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+        self.reader = self.sock.makefile("rb")
+        return self
+
+    def call(self, method, params=None):
+        """Invoke `object.method` on the daemon and return its result"""
+        if self.sock is None:
+            self.connect()
+        self.next_id += 1
+        request = {"jsonrpc": "2.0", "id": self.next_id, "method": method, "params": params or {}}
+        self.sock.sendall(json.dumps(request).encode() + b"\n")
+        line = self.reader.readline()
+        if not line:
+            raise DaemonError("Daemon closed the connection")
+        response = json.loads(line)
+        if "error" in response:
+            raise DaemonError(response["error"]["message"])
+        return response["result"]
+
+    def close(self):
+        if self.sock:
+            self.reader.close()
+            self.sock.close()
+            self.sock = None
+
+
+def parse_params(args):
+    """Accept either one JSON object/array or key=value pairs"""
+    if len(args) == 1 and args[0][:1] in ("{", "["):
+        return json.loads(args[0])
+    params = {}
+    for arg in args:
+        key, _, value = arg.partition("=")
+        params[key] = value
+    return params
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python3 anders_client.py <object.method> [json | key=value ...]")
+        print("Example: python3 anders_client.py hybrid.status_report")
+        print("         python3 anders_client.py openai.code_generation prompt='Create a hook'")
+        sys.exit(1)
+
+    client = AndersClient()
+    try:
+        result = client.call(sys.argv[1], parse_params(sys.argv[2:]))
+    except (FileNotFoundError, ConnectionRefusedError):
+        print(f"❌ Anders daemon is not running on {client.socket_path}")
+        print("   Start it with: python3 anders_daemon.py")
+        sys.exit(1)
+    except DaemonError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    finally:
+        client.close()
+
+    print(result if isinstance(result, str) else json.dumps(result, indent=2))
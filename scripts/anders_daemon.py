@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Anders Daemon
+Resident process hosting the agents and serving commands over a Unix socket (JSON-RPC 2.0)
+"""
+
+import asyncio
+import fcntl
+import inspect
+import json
+import os
+import shutil
+import signal
+import socket
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+
+from anders_client import default_socket_path
+from codex_integration import CodexIntegration
+from hybrid_coding_agent import HybridAndersAgent
+from openai_integration import OpenAIIntegration
+from single_flight import flight_stats
+from token_budget import get_ledger
+from tracing import get_tracer
+
+
+class RPCHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        # One connection can carry many newline-delimited requests
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            response = self.server.daemon.dispatch(line)
+            self.wfile.write(json.dumps(response, default=str).encode() + b"\n")
+            self.wfile.flush()
+
+
+class RPCServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def daemon_running(socket_path):
+    """True if something accepts connections on `socket_path`; a leftover socket file refuses them"""
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    probe.settimeout(1.0)
+    try:
+        probe.connect(socket_path)
+        return True
+    except (FileNotFoundError, ConnectionRefusedError):
+        return False
+    finally:
+        probe.close()
+
+
+class AndersDaemon:
+    def __init__(self, socket_path=None, metrics_port=None):
+        self.socket_path = socket_path or default_socket_path()
+        self.metrics_port = metrics_port or int(os.getenv('ANDERS_METRICS_PORT', '0'))
+        self.started_at = time.time()
+        self.calls = 0
+        self.errors = 0
+        self.lock = threading.Lock()
+        self.objects = {
+            "hybrid": HybridAndersAgent(),
+            "codex": CodexIntegration(),
+            "openai": OpenAIIntegration()
+        }
+        self.server = None
+        self.socket_inode = None
+        self.lock_fd = None
+
+    def resolve(self, method):
+        if method == "daemon.ping":
+            return lambda: "pong"
+        if method == "daemon.stats":
+            return self.stats
+        if method == "daemon.traces":
+            return get_tracer().stats
+        if method == "daemon.shutdown":
+            return self.shutdown
+        target, _, name = method.partition(".")
+        obj = self.objects.get(target)
+        if obj is None or not name or name.startswith("_"):
+            return None
+        attr = getattr(obj, name, None)
+        return attr if callable(attr) else None
+
+    def dispatch(self, line):
+        try:
+            request = json.loads(line)
+        except ValueError:
+            return {"jsonrpc": "2.0", "id": None, "error": {"code": -32700, "message": "Parse error"}}
+        if not isinstance(request, dict):
+            # Batches (arrays) are not supported; numbers, strings and null are not requests at all
+            return {"jsonrpc": "2.0", "id": None, "error": {"code": -32600, "message": "Invalid Request"}}
+
+        request_id = request.get("id")
+        method = self.resolve(request.get("method", ""))
+        if method is None:
+            return {"jsonrpc": "2.0", "id": request_id,
+                    "error": {"code": -32601, "message": f"Unknown method: {request.get('method')}"}}
+
+        params = request.get("params") or {}
+        with self.lock:
+            self.calls += 1
+        try:
+            result = method(**params) if isinstance(params, dict) else method(*params)
+            if inspect.iscoroutine(result):
+                result = asyncio.run(result)
+            elif inspect.isgenerator(result):
+                result = "".join(result)
+            return {"jsonrpc": "2.0", "id": request_id, "result": result}
+        except Exception as e:
+            with self.lock:
+                self.errors += 1
+            return {"jsonrpc": "2.0", "id": request_id, "error": {"code": -32000, "message": str(e)}}
+
+    def stats(self):
+        openai = self.objects["openai"]
+        return {
+            "pid": os.getpid(),
+            "socket": self.socket_path,
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "calls": self.calls,
+            "errors": self.errors,
+            "http": openai.http.connection_stats(),
+            "cache": openai.cache.stats() if openai.cache else None,
+            "codex_queue": self.objects["codex"].runner.queue_depth(),
+            "tokens": get_ledger().stats(),
+            "single_flight": flight_stats()
+        }
+
+    def bind(self):
+        """Listen on socket_path, which is never reachable by other users, even for an instant
+
+        The socket is bound inside a fresh 0700 directory, restricted to 0600 there and then
+        renamed into place, so no permissive window exists between bind and chmod. An exclusive
+        flock on `<socket>.lock`, held until serve() returns, keeps two daemons starting at once
+        from both passing the liveness check and the second taking the path over.
+        """
+        self.lock_fd = os.open(f"{self.socket_path}.lock", os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(self.lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            if daemon_running(self.socket_path):
+                raise BlockingIOError
+        except BlockingIOError:
+            self.release_lock()
+            raise RuntimeError(f"An Anders daemon is already listening on {self.socket_path}")
+        private_dir = tempfile.mkdtemp(prefix=".anders-sock-", dir=os.path.dirname(self.socket_path) or ".")
+        try:
+            staged = os.path.join(private_dir, "anders.sock")
+            self.server = RPCServer(staged, RPCHandler)
+            os.chmod(staged, 0o600)
+            os.replace(staged, self.socket_path)
+        except BaseException:
+            self.release_lock()
+            raise
+        finally:
+            shutil.rmtree(private_dir, ignore_errors=True)
+        self.server.daemon = self
+        self.socket_inode = os.stat(self.socket_path).st_ino
+
+    def serve(self):
+        self.bind()
+        print(f"🤖 Anders daemon listening on {self.socket_path} (pid {os.getpid()})")
+        if self.metrics_port:
+            # A metrics endpoint is only useful with spans to report
+            tracer = get_tracer()
+            tracer.enabled = True
+            print(f"🔭 Metrics on {tracer.serve_metrics(self.metrics_port)}")
+        try:
+            self.server.serve_forever()
+        finally:
+            self.server.server_close()
+            get_tracer().stop_metrics()
+            try:
+                # Only our own socket; a daemon started after us may have taken the path over
+                if os.stat(self.socket_path).st_ino == self.socket_inode:
+                    os.unlink(self.socket_path)
+            except FileNotFoundError:
+                pass
+            self.release_lock()
+
+    def release_lock(self):
+        # The lock file stays: unlinking it would let a new daemon lock a fresh inode beside a holder of the old
+        if self.lock_fd is not None:
+            os.close(self.lock_fd)
+            self.lock_fd = None
+
+    def shutdown(self):
+        # serve_forever must be stopped from another thread
+        threading.Thread(target=self.server.shutdown, daemon=True).start()
+        return "shutting down"
+
+
+if __name__ == "__main__":
+    daemon = AndersDaemon(sys.argv[1] if len(sys.argv) > 1 else None)
+    signal.signal(signal.SIGTERM, lambda *_: daemon.shutdown())
+    try:
+        daemon.serve()
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    except KeyboardInterrupt:
+        print("\n👋 Anders daemon stopped")
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for Anders
+Times the agent entry points against the local OpenAI stub and fake codex, with baseline comparison
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+REPO_ROOT = SCRIPTS_DIR.parent
+DEFAULT_DIR = Path(os.getenv('ANDERS_BENCH_DIR', REPO_ROOT / "benchmarks"))
+# Copied into the scratch project so agents see a realistic tree
+PROJECT_FILES = ["package.json", "next.config.ts", "tsconfig.json", "database", "src", "public", ".github"]
+
+BENCHMARKS = {}
+
+
+def benchmark(name, repeat=10, setup=None):
+    """Register `func(env)`; it is called once to warm up, then `repeat` timed times
+
+    `setup(env)`, if given, runs untimed before the warm-up and before every sample.
+    """
+    def register(func):
+        BENCHMARKS[name] = {"func": func, "repeat": repeat, "setup": setup}
+        return func
+    return register
+
+
+class BenchEnvironment:
+    """Stub OpenAI server, fake codex and a scratch git project, wired up through env vars"""
+
+    def __init__(self, latency=0.05, codex_latency=0.02, codex_lines=3):
+        self.latency = latency
+        self.codex_latency = codex_latency
+        self.codex_lines = codex_lines
+        self.saved_env = {}
+        self.objects = {}
+
+    def setenv(self, **values):
+        for key, value in values.items():
+            self.saved_env.setdefault(key, os.environ.get(key))
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = str(value)
+
+    def __enter__(self):
+        from stub_openai_server import StubOpenAIServer
+
+        self.tmp = Path(tempfile.mkdtemp(prefix="anders-bench-"))
+        self.project = self.tmp / "project"
+        self.project.mkdir()
+        for name in PROJECT_FILES:
+            source = REPO_ROOT / name
+            if source.is_dir():
+                shutil.copytree(source, self.project / name)
+            elif source.exists():
+                shutil.copy2(source, self.project / name)
+        for args in (["init", "-q"], ["add", "."], ["commit", "-q", "-m", "bench baseline"]):
+            self.git(*args)
+        self.baseline = self.git("rev-parse", "HEAD").strip()
+
+        self.server = StubOpenAIServer(latency=self.latency)
+        self.setenv(
+            OPENAI_BASE_URL=self.server.start(),
+            OPENAI_API_KEY="bench",
+            ANDERS_PROJECT_ROOT=self.project,
+            ANDERS_CACHE_DIR=self.tmp / "cache",
+            ANDERS_NO_CACHE=None,
+            CODEX_BIN=SCRIPTS_DIR / "fake_codex",
+            FAKE_CODEX_LATENCY=self.codex_latency,
+            FAKE_CODEX_LINES=self.codex_lines,
+            # No action logging: benchmarks must not write to a real database
+            ANDERS_DATABASE_URL=None,
+            DATABASE_HOST=None,
+            GIT_AUTHOR_NAME="bench", GIT_AUTHOR_EMAIL="bench@localhost",
+            GIT_COMMITTER_NAME="bench", GIT_COMMITTER_EMAIL="bench@localhost"
+        )
+        return self
+
+    def git(self, *args):
+        return subprocess.run(["git", *args], cwd=self.project, check=True, capture_output=True, text=True,
+                              env={**os.environ, "GIT_AUTHOR_NAME": "bench", "GIT_AUTHOR_EMAIL": "bench@localhost",
+                                   "GIT_COMMITTER_NAME": "bench", "GIT_COMMITTER_EMAIL": "bench@localhost"}).stdout
+
+    def reset_project(self):
+        """Scratch project back to the baseline commit, so generated files are written and committed again"""
+        self.git("reset", "-q", "--hard", self.baseline)
+        self.git("clean", "-fdq")
+
+    def get(self, name, factory):
+        """One agent object per benchmark run, created after the environment is in place"""
+        if name not in self.objects:
+            self.objects[name] = factory()
+        return self.objects[name]
+
+    def __exit__(self, exc_type, exc, tb):
+        self.server.stop()
+        for key, value in self.saved_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+
+def openai(env):
+    from openai_integration import OpenAIIntegration
+    return env.get("openai", OpenAIIntegration)
+
+
+def codex(env):
+    from codex_integration import CodexIntegration
+    return env.get("codex", CodexIntegration)
+
+
+def hybrid(env):
+    from hybrid_coding_agent import HybridAndersAgent
+    return env.get("hybrid", HybridAndersAgent)
+
+
+@benchmark("openai.code_generation", repeat=20)
+def bench_code_generation(env):
+    result = openai(env).code_generation("Create a health check API route", refresh=True)
+    assert not result.startswith("❌"), result
+
+
+@benchmark("openai.code_generation_cached", repeat=50)
+def bench_code_generation_cached(env):
+    result = openai(env).code_generation("Create a health check API route")
+    assert not result.startswith("❌"), result
+
+
+@benchmark("codex.run_codex_command", repeat=5)
+def bench_run_codex_command(env):
+    result = codex(env).run_codex_command("Add a README section", timeout=60)
+    assert result["status"] == "success", result
+
+
+@benchmark("hybrid.status_report", repeat=50)
+def bench_status_report(env):
+    hybrid(env).status_report()
+
+
+@benchmark("hybrid.create_api_routes", repeat=20, setup=BenchEnvironment.reset_project)
+def bench_create_api_routes(env):
+    assert hybrid(env).create_api_routes()["success"]
+
+
+@benchmark("phase_two.end_to_end", repeat=5, setup=BenchEnvironment.reset_project)
+def bench_phase_two(env):
+    from phase_two_setup import AndersPhaseTwo
+    phase_two = AndersPhaseTwo()
+    for step in (phase_two.create_dashboard_components, phase_two.update_dashboard_page,
+                 phase_two.prepare_github_push):
+        result = step()
+        assert result["success"], result
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    return {
+        "samples": len(ordered),
+        "min_ms": round(ordered[0] * 1000, 3),
+        "median_ms": round(statistics.median(ordered) * 1000, 3),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "p95_ms": round(ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)] * 1000, 3),
+        "stdev_ms": round(statistics.stdev(ordered) * 1000, 3) if len(ordered) > 1 else 0.0
+    }
+
+
+def git_revision():
+    result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True)
+    return result.stdout.strip() or None
+
+
+def run_benchmarks(names=None, repeat=None, latency=0.05, codex_latency=0.02):
+    selected = [name for name in BENCHMARKS if not names or any(part in name for part in names)]
+    results = {}
+    with BenchEnvironment(latency, codex_latency) as env:
+        for name in selected:
+            spec = BENCHMARKS[name]
+            samples = []
+            # The agents report progress on stdout; keep it out of the results
+            with contextlib.redirect_stdout(io.StringIO()):
+                setup = spec["setup"] or (lambda env: None)
+                setup(env)
+                spec["func"](env)  # warm-up: imports, connection setup, cache fill
+                for _ in range(repeat or spec["repeat"]):
+                    setup(env)
+                    started = time.perf_counter()
+                    spec["func"](env)
+                    samples.append(time.perf_counter() - started)
+            results[name] = summarize(samples)
+            print(f"⏱️ {name}: median {results[name]['median_ms']}ms (p95 {results[name]['p95_ms']}ms)",
+                  file=sys.stderr)
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "stub_latency_s": latency,
+            "codex_latency_s": codex_latency
+        },
+        "results": results
+    }
+
+
+def compare(current, baseline, threshold=0.25, min_delta_ms=1.0):
+    """Median-to-median comparison; small absolute changes never count as regressions"""
+    rows = []
+    for name, stats in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            rows.append({"name": name, "status": "new", "median_ms": stats["median_ms"]})
+            continue
+        delta = stats["median_ms"] - base["median_ms"]
+        ratio = stats["median_ms"] / base["median_ms"] if base["median_ms"] else float("inf")
+        status = "ok"
+        if abs(delta) >= min_delta_ms and ratio > 1 + threshold:
+            status = "regression"
+        elif abs(delta) >= min_delta_ms and ratio < 1 - threshold:
+            status = "improvement"
+        rows.append({"name": name, "status": status, "median_ms": stats["median_ms"],
+                     "baseline_ms": base["median_ms"], "change_pct": round((ratio - 1) * 100, 1)})
+    return rows
+
+
+def format_comparison(rows):
+    icons = {"ok": "  ", "new": "🆕", "regression": "🔴", "improvement": "🟢"}
+    lines = []
+    for row in rows:
+        if row["status"] == "new":
+            lines.append(f"{icons['new']} {row['name']}: {row['median_ms']}ms (no baseline)")
+        else:
+            lines.append(f"{icons[row['status']]} {row['name']}: {row['median_ms']}ms vs {row['baseline_ms']}ms "
+                         f"({row['change_pct']:+.1f}%)")
+    return "\n".join(lines)
+
+
+def write_json(path, data):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the Anders agent scripts")
+    parser.add_argument("command", nargs="?", default="run", choices=["run", "compare", "list"])
+    parser.add_argument("files", nargs="*", help="compare: <results.json> [baseline.json]")
+    parser.add_argument("--filter", action="append", help="Only benchmarks whose name contains this")
+    parser.add_argument("--repeat", type=int, help="Timed runs per benchmark (default: per benchmark)")
+    parser.add_argument("--latency", type=float, default=0.05, help="Stub API latency in seconds")
+    parser.add_argument("--codex-latency", type=float, default=0.02, help="Fake codex delay per output line")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--baseline", default=str(DEFAULT_DIR / "baseline.json"))
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Relative slowdown counted as a regression")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        for name, spec in BENCHMARKS.items():
+            print(f"{name} (repeat {spec['repeat']})")
+        sys.exit(0)
+
+    if args.command == "compare":
+        if not args.files:
+            parser.error("compare needs a results file")
+        current = json.loads(Path(args.files[0]).read_text())
+        baseline_path = Path(args.files[1] if len(args.files) > 1 else args.baseline)
+    else:
+        current = run_benchmarks(args.filter, args.repeat, args.latency, args.codex_latency)
+        output = Path(args.output or DEFAULT_DIR / "results" / f"{datetime.now():%Y%m%d-%H%M%S}.json")
+        write_json(output, current)
+        print(f"📊 Results written to {output}")
+        baseline_path = Path(args.baseline)
+        if args.save_baseline:
+            write_json(baseline_path, current)
+            print(f"📌 Baseline saved to {baseline_path}")
+            sys.exit(0)
+
+    if not baseline_path.exists():
+        print(json.dumps(current["results"], indent=2))
+        print(f"ℹ️ No baseline at {baseline_path}; run with --save-baseline to create one")
+        sys.exit(0)
+
+    rows = compare(current, json.loads(baseline_path.read_text()), args.threshold)
+    print(f"📊 Compared with {baseline_path}:")
+    print(format_comparison(rows))
+    sys.exit(1 if any(row["status"] == "regression" for row in rows) else 0)
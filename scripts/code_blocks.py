@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Code block extraction for Anders
+Pulls fenced code out of model output, either whole or incrementally
+"""
+
+import re
+
+FENCE = re.compile(r"^\s*```")
+
+
+def extract_code_blocks(text):
+    """Return the contents of every fenced code block in `text`"""
+    extractor = CodeBlockExtractor(keep_unfenced=False)
+    extractor.feed(text)
+    extractor.close()
+    return extractor.blocks
+
+
+class CodeBlockExtractor:
+    """Incremental fence parser: feed streamed text, get back code as complete lines arrive"""
+
+    def __init__(self, keep_unfenced=True):
+        self.keep_unfenced = keep_unfenced
+        self.pending = ""
+        self.in_block = False
+        self.seen_fence = False
+        self.unfenced = []
+        self.blocks = []
+
+    def feed(self, text):
+        """Consume a chunk and return any code that is now known to be complete"""
+        self.pending += text
+        output = []
+        while "\n" in self.pending:
+            line, self.pending = self.pending.split("\n", 1)
+            output.append(self.handle_line(line + "\n"))
+        return "".join(output)
+
+    def handle_line(self, line):
+        if FENCE.match(line):
+            self.seen_fence = True
+            self.unfenced = []
+            if self.in_block:
+                self.in_block = False
+            else:
+                self.in_block = True
+                self.blocks.append("")
+            return ""
+        if self.in_block:
+            self.blocks[-1] += line
+            return line
+        if not self.seen_fence:
+            # Prose before any fence; only used if the reply turns out to be bare code
+            self.unfenced.append(line)
+        return ""
+
+    def close(self):
+        """Flush the trailing partial line; bare replies without fences are returned whole"""
+        output = ""
+        if self.pending:
+            output = self.handle_line(self.pending)
+            self.pending = ""
+        if not self.seen_fence and self.keep_unfenced:
+            output += "".join(self.unfenced)
+            self.unfenced = []
+        return output
@@ -6,18 +6,56 @@ Handles OpenAI Codex CLI commands and device auth
 
 import subprocess
 import os
+import sys
 import json
-from datetime import datetime
+
+from codex_runner import CodexJob, CodexJobRunner, codex_binary
+from log_sink import record_action
+from single_flight import flight_key, get_flight
+from tracing import span, traced
+from workspace_manager import default_project_root
+
+API_ROUTES_PROMPT = """Create Next.js API routes for the Command Center project:
+
+1. /api/agents - GET (list agents) and POST (create agent)
+2. /api/tasks - GET (list tasks) and POST (create task)  
+3. /api/projects - GET (list projects) and POST (create project)
+
+Use TypeScript, MySQL2, and proper error handling.
+Database connection config from environment variables.
+Follow Next.js 15 App Router conventions."""
+
+DATABASE_CONNECTION_PROMPT = """Create a database connection utility for the Command Center:
+
+1. Create src/lib/database.ts with MySQL connection
+2. Add connection pooling and error handling
+3. Create helper functions for common queries
+4. Add TypeScript types for database models
+
+Use environment variables for database config."""
+
+GITHUB_INTEGRATION_PROMPT = """Setup GitHub integration for Command Center project:
+
+1. Initialize git repository if needed
+2. Create .gitignore for Next.js project
+3. Add all files and make initial commit
+4. Configure GitHub Actions for deployment
+5. Add README with setup instructions
+
+Make commits with good commit messages."""
 
 class CodexIntegration:
-    def __init__(self):
-        self.project_root = "/home/ubuntu/simon-command-center"
+    def __init__(self, runner=None, project_root=None):
+        self.project_root = str(project_root or default_project_root())
+        self.runner = runner or CodexJobRunner()
+        self.coalesce = os.getenv('ANDERS_SINGLE_FLIGHT', '1') == '1'
+        self.flight = get_flight("codex.run_codex_command")
         
     def check_codex_auth(self):
         """Check if Codex CLI is authenticated"""
         try:
             result = subprocess.run(
-                ["codex", "--version"], 
+                [codex_binary(), "--version"], 
                 capture_output=True, 
                 text=True,
                 timeout=10
@@ -31,84 +69,107 @@ class CodexIntegration:
         except Exception as e:
             return {"status": "error", "error": str(e)}
     
-    def run_codex_command(self, prompt, auto_approve=False):
-        """Run Codex command in project directory"""
+    def build_job(self, prompt, auto_approve=False, cwd=None, **options):
+        """Describe a codex exec job; each job carries its own cwd"""
+        return CodexJob(prompt, cwd or self.project_root, auto_approve=auto_approve, **options)
+
+    @traced("codex.run_codex_command")
+    def run_codex_command(self, prompt, auto_approve=False, cwd=None, on_output=None, timeout=300):
+        """Run Codex command in project directory; an identical command already running is joined, not rerun"""
         try:
-            os.chdir(self.project_root)
-            
-            # Build codex command
-            cmd = ["codex", "exec"]
-            if auto_approve:
-                cmd.append("--full-auto")
-            cmd.append(prompt)
-            
-            print(f"🤖 Running: {' '.join(cmd)}")
-            
-            # Execute codex command
-            result = subprocess.run(
-                cmd,
-                cwd=self.project_root,
-                capture_output=True,
-                text=True,
-                timeout=300  # 5 minute timeout
-            )
-            
-            return {
-                "status": "success" if result.returncode == 0 else "error",
-                "returncode": result.returncode,
-                "stdout": result.stdout,
-                "stderr": result.stderr,
-                "timestamp": datetime.now().isoformat()
-            }
-            
-        except subprocess.TimeoutExpired:
-            return {"status": "timeout", "error": "Command timed out after 5 minutes"}
+            if not self.coalesce:
+                return self.execute(prompt, auto_approve, cwd, on_output, timeout)
+            key = flight_key(prompt, str(cwd or self.project_root), auto_approve, timeout)
+            result, shared = self.flight.do(key, self.execute, prompt, auto_approve, cwd, on_output, timeout)
+            # Only the first caller's on_output sees the stream; the others get a copy of its result
+            return dict(result, coalesced=True) if shared else result
         except Exception as e:
             return {"status": "error", "error": str(e)}
-    
-    def generate_api_routes(self):
-        """Use Codex to generate API routes for Command Center"""
-        prompt = """Create Next.js API routes for the Command Center project:
 
-1. /api/agents - GET (list agents) and POST (create agent)
-2. /api/tasks - GET (list tasks) and POST (create task)  
-3. /api/projects - GET (list projects) and POST (create project)
+    def execute(self, prompt, auto_approve=False, cwd=None, on_output=None, timeout=300):
+        job = self.build_job(
+            prompt, auto_approve, cwd,
+            timeout=timeout,
+            on_stdout=on_output,
+            on_stderr=on_output
+        )
+        print(f"🤖 Running: {' '.join(job.command())}")
+        with span("codex.cli", job=job.name) as cli_span:
+            result = self.runner.submit(job).result()
+            cli_span.set("returncode", result.get("returncode"))
+        self.record(job, result)
+        return result
 
-Use TypeScript, MySQL2, and proper error handling.
-Database connection config from environment variables.
-Follow Next.js 15 App Router conventions."""
+    def record(self, job, result):
+        level = "success" if result["status"] == "success" else "error"
+        record_action("Anders", "codex_exec", job.prompt.splitlines()[0][:200], level, {
+            "job": job.name,
+            "status": result["status"],
+            "returncode": result.get("returncode"),
+            "duration_seconds": result.get("duration_seconds"),
+            "cwd": job.cwd
+        })
+
+    def run_parallel(self, prompts, auto_approve=True, cwd=None, timeout=None, log_dir=None,
+                     workspaces=None):
+        """Run several codex prompts as one parallel batch, results in input order
 
-        return self.run_codex_command(prompt, auto_approve=True)
+        With a WorkspaceManager each job runs in its own worktree and its changes
+        are committed to an `anders/<job>` branch before the worktree is recycled.
+        """
+        jobs = []
+        allocated = {}
+        try:
+            # Inside the try: worktrees already acquired are released if a later acquire fails
+            for name, prompt in prompts.items():
+                log_path = os.path.join(log_dir, f"{name}.log") if log_dir else None
+                if workspaces:
+                    allocated[name] = workspaces.acquire(job=name)
+                    cwd = allocated[name].path
+                jobs.append(self.build_job(prompt, auto_approve, cwd, name=name, log_path=log_path))
+            results = dict(zip(prompts, self.runner.run_batch(jobs, timeout=timeout)))
+            for job in jobs:
+                self.record(job, results[job.name])
+            for name, workspace in allocated.items():
+                results[name]["workspace"] = str(workspace.path)
+                if results[name]["status"] == "success":
+                    results[name]["branch_commit"] = workspaces.capture(
+                        workspace, f"anders/{name}", f"🤖 Codex: {name}"
+                    )
+        finally:
+            for workspace in allocated.values():
+                workspaces.release(workspace)
+        return results
+    
+    def generate_api_routes(self):
+        """Use Codex to generate API routes for Command Center"""
+        return self.run_codex_command(API_ROUTES_PROMPT, auto_approve=True)
     
     def implement_database_connection(self):
         """Use Codex to implement database connection utilities"""
-        prompt = """Create a database connection utility for the Command Center:
-
-1. Create src/lib/database.ts with MySQL connection
-2. Add connection pooling and error handling
-3. Create helper functions for common queries
-4. Add TypeScript types for database models
-
-Use environment variables for database config."""
-
-        return self.run_codex_command(prompt, auto_approve=True)
+        return self.run_codex_command(DATABASE_CONNECTION_PROMPT, auto_approve=True)
     
     def setup_github_integration(self):
         """Use Codex to setup GitHub integration"""
-        prompt = """Setup GitHub integration for Command Center project:
+        return self.run_codex_command(GITHUB_INTEGRATION_PROMPT, auto_approve=True)
 
-1. Initialize git repository if needed
-2. Create .gitignore for Next.js project
-3. Add all files and make initial commit
-4. Configure GitHub Actions for deployment
-5. Add README with setup instructions
-
-Make commits with good commit messages."""
-
-        return self.run_codex_command(prompt, auto_approve=True)
+    def run_setup_batch(self, timeout=None, log_dir=None, workspaces=None):
+        """Generate API routes, database connection and GitHub setup as one parallel batch"""
+        return self.run_parallel({
+            "generate_api_routes": API_ROUTES_PROMPT,
+            "implement_database_connection": DATABASE_CONNECTION_PROMPT,
+            "setup_github_integration": GITHUB_INTEGRATION_PROMPT
+        }, timeout=timeout, log_dir=log_dir, workspaces=workspaces)
 
 if __name__ == "__main__":
     integration = CodexIntegration()
+
+    if len(sys.argv) > 1 and sys.argv[1] == "batch":
+        # python3 codex_integration.py batch [log_dir]
+        results = integration.run_setup_batch(log_dir=sys.argv[2] if len(sys.argv) > 2 else None)
+        print("⚡ Codex Batch:")
+        print(json.dumps(results, indent=2))
+        sys.exit(0)
     
     # Check Codex authentication status
     auth_status = integration.check_codex_auth()
@@ -121,6 +182,7 @@ if __name__ == "__main__":
         print("- generate_api_routes()")
         print("- implement_database_connection()")  
         print("- setup_github_integration()")
+        print("- run_setup_batch()  (all three in parallel)")
     else:
         print(f"\n⏳ Codex status: {auth_status['status']}")
         print("Complete device authentication first.")
\ No newline at end of file
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Codex job runner for Anders
+Runs several `codex exec` jobs in parallel with streamed output and timeouts
+"""
+
+import itertools
+import os
+import signal
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+
+def codex_binary():
+    return os.getenv('CODEX_BIN', 'codex')
+
+
+class CodexJob:
+    _ids = itertools.count(1)
+
+    def __init__(self, prompt, cwd, auto_approve=False, timeout=300, name=None,
+                 on_stdout=None, on_stderr=None, log_path=None):
+        self.id = next(self._ids)
+        self.name = name or f"codex-{self.id}"
+        self.prompt = prompt
+        self.cwd = str(cwd)
+        self.auto_approve = auto_approve
+        self.timeout = timeout
+        self.on_stdout = on_stdout
+        self.on_stderr = on_stderr
+        self.log_path = Path(log_path) if log_path else None
+
+    def command(self):
+        cmd = [codex_binary(), "exec"]
+        if self.auto_approve:
+            cmd.append("--full-auto")
+        cmd.append(self.prompt)
+        return cmd
+
+
+class CodexJobRunner:
+    def __init__(self, max_parallel=None, global_timeout=None):
+        self.max_parallel = max_parallel or int(os.getenv('ANDERS_CODEX_PARALLEL', '4'))
+        self.global_timeout = global_timeout
+        self.executor = ThreadPoolExecutor(max_workers=self.max_parallel, thread_name_prefix="codex-job")
+        self.lock = threading.Lock()
+        self.running = {}
+        self.queued = 0
+        self.stopping = False
+
+    def submit(self, job, deadline=None):
+        """Queue a job; returns a Future resolving to the job's result dict"""
+        if deadline is None and self.global_timeout:
+            deadline = time.monotonic() + self.global_timeout
+        with self.lock:
+            self.queued += 1
+        return self.executor.submit(self.run_job, job, deadline)
+
+    def run_batch(self, jobs, timeout=None):
+        """Run jobs concurrently (up to max_parallel) and return results in input order"""
+        timeout = timeout or self.global_timeout
+        deadline = time.monotonic() + timeout if timeout else None
+        futures = [self.submit(job, deadline) for job in jobs]
+        return [future.result() for future in futures]
+
+    def queue_depth(self):
+        with self.lock:
+            return {"queued": self.queued, "running": len(self.running), "max_parallel": self.max_parallel}
+
+    def pump(self, stream, lines, callback, log_file, label):
+        for line in iter(stream.readline, ""):
+            lines.append(line)
+            if log_file:
+                with self.lock:
+                    log_file.write(f"[{label}] {line}")
+                    log_file.flush()
+            if callback:
+                callback(line.rstrip("\n"))
+        stream.close()
+
+    def run_job(self, job, deadline=None):
+        with self.lock:
+            self.queued -= 1
+        started = time.monotonic()
+        timeout = job.timeout
+        if deadline is not None:
+            timeout = min(timeout or float("inf"), max(deadline - started, 0))
+        if self.stopping or timeout == 0:
+            return self.result(job, "timeout", started, error="Global timeout reached before job started")
+
+        log_file = None
+        if job.log_path:
+            job.log_path.parent.mkdir(parents=True, exist_ok=True)
+            log_file = open(job.log_path, "a")
+
+        try:
+            process = subprocess.Popen(
+                job.command(),
+                cwd=job.cwd,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                bufsize=1,
+                start_new_session=True
+            )
+        except FileNotFoundError:
+            if log_file:
+                log_file.close()
+            return self.result(job, "error", started, error="Codex CLI not found")
+
+        with self.lock:
+            self.running[job.id] = process
+        stdout, stderr = [], []
+        readers = [
+            threading.Thread(target=self.pump, args=(process.stdout, stdout, job.on_stdout, log_file, "stdout"), daemon=True),
+            threading.Thread(target=self.pump, args=(process.stderr, stderr, job.on_stderr, log_file, "stderr"), daemon=True)
+        ]
+        for reader in readers:
+            reader.start()
+
+        status = None
+        try:
+            process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            self.kill(process)
+            status = "timeout"
+        finally:
+            for reader in readers:
+                reader.join()
+            with self.lock:
+                self.running.pop(job.id, None)
+            if log_file:
+                log_file.close()
+
+        if status is None:
+            status = "success" if process.returncode == 0 else "error"
+        return self.result(
+            job, status, started,
+            returncode=process.returncode,
+            stdout="".join(stdout),
+            stderr="".join(stderr),
+            error=f"Command timed out after {timeout:g}s" if status == "timeout" else None
+        )
+
+    def kill(self, process):
+        """Terminate the job's whole process group so child processes release the pipes"""
+        try:
+            os.killpg(process.pid, signal.SIGTERM)
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            os.killpg(process.pid, signal.SIGKILL)
+            process.wait()
+        except ProcessLookupError:
+            pass
+
+    def result(self, job, status, started, error=None, **fields):
+        result = {
+            "job": job.name,
+            "status": status,
+            **fields,
+            "duration_seconds": round(time.monotonic() - started, 3),
+            "timestamp": datetime.now().isoformat()
+        }
+        if error:
+            result["error"] = error
+        return result
+
+    def shutdown(self, cancel=True):
+        """Stop accepting work; with cancel, kill running jobs and drop queued ones"""
+        self.stopping = True
+        if cancel:
+            with self.lock:
+                processes = list(self.running.values())
+            for process in processes:
+                self.kill(process)
+        self.executor.shutdown(wait=True, cancel_futures=cancel)
+        with self.lock:
+            self.queued = 0
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+Context Packer for Anders
+Picks the project snippets most relevant to a prompt (BM25 over an mtime-refreshed index) within a token budget
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from project_scanner import SKIP_DIRS
+from response_cache import default_cache_dir
+from token_budget import get_tokenizer
+from workspace_manager import default_project_root
+
+INDEX_VERSION = 2
+DEFAULT_SOURCES = ("src", "database/schema.sql", "scripts")
+TEXT_SUFFIXES = {".ts", ".tsx", ".js", ".jsx", ".py", ".sql", ".css", ".md", ".json", ".sh"}
+MAX_FILE_BYTES = 512 * 1024
+MAX_CHUNK_LINES = 60
+MIN_CHUNK_LINES = 4     # shorter runs (imports, a lone constant) join the snippet after them
+K1, B = 1.2, 0.75
+SYMBOL_BOOST = 2.0      # a query term naming the snippet's symbol counts double
+PATH_WEIGHT = 2.0       # a query term in the file path scores like a strong body match
+
+# Where a new snippet starts: top-level declarations, Python methods, SQL statements, markdown headings
+BOUNDARY = re.compile(r"^(?:(?:export\s+)?(?:default\s+)?(?:async\s+)?(?:def|class|function|interface|type|enum|const)\s"
+                      r"|    (?:async\s+)?def\s|CREATE\s|ALTER\s|INSERT\s|#{1,3}\s|--\s)")
+SYMBOL = re.compile(r"(?:def|class|function|interface|type|enum|const|TABLE|INDEX)\s+(?:IF\s+NOT\s+EXISTS\s+)?"
+                    r"[`\"]?(\w+)", re.IGNORECASE)
+WORD = re.compile(r"[A-Za-z][A-Za-z0-9]*")
+CAMEL = re.compile(r"[A-Z]?[a-z]+|[A-Z]+(?![a-z])|\d+")
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "if", "in", "into", "is", "it", "of", "on",
+    "or", "the", "this", "to", "with", "not", "none", "null", "true", "false", "self", "return", "import",
+    "const", "let", "var", "new", "else", "def", "await", "async", "export", "default", "please", "create",
+    "make", "add", "use", "using", "new"
+}
+
+
+def stem(term):
+    if len(term) > 4 and term.endswith("ies"):
+        return term[:-3] + "y"
+    if len(term) > 3 and term.endswith("s") and not term.endswith("ss"):
+        return term[:-1]
+    return term
+
+
+def terms(text):
+    """Lowercased, stemmed terms; identifiers also contribute their camelCase/snake_case parts"""
+    found = []
+    for word in WORD.findall(text):
+        parts = CAMEL.findall(word)
+        if len(parts) > 1:
+            found.append(word.lower())
+        found.extend(part.lower() for part in parts)
+    return [stem(term) for term in found if len(term) > 1 and term not in STOPWORDS]
+
+
+def chunk_file(text):
+    """Split a file into (start_line, end_line, text) snippets at declaration boundaries"""
+    lines = text.splitlines()
+    chunks, start = [], 0
+    for number, line in enumerate(lines):
+        if number - start >= MIN_CHUNK_LINES and (BOUNDARY.match(line) or number - start >= MAX_CHUNK_LINES):
+            # A comment or decorator directly above a declaration belongs with it
+            cut = number
+            while cut > start + MIN_CHUNK_LINES and lines[cut - 1].lstrip().startswith(("#", "//", "@", "--", "/*", "*")):
+                cut -= 1
+            chunks.append((start, cut))
+            start = cut
+    if start < len(lines):
+        chunks.append((start, len(lines)))
+    return [(s + 1, e, "\n".join(lines[s:e])) for s, e in chunks if "\n".join(lines[s:e]).strip()]
+
+
+class ContextPacker:
+    """Incremental snippet index over the project sources, persisted between runs"""
+
+    def __init__(self, project_root=None, sources=DEFAULT_SOURCES, index_path=None, min_interval=1.0):
+        self.root = Path(project_root or default_project_root())
+        self.sources = sources
+        key = hashlib.sha1(str(self.root.resolve()).encode()).hexdigest()[:12]
+        self.index_path = Path(index_path or default_cache_dir() / "context" / f"{key}.json")
+        self.min_interval = min_interval
+        self.tokenizer = get_tokenizer()
+        self.lock = threading.RLock()
+        self.files = {}         # path -> {"mtime_ns", "size", "chunks": [...]}
+        self.postings = {}      # term -> {(path, chunk index): tf}
+        self.total_length = 0
+        self.chunk_count = 0
+        self.last_refresh = 0.0
+        self.dirty = False
+        self.stats = {"refreshes": 0, "files_indexed": 0, "packs": 0}
+        self.load()
+
+    def load(self):
+        try:
+            data = json.loads(self.index_path.read_text())
+        except (OSError, ValueError):
+            return
+        if data.get("version") != INDEX_VERSION or data.get("root") != str(self.root):
+            return
+        for path, entry in data["files"].items():
+            self.add_postings(path, entry)
+            self.files[path] = entry
+
+    def save(self):
+        if not self.dirty:
+            return
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.index_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"version": INDEX_VERSION, "root": str(self.root), "files": self.files}))
+        os.replace(tmp, self.index_path)
+        self.dirty = False
+
+    def walk(self):
+        """(relative path, stat) for every indexable file under the configured sources"""
+        for source in self.sources:
+            base = self.root / source
+            if base.is_file():
+                yield source, base.stat()
+                continue
+            for directory, dirs, names in os.walk(base):
+                dirs[:] = sorted(d for d in dirs if d not in SKIP_DIRS)
+                for name in names:
+                    if Path(name).suffix not in TEXT_SUFFIXES:
+                        continue
+                    path = os.path.join(directory, name)
+                    try:
+                        yield os.path.relpath(path, self.root), os.stat(path)
+                    except FileNotFoundError:
+                        continue
+
+    def index_file(self, path, stat):
+        try:
+            text = (self.root / path).read_text(errors="replace") if stat.st_size <= MAX_FILE_BYTES else ""
+        except OSError:
+            text = ""
+        chunks = []
+        for start, end, snippet in chunk_file(text):
+            counts = Counter(terms(snippet))
+            symbol = SYMBOL.search(snippet.split("\n", 1)[0] if BOUNDARY.match(snippet) else "")
+            chunks.append({
+                "start": start, "end": end, "text": snippet,
+                "symbol": symbol.group(1) if symbol else None,
+                "terms": dict(counts), "length": sum(counts.values()),
+                "tokens": self.tokenizer.count(snippet)
+            })
+        return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "path_terms": sorted(set(terms(path))),
+                "chunks": chunks}
+
+    def add_postings(self, path, entry):
+        for index, chunk in enumerate(entry["chunks"]):
+            for term, tf in chunk["terms"].items():
+                self.postings.setdefault(term, {})[(path, index)] = tf
+            self.total_length += chunk["length"]
+            self.chunk_count += 1
+
+    def remove_postings(self, path, entry):
+        for index, chunk in enumerate(entry["chunks"]):
+            for term in chunk["terms"]:
+                posting = self.postings.get(term)
+                if posting is not None:
+                    posting.pop((path, index), None)
+                    if not posting:
+                        del self.postings[term]
+            self.total_length -= chunk["length"]
+            self.chunk_count -= 1
+
+    def refresh(self, force=False):
+        """Re-index files whose mtime or size moved; returns the number of files (re)indexed or dropped"""
+        with self.lock:
+            if not force and time.monotonic() - self.last_refresh < self.min_interval and self.files:
+                return 0
+            seen, changed = set(), 0
+            for path, stat in self.walk():
+                seen.add(path)
+                entry = self.files.get(path)
+                if entry and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+                    continue
+                if entry:
+                    self.remove_postings(path, entry)
+                entry = self.files[path] = self.index_file(path, stat)
+                self.add_postings(path, entry)
+                changed += 1
+            for path in set(self.files) - seen:
+                self.remove_postings(path, self.files.pop(path))
+                changed += 1
+            self.last_refresh = time.monotonic()
+            self.stats["refreshes"] += 1
+            self.stats["files_indexed"] += changed
+            if changed:
+                self.dirty = True
+                self.save()
+            return changed
+
+    def search(self, query, limit=20):
+        """[(score, path, chunk)] by BM25, best first"""
+        self.refresh()
+        query_terms = Counter(terms(query))
+        if not query_terms or not self.chunk_count:
+            return []
+        average = self.total_length / self.chunk_count
+        scores, idfs = {}, {}
+        for term, weight in query_terms.items():
+            posting = self.postings.get(term, {})
+            idf = idfs[term] = math.log(1 + (self.chunk_count - len(posting) + 0.5) / (len(posting) + 0.5))
+            for key, tf in posting.items():
+                chunk = self.files[key[0]]["chunks"][key[1]]
+                norm = tf * (K1 + 1) / (tf + K1 * (1 - B + B * chunk["length"] / average))
+                boost = SYMBOL_BOOST if chunk["symbol"] and term in terms(chunk["symbol"]) else 1.0
+                scores[key] = scores.get(key, 0.0) + idf * norm * boost * weight
+        # The path is a second field: src/app/api/tasks/route.ts matches "tasks API route" on every term
+        path_scores = {}
+        for key in scores:
+            if key[0] not in path_scores:
+                matched = query_terms.keys() & set(self.files[key[0]]["path_terms"])
+                path_scores[key[0]] = sum(idfs[term] * PATH_WEIGHT for term in matched)
+            scores[key] += path_scores[key[0]]
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [(score, path, self.files[path]["chunks"][index]) for (path, index), score in best]
+
+    def pack(self, query, budget=None, min_relative_score=0.25):
+        """Greedily fill `budget` tokens with the best snippets; weak matches are left out even if they fit"""
+        started = time.perf_counter()
+        budget = budget or int(os.getenv('ANDERS_CONTEXT_BUDGET', '1500'))
+        with self.lock:
+            hits = self.search(query, limit=50)
+            picked, used = [], 0
+            top = hits[0][0] if hits else 0
+            for score, path, chunk in hits:
+                if score < top * min_relative_score:
+                    break
+                header = f"// {path}:{chunk['start']}-{chunk['end']}"
+                cost = chunk["tokens"] + self.tokenizer.count(header) + 1
+                if used + cost > budget:
+                    continue
+                picked.append((path, chunk, header, score))
+                used += cost
+            self.stats["packs"] += 1
+        # Snippets from one file stay together and in file order
+        picked.sort(key=lambda item: (item[0], item[1]["start"]))
+        return {
+            "context": "\n\n".join(f"{header}\n{chunk['text']}" for _, chunk, header, _ in picked),
+            "tokens": used,
+            "snippets": [{"path": path, "lines": [chunk["start"], chunk["end"]], "symbol": chunk["symbol"],
+                          "score": round(score, 3)} for path, chunk, _, score in picked],
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 3)
+        }
+
+
+_packers = {}
+_packers_lock = threading.Lock()
+
+
+def get_packer(project_root=None):
+    root = str(Path(project_root or default_project_root()).resolve())
+    with _packers_lock:
+        if root not in _packers:
+            _packers[root] = ContextPacker(root)
+        return _packers[root]
+
+
+BENCH_PROMPTS = [
+    "Add pagination to the tasks API route",
+    "Show agent logs for a task in the dashboard",
+    "Add a deployments table filter by status",
+    "Fix the site monitoring uptime query for the last 30 days",
+    "Retry failed codex jobs with exponential backoff",
+    "Add an index for agent logs by created_at",
+    "Add a projects manager component with edit support",
+    "Batch the agent_logs inserts"
+]
+
+
+def benchmark(project_root=None, prompts=BENCH_PROMPTS, budget=1500):
+    """Cold index, warm pack latency, and packed context size against pasting the matched files whole"""
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        started = time.perf_counter()
+        packer = ContextPacker(project_root, index_path=Path(tmp) / "index.json", min_interval=0)
+        packer.refresh()
+        cold_ms = (time.perf_counter() - started) * 1000
+        packer.min_interval = 60
+        times, packed, whole = [], [], []
+        for prompt in prompts:
+            result = packer.pack(prompt, budget)
+            times.append(result["elapsed_ms"])
+            packed.append(result["tokens"])
+            paths = {snippet["path"] for snippet in result["snippets"]}
+            whole.append(sum(chunk["tokens"] for path in paths for chunk in packer.files[path]["chunks"]))
+        return {
+            "files": len(packer.files),
+            "snippets": packer.chunk_count,
+            "cold_index_ms": round(cold_ms, 1),
+            "warm_pack_ms": {"mean": round(sum(times) / len(times), 3), "max": round(max(times), 3)},
+            "avg_packed_tokens": round(sum(packed) / len(packed)),
+            "avg_whole_file_tokens": round(sum(whole) / len(whole)),
+            "reduction_pct": round(100 * (1 - sum(packed) / max(1, sum(whole))), 1)
+        }
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "bench"
+    if command == "pack" and len(sys.argv) > 2:
+        budget = int(sys.argv[3]) if len(sys.argv) > 3 else None
+        result = get_packer().pack(sys.argv[2], budget)
+        print(f"📦 {len(result['snippets'])} snippets, {result['tokens']} tokens in {result['elapsed_ms']}ms")
+        print(json.dumps(result["snippets"], indent=2))
+        print(result["context"])
+    elif command == "index":
+        packer = get_packer()
+        changed = packer.refresh(force=True)
+        print(f"📦 Indexed {len(packer.files)} files ({changed} updated), {packer.chunk_count} snippets")
+    elif command == "bench":
+        print("📦 Context Packer Benchmark:")
+        print(json.dumps(benchmark(), indent=2))
+    else:
+        print(f"❌ Unknown command: {command}")
+        print("Usage: python3 context_packer.py [pack \"<prompt>\" [budget]|index|bench]")
@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+"""
+Delta Deploy for Anders
+Content-hash manifest of the build output; uploads only what changed over parallel FTP/SFTP connections
+"""
+
+import argparse
+import ftplib
+import hashlib
+import io
+import json
+import os
+import posixpath
+import queue
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+from agent_db import get_database
+from tracing import span, traced
+from workspace_manager import default_project_root
+
+# Where earlier versions kept the manifest: inside the deploy directory, i.e. publicly downloadable
+LEGACY_MANIFEST_NAME = ".anders-manifest.json"
+MANIFEST_VERSION = 1
+HASH_CHUNK = 1 << 20
+
+
+class DeployError(RuntimeError):
+    pass
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def build_manifest(out_dir):
+    """{"version", "files": {relative posix path: {"sha256", "size"}}} for every file under `out_dir`"""
+    out_dir = Path(out_dir)
+    if not out_dir.is_dir():
+        raise DeployError(f"Build output {out_dir} does not exist; run `npm run build` first")
+    files = {}
+    for directory, dirnames, filenames in os.walk(out_dir):
+        dirnames.sort()
+        for name in sorted(filenames):
+            path = Path(directory, name)
+            relative = path.relative_to(out_dir).as_posix()
+            if relative == LEGACY_MANIFEST_NAME:
+                continue
+            files[relative] = {"sha256": file_sha256(path), "size": path.stat().st_size}
+    return {"version": MANIFEST_VERSION, "files": files}
+
+
+def manifest_digest(manifest):
+    """Short content hash of the whole build, used as the deployment version"""
+    return hashlib.sha256(json.dumps(manifest["files"], sort_keys=True).encode()).hexdigest()[:12]
+
+
+def default_manifest_path(remote_dir):
+    """Outside the web root: a per-target file under /.anders in the account's login directory
+
+    It describes what the last successful deploy left on the server, i.e. the site's full file list.
+    """
+    slug = remote_dir.strip("/").replace("/", "_") or "root"
+    return f"/.anders/{slug}.manifest.json"
+
+
+def directories(paths):
+    """Every parent directory of `paths`, excluding the root"""
+    found = set()
+    for path in paths:
+        parent = posixpath.dirname(path)
+        while parent and parent not in found:
+            found.add(parent)
+            parent = posixpath.dirname(parent)
+    return found
+
+
+def diff_manifests(previous, current):
+    """Paths to upload (new or changed) and delete (gone from the build), plus the unchanged count"""
+    old = (previous or {}).get("files", {})
+    new = current["files"]
+    upload = [path for path, entry in new.items() if old.get(path, {}).get("sha256") != entry["sha256"]]
+    delete = sorted(set(old) - set(new))
+    return {
+        "upload": upload,
+        "delete": delete,
+        "unchanged": len(new) - len(upload),
+        # Created before uploading; directories the old build already had exist on the server
+        "mkdirs": sorted(directories(upload) - directories(old), key=lambda d: (d.count("/"), d)),
+        # Removed after deleting, deepest first
+        "rmdirs": sorted(directories(old) - directories(new), key=lambda d: (-d.count("/"), d))
+    }
+
+
+class FTPTransport:
+    """ftplib (optionally FTPS) rooted at the remote deploy directory"""
+
+    def __init__(self, host, user, password, remote_dir, port=21, tls=False, timeout=30):
+        ftp = (ftplib.FTP_TLS if tls else ftplib.FTP)(timeout=timeout)
+        ftp.connect(host, port)
+        ftp.login(user, password)
+        if tls:
+            ftp.prot_p()
+        self.ftp = ftp
+        self.remote_dir = remote_dir.rstrip("/") or "/"
+
+    def remote(self, path):
+        # Absolute paths (the manifest) are taken as they are; the rest are relative to the deploy directory
+        return posixpath.join(self.remote_dir, path)
+
+    def read(self, path):
+        buffer = io.BytesIO()
+        try:
+            self.ftp.retrbinary(f"RETR {self.remote(path)}", buffer.write)
+        except ftplib.error_perm:
+            return None
+        return buffer.getvalue()
+
+    def upload(self, local, path):
+        with open(local, "rb") as f:
+            self.ftp.storbinary(f"STOR {self.remote(path)}", f)
+
+    def upload_bytes(self, data, path):
+        self.ftp.storbinary(f"STOR {self.remote(path)}", io.BytesIO(data))
+
+    def mkdir(self, path):
+        try:
+            self.ftp.mkd(self.remote(path))
+        except ftplib.error_perm:
+            pass  # already exists
+
+    def delete(self, path):
+        try:
+            self.ftp.delete(self.remote(path))
+        except ftplib.error_perm:
+            pass  # already gone
+
+    def rmdir(self, path):
+        try:
+            self.ftp.rmd(self.remote(path))
+        except ftplib.error_perm:
+            pass  # not empty: something outside the manifest lives there
+
+    def close(self):
+        try:
+            self.ftp.quit()
+        except (ftplib.Error, OSError):
+            self.ftp.close()
+
+
+class SFTPTransport:
+    """paramiko SFTP rooted at the remote deploy directory (SiteGround SSH listens on 18765)"""
+
+    def __init__(self, host, user, password, remote_dir, port=18765, timeout=30):
+        try:
+            import paramiko
+        except ImportError:
+            raise DeployError("SFTP deploys need paramiko installed (pip install paramiko)")
+        self.client = paramiko.SSHClient()
+        # Unknown or changed host keys are refused: accepting them would hand the password to any MITM
+        self.client.load_system_host_keys()
+        known_hosts = os.path.expanduser(os.getenv('ANDERS_DEPLOY_KNOWN_HOSTS', '~/.ssh/known_hosts'))
+        if os.path.exists(known_hosts):
+            self.client.load_host_keys(known_hosts)
+        pinned = os.getenv('ANDERS_DEPLOY_HOST_KEY')
+        if pinned:
+            # e.g. "ssh-ed25519 AAAAC3Nz..." as printed by `ssh-keyscan -p 18765 <host>`
+            name = host if port == 22 else f"[{host}]:{port}"
+            entry = paramiko.hostkeys.HostKeyEntry.from_line(f"{name} {pinned.strip()}")
+            if entry is None:
+                raise DeployError("ANDERS_DEPLOY_HOST_KEY must look like '<key type> <base64 key>'")
+            self.client.get_host_keys().add(name, entry.key.get_name(), entry.key)
+        self.client.set_missing_host_key_policy(paramiko.RejectPolicy())
+        key = os.getenv('ANDERS_DEPLOY_KEY_FILE')
+        self.client.connect(host, port=port, username=user, password=password or None,
+                            key_filename=os.path.expanduser(key) if key else None, timeout=timeout)
+        self.sftp = self.client.open_sftp()
+        self.remote_dir = remote_dir.rstrip("/") or "/"
+
+    def remote(self, path):
+        return posixpath.join(self.remote_dir, path)
+
+    def read(self, path):
+        try:
+            with self.sftp.open(self.remote(path), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def upload(self, local, path):
+        self.sftp.put(str(local), self.remote(path))
+
+    def upload_bytes(self, data, path):
+        self.sftp.putfo(io.BytesIO(data), self.remote(path))
+
+    def mkdir(self, path):
+        try:
+            self.sftp.mkdir(self.remote(path))
+        except OSError:
+            pass
+
+    def delete(self, path):
+        try:
+            self.sftp.remove(self.remote(path))
+        except FileNotFoundError:
+            pass
+
+    def rmdir(self, path):
+        try:
+            self.sftp.rmdir(self.remote(path))
+        except OSError:
+            pass
+
+    def close(self):
+        self.client.close()
+
+
+def transport_factory(protocol=None, host=None, user=None, password=None, remote_dir=None, port=None):
+    """Connection factory from arguments, else SITEGROUND_* credentials and ANDERS_DEPLOY_* settings"""
+    protocol = protocol or os.getenv('ANDERS_DEPLOY_PROTOCOL', 'ftp')
+    host = host or os.getenv('SITEGROUND_HOST')
+    user = user or os.getenv('SITEGROUND_USER', '')
+    password = password if password is not None else os.getenv('SITEGROUND_PASSWORD', '')
+    remote_dir = remote_dir or os.getenv('ANDERS_DEPLOY_DIR', '/public_html/command-center/')
+    port = port or (int(os.getenv('ANDERS_DEPLOY_PORT')) if os.getenv('ANDERS_DEPLOY_PORT') else None)
+    if not host:
+        raise DeployError("No deploy host configured. Set SITEGROUND_HOST.")
+    if protocol in ("ftp", "ftps"):
+        return lambda: FTPTransport(host, user, password, remote_dir, port or 21, tls=protocol == "ftps")
+    if protocol == "sftp":
+        return lambda: SFTPTransport(host, user, password, remote_dir, port or 18765)
+    raise DeployError(f"Unknown deploy protocol {protocol!r} (ftp, ftps or sftp)")
+
+
+class TransportPool:
+    """Up to `size` open connections, created on demand and replaced when a transfer fails"""
+
+    def __init__(self, factory, size):
+        self.factory = factory
+        self.size = size
+        self.idle = queue.LifoQueue()
+        self.lock = threading.Lock()
+        self.opened = 0
+        self.all = []
+
+    @contextmanager
+    def connection(self):
+        try:
+            transport = self.idle.get_nowait()
+        except queue.Empty:
+            transport = self.factory()
+            with self.lock:
+                self.opened += 1
+                self.all.append(transport)
+        try:
+            yield transport
+        except (ftplib.Error, OSError, EOFError):
+            # The control connection may be mid-reply; never hand it out again
+            with self.lock:
+                self.all.remove(transport)
+            transport.close()
+            raise
+        self.idle.put(transport)
+
+    def close(self):
+        with self.lock:
+            transports, self.all = self.all, []
+        for transport in transports:
+            transport.close()
+
+
+class DeltaDeployer:
+    """Diffs the build against the server's manifest and syncs the difference, recorded in `deployments`"""
+
+    def __init__(self, out_dir=None, factory=None, connections=None, retries=2, database=None, manifest_path=None):
+        self.out_dir = Path(out_dir or default_project_root() / "out")
+        self.factory = factory or transport_factory()
+        self.manifest_path = manifest_path or os.getenv('ANDERS_DEPLOY_MANIFEST') or default_manifest_path(
+            os.getenv('ANDERS_DEPLOY_DIR', '/public_html/command-center/'))
+        self.connections = connections or int(os.getenv('ANDERS_DEPLOY_CONNECTIONS', '4'))
+        self.retries = retries
+        self.database = database
+
+    def transfer(self, pool, operation, path):
+        """Run operation(transport, path) on a pooled connection, reconnecting on failure"""
+        for attempt in range(self.retries + 1):
+            try:
+                with pool.connection() as transport:
+                    return operation(transport, path)
+            except (ftplib.error_temp, ftplib.error_reply, OSError, EOFError):
+                if attempt == self.retries:
+                    raise
+
+    def parallel(self, pool, operation, paths):
+        if not paths:
+            return
+        with ThreadPoolExecutor(max_workers=self.connections, thread_name_prefix="anders-deploy") as executor:
+            # list() re-raises the first failure
+            list(executor.map(lambda path: self.transfer(pool, operation, path), paths))
+
+    @traced("deploy.run")
+    def deploy(self, full=False, dry_run=False):
+        started = time.perf_counter()
+        with span("deploy.manifest"):
+            manifest = build_manifest(self.out_dir)
+        version = manifest_digest(manifest)
+        deployment_id = None if dry_run else self.record_start(version)
+        pool = TransportPool(self.factory, self.connections)
+        try:
+            with pool.connection() as transport:
+                previous = None
+                if not full:
+                    # Falls back to the in-web-root manifest of earlier deploys, which this one removes
+                    previous = transport.read(self.manifest_path) or transport.read(LEGACY_MANIFEST_NAME)
+                previous = json.loads(previous) if previous else None
+                if previous and previous.get("version") != MANIFEST_VERSION:
+                    previous = None
+                plan = diff_manifests(previous, manifest)
+                if not dry_run:
+                    with span("deploy.mkdir", dirs=len(plan["mkdirs"])):
+                        for directory in plan["mkdirs"]:
+                            transport.mkdir(directory)
+
+            result = {
+                "success": True,
+                "version": version,
+                "upload": len(plan["upload"]),
+                "delete": len(plan["delete"]),
+                "unchanged": plan["unchanged"],
+                "bytes": sum(manifest["files"][path]["size"] for path in plan["upload"]),
+                "full": previous is None
+            }
+            if dry_run:
+                result.update(dry_run=True, paths={"upload": plan["upload"], "delete": plan["delete"]})
+                return result
+
+            with span("deploy.upload", files=len(plan["upload"])):
+                self.parallel(pool, lambda t, path: t.upload(self.out_dir / path, path), plan["upload"])
+            with span("deploy.delete", files=len(plan["delete"])):
+                self.parallel(pool, lambda t, path: t.delete(path), plan["delete"])
+            with pool.connection() as transport:
+                for directory in plan["rmdirs"]:
+                    transport.rmdir(directory)
+                # Last, so an interrupted deploy is simply redone against the previous manifest
+                transport.mkdir(posixpath.dirname(self.manifest_path))
+                transport.upload_bytes(json.dumps(manifest, sort_keys=True).encode(), self.manifest_path)
+                transport.delete(LEGACY_MANIFEST_NAME)
+
+            result.update(connections=pool.opened, elapsed_ms=round((time.perf_counter() - started) * 1000, 1))
+            self.record_finish(deployment_id, "success")
+            return result
+        except Exception as e:
+            self.record_finish(deployment_id, "failed", str(e))
+            return {"success": False, "version": version, "error": str(e)}
+        finally:
+            pool.close()
+
+    def record_start(self, version):
+        database = self.database or get_database()
+        if database is None:
+            return None
+        try:
+            project = database.fetchone("SELECT id FROM projects WHERE name = ?",
+                                        (os.getenv('ANDERS_DEPLOY_PROJECT', 'Command Center'),))
+            return database.execute(
+                "INSERT INTO deployments (project_id, agent_id, version, status, commit_hash, branch, deploy_url) "
+                "VALUES (?, ?, ?, 'deploying', ?, ?, ?)",
+                (project[0] if project else None, database.agent_id("Anders"), version, commit_hash(),
+                 os.getenv('GITHUB_REF_NAME', 'main'), os.getenv('ANDERS_DEPLOY_URL') or None)
+            )["lastrowid"]
+        except Exception as e:
+            print(f"⚠️ Could not record deployment: {e}", file=sys.stderr)
+            return None
+
+    def record_finish(self, deployment_id, status, error=None):
+        if deployment_id is None:
+            return
+        database = self.database or get_database()
+        try:
+            database.execute(
+                "UPDATE deployments SET status = ?, error_message = ?, completed_at = ? WHERE id = ?",
+                (status, error, datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"), deployment_id)
+            )
+        except Exception as e:
+            print(f"⚠️ Could not record deployment: {e}", file=sys.stderr)
+
+
+def commit_hash():
+    """GITHUB_SHA in Actions, else the local HEAD"""
+    if os.getenv('GITHUB_SHA'):
+        return os.getenv('GITHUB_SHA')
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=default_project_root(), capture_output=True,
+                              text=True, check=True).stdout.strip() or None
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return None
+
+
+def benchmark(files=300, latency=0.02, connections=4):
+    """Full deploy of a synthetic build to a local FTP stub, then a one-file change"""
+    import tempfile
+    from stub_ftp_server import StubFTPServer
+    with tempfile.TemporaryDirectory() as tmp:
+        out_dir = Path(tmp)
+        for i in range(files):
+            path = out_dir / f"_next/static/chunk_{i % 20}/{i}.js"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(f"console.log({i});\n" * 50)
+        server = StubFTPServer(latency=latency)
+        port = server.start()
+        factory = lambda: FTPTransport("127.0.0.1", "bench", "bench", "/", port)
+        try:
+            full = DeltaDeployer(out_dir, factory, connections).deploy()
+            (out_dir / "_next/static/chunk_0/0.js").write_text("console.log('changed');\n")
+            delta = DeltaDeployer(out_dir, factory, connections).deploy()
+            serial = DeltaDeployer(out_dir, factory, 1).deploy(full=True)
+        finally:
+            server.stop()
+    return {"files": files, "latency_ms": latency * 1000, "connections": connections,
+            "full_ms": full.get("elapsed_ms"), "full_serial_ms": serial.get("elapsed_ms"),
+            "one_file_ms": delta.get("elapsed_ms"), "one_file_uploaded": delta.get("upload")}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Delta deploy of the static build to SiteGround")
+    parser.add_argument("command", nargs="?", default="deploy", choices=["deploy", "manifest", "bench"])
+    parser.add_argument("out_dir", nargs="?", help="Build output (default: <project>/out)")
+    parser.add_argument("--full", action="store_true", help="Ignore the server manifest and upload everything")
+    parser.add_argument("--dry-run", action="store_true", help="Show what would change without touching files")
+    parser.add_argument("--connections", type=int, help="Parallel connections (ANDERS_DEPLOY_CONNECTIONS)")
+    args = parser.parse_args()
+
+    if args.command == "manifest":
+        manifest = build_manifest(args.out_dir or default_project_root() / "out")
+        print(json.dumps({"version": manifest_digest(manifest), **manifest}, indent=2))
+    elif args.command == "bench":
+        print("🚚 Delta Deploy Benchmark:")
+        print(json.dumps(benchmark(connections=args.connections or 4), indent=2))
+    else:
+        try:
+            deployer = DeltaDeployer(args.out_dir, connections=args.connections)
+            result = deployer.deploy(full=args.full, dry_run=args.dry_run)
+        except DeployError as e:
+            result = {"success": False, "error": str(e)}
+        print("🚚 Delta Deploy:")
+        print(json.dumps(result, indent=2))
+        sys.exit(0 if result["success"] else 1)
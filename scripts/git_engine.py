@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+"""
+Git Engine for Anders
+Status, staging of explicit paths and commits in-process (pygit2 or dulwich), with a git CLI fallback
+"""
+
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+from workspace_manager import default_project_root
+
+DEFAULT_AUTHOR = ("Anders", "anders@ai-agent.dev")
+
+
+class GitError(RuntimeError):
+    pass
+
+
+def author_identity():
+    """GIT_AUTHOR_* from the environment, else None so the backend uses the repository config"""
+    name, email = os.getenv('GIT_AUTHOR_NAME'), os.getenv('GIT_AUTHOR_EMAIL')
+    return (name, email) if name and email else None
+
+
+def parse_porcelain_v2(output):
+    """Parse `git status --porcelain=v2 -z` records into {path, status} dicts"""
+    records = output.split("\0")
+    changes = []
+    i = 0
+    while i < len(records):
+        record = records[i]
+        i += 1
+        if not record:
+            continue
+        kind = record[0]
+        if kind == "1":
+            fields = record.split(" ", 8)
+            changes.append({"status": fields[1], "path": fields[8]})
+        elif kind == "2":
+            fields = record.split(" ", 9)
+            # Renames/copies are followed by the original path as its own record
+            changes.append({"status": fields[1], "path": fields[9], "from": records[i]})
+            i += 1
+        elif kind == "u":
+            fields = record.split(" ", 10)
+            changes.append({"status": fields[1], "path": fields[10]})
+        elif kind == "?":
+            changes.append({"status": "??", "path": record[2:]})
+    return changes
+
+
+class SubprocessBackend:
+    """The git CLI; explicit pathspecs instead of `add .` keep staging off the full tree"""
+
+    name = "subprocess"
+
+    def __init__(self, root):
+        self.root = root
+
+    def git(self, *args):
+        try:
+            result = subprocess.run(["git", *args], cwd=self.root, capture_output=True, text=True,
+                                    env={**os.environ, "GIT_OPTIONAL_LOCKS": "0"})
+        except FileNotFoundError as e:
+            raise GitError(f"git is not installed or {self.root} does not exist: {e}")
+        if result.returncode != 0:
+            raise GitError(result.stderr.strip() or f"git {args[0]} exited with {result.returncode}")
+        return result.stdout
+
+    def is_repo(self):
+        return (self.root / ".git").exists()
+
+    def init(self):
+        self.git("init", "-q")
+
+    def status(self):
+        return parse_porcelain_v2(self.git("status", "--porcelain=v2", "-z"))
+
+    def stage(self, paths):
+        # --all also stages deletions of the listed paths
+        self.git("add", "--all", "--", *paths)
+
+    def commit(self, message, author=None):
+        identity = ["-c", f"user.name={author[0]}", "-c", f"user.email={author[1]}"] if author else []
+        try:
+            self.git(*identity, "commit", "-q", "-m", message)
+        except GitError:
+            # Nothing staged is not an error for callers; anything else is
+            if not self.git("diff", "--cached", "--name-only", "-z"):
+                return None
+            raise
+        return self.git("rev-parse", "HEAD").strip()
+
+
+class Pygit2Backend:
+    """libgit2 with one Index object per repository, re-read only when the file on disk changes"""
+
+    name = "pygit2"
+
+    def __init__(self, root):
+        import pygit2
+        self.pygit2 = pygit2
+        self.root = root
+        self.repo = None
+        self.index = None
+
+    def open(self):
+        self.repo = self.pygit2.Repository(str(self.root))
+        self.index = self.repo.index
+
+    def is_repo(self):
+        # Checked on disk until found, like SubprocessBackend: the repository may be created after us (git init)
+        if self.repo is None and (self.root / ".git").exists():
+            self.open()
+        return self.repo is not None
+
+    def init(self):
+        self.pygit2.init_repository(str(self.root))
+        self.open()
+
+    def status(self):
+        p = self.pygit2
+        changes = []
+        for path, flags in self.repo.status().items():
+            if flags & p.GIT_STATUS_IGNORED:
+                continue
+            if flags == p.GIT_STATUS_WT_NEW:
+                changes.append({"status": "??", "path": path})
+                continue
+            staged = ("A" if flags & p.GIT_STATUS_INDEX_NEW else "M" if flags & p.GIT_STATUS_INDEX_MODIFIED
+                      else "D" if flags & p.GIT_STATUS_INDEX_DELETED else "R" if flags & p.GIT_STATUS_INDEX_RENAMED
+                      else ".")
+            worktree = ("M" if flags & p.GIT_STATUS_WT_MODIFIED else "D" if flags & p.GIT_STATUS_WT_DELETED
+                        else ".")
+            changes.append({"status": staged + worktree, "path": path})
+        return changes
+
+    def stage(self, paths):
+        self.index.read(False)
+        for path in paths:
+            if (self.root / path).exists():
+                self.index.add(path)
+            elif path in self.index:
+                self.index.remove(path)
+        self.index.write()
+
+    def commit(self, message, author=None):
+        self.index.read(False)
+        tree = self.index.write_tree()
+        parents = [] if self.repo.head_is_unborn else [self.repo.head.target]
+        if parents and self.repo[parents[0]].tree_id == tree:
+            return None
+        if author:
+            signature = self.pygit2.Signature(*author)
+        else:
+            try:
+                signature = self.repo.default_signature
+            except (KeyError, self.pygit2.GitError):
+                signature = self.pygit2.Signature(*DEFAULT_AUTHOR)
+        return str(self.repo.create_commit("HEAD", signature, signature, message, tree, parents))
+
+
+class DulwichBackend:
+    """Pure-Python git; the index is loaded from disk once per call"""
+
+    name = "dulwich"
+
+    def __init__(self, root):
+        from dulwich import porcelain
+        from dulwich.repo import Repo
+        self.porcelain = porcelain
+        self.Repo = Repo
+        self.root = root
+        self.repo = None
+
+    def is_repo(self):
+        if self.repo is None and (self.root / ".git").exists():
+            self.repo = self.Repo(str(self.root))
+        return self.repo is not None
+
+    def init(self):
+        self.repo = self.Repo.init(str(self.root))
+
+    def status(self):
+        # File-level untracked paths: stage() cannot take a directory
+        result = self.porcelain.status(self.repo, untracked_files="all")
+        decode = lambda path: path.decode() if isinstance(path, bytes) else path
+        changes = []
+        for kind, code in (("add", "A."), ("modify", "M."), ("delete", "D.")):
+            changes += [{"status": code, "path": decode(path)} for path in result.staged[kind]]
+        changes += [{"status": ".M", "path": decode(path)} for path in result.unstaged]
+        changes += [{"status": "??", "path": decode(path)} for path in result.untracked]
+        return changes
+
+    def worktree(self):
+        # dulwich 0.23+ moved stage/commit from Repo to WorkTree
+        return self.repo.get_worktree() if hasattr(self.repo, "get_worktree") else self.repo
+
+    def stage(self, paths):
+        # stage() drops paths that no longer exist from the index
+        self.worktree().stage([str(path) for path in paths])
+
+    def commit(self, message, author=None):
+        tree = self.repo.open_index().commit(self.repo.object_store)
+        try:
+            if self.repo[self.repo.head()].tree == tree:
+                return None
+        except KeyError:
+            pass
+        if author:
+            identity = f"{author[0]} <{author[1]}>".encode()
+        else:
+            try:
+                identity = self.porcelain.get_user_identity(self.repo.get_config_stack())
+            except Exception:
+                identity = f"{DEFAULT_AUTHOR[0]} <{DEFAULT_AUTHOR[1]}>".encode()
+        worktree = self.worktree()
+        commit = worktree.commit if worktree is not self.repo else self.repo.do_commit
+        return commit(message=message.encode(), committer=identity, author=identity).decode()
+
+
+BACKENDS = {"pygit2": Pygit2Backend, "dulwich": DulwichBackend, "subprocess": SubprocessBackend}
+
+
+class GitEngine:
+    """One repository, one backend and a lock; shared per project root through get_git_engine()"""
+
+    def __init__(self, root=None, backend=None):
+        self.root = Path(root or default_project_root())
+        # auto: pygit2 when installed, else the git CLI. `git_engine.py check` compares a backend with the CLI.
+        choice = backend or os.getenv('ANDERS_GIT_BACKEND', 'auto')
+        # dulwich is slower than the CLI on real trees (see `bench`), so auto never picks it
+        names = ["pygit2", "subprocess"] if choice == "auto" else [choice]
+        self.backend = None
+        for name in names:
+            try:
+                self.backend = BACKENDS[name](self.root)
+                break
+            except ImportError:
+                continue
+        if self.backend is None:
+            raise GitError(f"git backend {choice!r} is not available")
+        self.lock = threading.Lock()
+        self.stats = {"commits": 0, "paths_staged": 0, "commit_ms": 0.0}
+
+    def is_repo(self):
+        return self.backend.is_repo()
+
+    def init(self):
+        with self.lock:
+            if not self.backend.is_repo():
+                self.backend.init()
+
+    def status(self):
+        """[{path, status}] with porcelain v2 XY codes ('.M', 'A.', '??')"""
+        with self.lock:
+            if not self.backend.is_repo():
+                raise GitError(f"{self.root} is not a git repository")
+            return self.backend.status()
+
+    def changed_paths(self):
+        return [change["path"] for change in self.status()]
+
+    def stage(self, paths):
+        paths = sorted({str(path) for path in paths})
+        if paths:
+            with self.lock:
+                self.backend.stage(paths)
+                self.stats["paths_staged"] += len(paths)
+        return paths
+
+    def commit(self, message, paths=None, author=None):
+        """Stage `paths` (every changed path when None) and commit; returns the new sha or None if unchanged"""
+        started = time.perf_counter()
+        with self.lock:
+            if paths is None:
+                paths = [change["path"] for change in self.backend.status()]
+            paths = sorted({str(path) for path in paths})
+            if paths:
+                self.backend.stage(paths)
+                self.stats["paths_staged"] += len(paths)
+            sha = self.backend.commit(message, author or author_identity())
+            if sha:
+                self.stats["commits"] += 1
+            self.stats["commit_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            return sha
+
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def get_git_engine(root=None):
+    """Shared engine per project root so the backend's index stays loaded between calls"""
+    root = str(Path(root or default_project_root()).resolve())
+    with _engines_lock:
+        if root not in _engines:
+            _engines[root] = GitEngine(root)
+        return _engines[root]
+
+
+def check(names=None):
+    """Run the same init/commit/stage/delete sequence on each installed backend and verify it with the git CLI
+
+    Returns {backend: "ok" | "not installed" | failure message}.
+    """
+    import tempfile
+    results = {}
+    for name in names or list(BACKENDS):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            try:
+                engine = GitEngine(root, name)
+            except GitError:
+                results[name] = "not installed"
+                continue
+            cli = SubprocessBackend(root)
+            author = ("check", "check@localhost")
+            try:
+                # Repository created behind the engine's back, as `hybrid_coding_agent.py init_git` would
+                cli.git("init", "-q")
+                assert engine.is_repo(), "repository created after the engine was not seen"
+                (root / "src").mkdir()
+                for path in ("README.md", "src/a.ts", "src/b.ts"):
+                    (root / path).write_text(f"// {path}\n")
+                # Untracked directories may be listed whole ("src/"), as `git status` does by default
+                assert "README.md" in engine.changed_paths(), "untracked file missing from status"
+                assert engine.commit("initial", author=author), "initial commit returned no sha"
+                tree = cli.git("ls-tree", "-r", "--name-only", "HEAD").split()
+                assert tree == ["README.md", "src/a.ts", "src/b.ts"], f"initial tree {tree}"
+
+                (root / "src/a.ts").write_text("// changed\n")
+                (root / "src/b.ts").unlink()
+                (root / "src/c.ts").write_text("// new\n")
+                (root / "notes.txt").write_text("not staged\n")
+                sha = engine.commit("update", ["src/a.ts", "src/b.ts", "src/c.ts"], author=author)
+                assert sha == cli.git("rev-parse", "HEAD").strip(), "returned sha is not HEAD"
+                tree = cli.git("ls-tree", "-r", "--name-only", "HEAD").split()
+                assert tree == ["README.md", "src/a.ts", "src/c.ts"], f"committed tree {tree}"
+                assert cli.git("show", "HEAD:src/a.ts") == "// changed\n", "modified content not committed"
+                left = [change["path"] for change in parse_porcelain_v2(cli.git("status", "--porcelain=v2", "-z"))]
+                assert left == ["notes.txt"], f"left uncommitted {left}"
+                assert engine.commit("no-op", ["src/a.ts"], author=author) is None, "empty commit was created"
+                results[name] = "ok"
+            except (AssertionError, GitError) as e:
+                results[name] = f"failed: {e}"
+            except Exception as e:
+                results[name] = f"failed: {type(e).__name__}: {e}"
+    return results
+
+
+def benchmark(files=5, tree_files=2000, backend=None):
+    """Commit a few generated files in a repository of `tree_files` files: `add .` via the CLI vs the engine"""
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        for i in range(tree_files):
+            directory = root / "src" / f"module_{i % 50}"
+            directory.mkdir(parents=True, exist_ok=True)
+            (directory / f"file_{i}.ts").write_text(f"export const value_{i} = {i};\n")
+        engine = GitEngine(root, backend)
+        engine.init()
+        author = ("bench", "bench@localhost")
+        engine.commit("initial", author=author)
+
+        def write(round_):
+            paths = [f"src/generated/component_{i}.tsx" for i in range(files)]
+            for path in paths:
+                (root / path).parent.mkdir(parents=True, exist_ok=True)
+                (root / path).write_text(f"export const round = {round_};\n")
+            return paths
+
+        cli = SubprocessBackend(root)
+        identity = ["-c", "user.name=bench", "-c", "user.email=bench@localhost"]
+        started = time.perf_counter()
+        for round_ in range(5):
+            write(round_)
+            cli.git("status", "--porcelain")
+            cli.git("add", ".")
+            cli.git(*identity, "commit", "-q", "-m", f"cli {round_}")
+        add_all_ms = (time.perf_counter() - started) / 5 * 1000
+
+        started = time.perf_counter()
+        for round_ in range(5, 10):
+            engine.commit(f"engine {round_}", write(round_), author=author)
+        engine_ms = (time.perf_counter() - started) / 5 * 1000
+        return {"backend": engine.backend.name, "tree_files": tree_files, "files_per_commit": files,
+                "git_add_all_commit_ms": round(add_all_ms, 2), "engine_commit_ms": round(engine_ms, 2)}
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "status"
+    if command == "status":
+        engine = get_git_engine(sys.argv[2] if len(sys.argv) > 2 else None)
+        print(f"🌿 Git status ({engine.backend.name}):")
+        try:
+            print(json.dumps(engine.status(), indent=2))
+        except GitError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+    elif command == "check":
+        results = check(sys.argv[2:] or None)
+        print("🌿 Git Backend Check:")
+        print(json.dumps(results, indent=2))
+        sys.exit(0 if all(r in ("ok", "not installed") for r in results.values()) else 1)
+    elif command == "bench":
+        print("🌿 Git Engine Benchmark:")
+        print(json.dumps(benchmark(backend=sys.argv[2] if len(sys.argv) > 2 else None), indent=2))
+    else:
+        print(f"❌ Unknown command: {command}")
+        print("Usage: python3 git_engine.py [status [root]|check [backend ...]|bench [backend]]")
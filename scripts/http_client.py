@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Pooled HTTP client for Anders
+Keep-alive connection pool with timeouts, retries and jittered backoff
+"""
+
+import math
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class PooledHTTPClient:
+    def __init__(self, pool_size=None, connect_timeout=None, read_timeout=None,
+                 max_retries=None, backoff_base=0.5, backoff_max=30.0):
+        self.pool_size = pool_size or int(os.getenv('ANDERS_HTTP_POOL_SIZE', '16'))
+        self.connect_timeout = connect_timeout or float(os.getenv('ANDERS_HTTP_CONNECT_TIMEOUT', '5'))
+        self.read_timeout = read_timeout or float(os.getenv('ANDERS_HTTP_READ_TIMEOUT', '120'))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv('ANDERS_HTTP_MAX_RETRIES', '4'))
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self.session = requests.Session()
+        self.adapter = None
+        self.lock = threading.Lock()
+        self.counter_lock = threading.Lock()
+        self.local = threading.local()
+        # Connection counts of adapters replaced by a larger pool, kept for connection_stats()
+        self.retired = {"new_connections": 0, "pooled_requests": 0}
+        self.mount_adapter(self.pool_size)
+
+        self.requests_sent = 0
+        self.retries = 0
+
+    def mount_adapter(self, pool_size):
+        # Retries are handled here so Retry-After and jitter are under our control
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=0,
+            pool_block=True
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        previous, self.adapter = self.adapter, adapter
+        self.pool_size = pool_size
+        if previous is not None:
+            for key, value in self.adapter_counts(previous).items():
+                self.retired[key] += value
+            # Closes its idle sockets; connections still in use are closed as their requests return them
+            previous.close()
+
+    def ensure_pool_size(self, pool_size):
+        """Grow the pool so `pool_size` concurrent requests never block on a connection"""
+        with self.lock:
+            if pool_size > self.pool_size:
+                self.mount_adapter(pool_size)
+
+    @contextmanager
+    def deadline(self, seconds):
+        """Requests from this thread inside the block give up `seconds` from now (None: no deadline)"""
+        previous = getattr(self.local, "deadline", None)
+        self.local.deadline = time.monotonic() + seconds if seconds is not None else None
+        try:
+            yield
+        finally:
+            self.local.deadline = previous
+
+    def backoff_delay(self, attempt, response=None):
+        """Jittered exponential backoff, honouring Retry-After when present"""
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after:
+                try:
+                    seconds = float(retry_after)
+                    # "-1" or "nan" would make time.sleep raise; an unusable value means our own backoff
+                    if math.isfinite(seconds):
+                        return min(max(seconds, 0.0), self.backoff_max)
+                except ValueError:
+                    try:
+                        delta = parsedate_to_datetime(retry_after).timestamp() - time.time()
+                        return min(max(delta, 0.0), self.backoff_max)
+                    except (TypeError, ValueError):
+                        pass
+        ceiling = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    def request(self, method, url, timeout=None, **kwargs):
+        """Send a request through the pool, retrying on 429/5xx and connection errors
+
+        Inside deadline() the timeouts shrink to the time left and no retry starts past it.
+        """
+        timeout = timeout or (self.connect_timeout, self.read_timeout)
+        if not isinstance(timeout, tuple):
+            timeout = (timeout, timeout)
+        deadline = getattr(self.local, "deadline", None)
+        attempt = 0
+        while True:
+            attempt_timeout = timeout
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise requests.Timeout(f"Deadline passed before {method} {url}")
+                attempt_timeout = (min(timeout[0], remaining), min(timeout[1], remaining))
+            with self.counter_lock:
+                self.requests_sent += 1
+            try:
+                response = self.session.request(method, url, timeout=attempt_timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                delay = self.backoff_delay(attempt)
+                if attempt >= self.max_retries or self.past(deadline, delay):
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    return response
+                delay = self.backoff_delay(attempt, response)
+                if self.past(deadline, delay):
+                    return response
+                response.close()
+            attempt += 1
+            with self.counter_lock:
+                self.retries += 1
+            time.sleep(delay)
+
+    @staticmethod
+    def past(deadline, delay):
+        return deadline is not None and time.monotonic() + delay >= deadline
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    @staticmethod
+    def adapter_counts(adapter):
+        counts = {"new_connections": 0, "pooled_requests": 0}
+        for pool in adapter.poolmanager.pools._container.values():
+            counts["new_connections"] += pool.num_connections
+            counts["pooled_requests"] += pool.num_requests
+        return counts
+
+    def connection_stats(self):
+        """Report new vs reused connections across all host pools, replaced adapters included"""
+        counts = self.adapter_counts(self.adapter)
+        new_connections = counts["new_connections"] + self.retired["new_connections"]
+        pooled_requests = counts["pooled_requests"] + self.retired["pooled_requests"]
+        with self.counter_lock:
+            requests_sent, retries = self.requests_sent, self.retries
+        return {
+            "pool_size": self.pool_size,
+            "requests_sent": requests_sent,
+            "retries": retries,
+            "new_connections": new_connections,
+            "reused_connections": max(pooled_requests - new_connections, 0)
+        }
+
+    def close(self):
+        self.session.close()
+
+
+_shared_client = None
+
+
+def get_shared_client():
+    """Process-wide client so every caller shares one connection pool"""
+    global _shared_client
+    if _shared_client is None:
+        _shared_client = PooledHTTPClient()
+    return _shared_client
@@ -5,19 +5,28 @@ Combines OpenAI API calls with local development tools
 """
 
 import os
+import shutil
 import sys
 import json
-import subprocess
 from datetime import datetime
 from pathlib import Path
 
+from git_engine import get_git_engine
+from log_sink import record_action
+from project_scanner import get_scanner
+from tracing import span, traced
+from workspace_manager import default_project_root
+from write_set import WriteSet
+
 class HybridAndersAgent:
-    def __init__(self):
+    def __init__(self, project_root=None):
         self.name = "Anders"
         self.version = "2.0-Hybrid"
-        self.project_root = Path("/home/ubuntu/simon-command-center")
+        self.project_root = Path(project_root or default_project_root())
         self.openai_key = os.getenv('OPENAI_API_KEY')
+        self.scanner = get_scanner(self.project_root)
         
+    @traced("hybrid.status_report")
     def status_report(self):
         """Generate comprehensive status report"""
         status = {
@@ -37,8 +46,11 @@ class HybridAndersAgent:
         }
         return status
     
+    @traced("hybrid.analyze_project_state")
     def analyze_project_state(self):
         """Analyze current project state"""
+        with span("project_scanner.ensure_fresh"):
+            self.scanner.ensure_fresh()
         state = {
             "next_js": self.check_file_exists("package.json"),
             "database_schema": self.check_file_exists("database/schema.sql"),
@@ -51,161 +63,32 @@ class HybridAndersAgent:
     
     def check_file_exists(self, relative_path):
         """Check if file exists relative to project root"""
-        return (self.project_root / relative_path).exists()
+        return self.scanner.exists(relative_path)
     
     def check_directory_exists(self, relative_path):
         """Check if directory exists relative to project root"""
-        return (self.project_root / relative_path).is_dir()
+        return self.scanner.is_dir(relative_path)
     
+    @traced("hybrid.create_api_routes")
     def create_api_routes(self):
-        """Create API routes using template generation"""
-        api_dir = self.project_root / "src/app/api"
-        
-        # Create agents API
-        agents_dir = api_dir / "agents"
-        agents_dir.mkdir(parents=True, exist_ok=True)
-        
-        agents_route = '''import { NextRequest, NextResponse } from 'next/server';
-import mysql from 'mysql2/promise';
-
-// Database connection
-const getConnection = async () => {
-  return mysql.createConnection({
-    host: process.env.DATABASE_HOST,
-    user: process.env.DATABASE_USER,
-    password: process.env.DATABASE_PASSWORD,
-    database: process.env.DATABASE_NAME,
-  });
-};
-
-export async function GET() {
-  try {
-    const connection = await getConnection();
-    const [rows] = await connection.execute(
-      `SELECT id, name, type, description, status, capabilities, last_seen, created_at 
-       FROM agents ORDER BY created_at DESC`
-    );
-    await connection.end();
-    
-    return NextResponse.json({ 
-      success: true, 
-      agents: rows 
-    });
-  } catch (error) {
-    console.error('Error fetching agents:', error);
-    return NextResponse.json({ 
-      success: false, 
-      error: 'Failed to fetch agents' 
-    }, { status: 500 });
-  }
-}
-
-export async function POST(request: NextRequest) {
-  try {
-    const { name, type, description, capabilities } = await request.json();
-    
-    const connection = await getConnection();
-    const [result] = await connection.execute(
-      `INSERT INTO agents (name, type, description, capabilities, status) 
-       VALUES (?, ?, ?, ?, 'active')`,
-      [name, type, description, JSON.stringify(capabilities)]
-    );
-    await connection.end();
-    
-    return NextResponse.json({ 
-      success: true,
-      message: 'Agent created successfully',
-      id: result.insertId 
-    });
-  } catch (error) {
-    console.error('Error creating agent:', error);
-    return NextResponse.json({ 
-      success: false, 
-      error: 'Failed to create agent' 
-    }, { status: 500 });
-  }
-}'''
-
-        with open(agents_dir / "route.ts", "w") as f:
-            f.write(agents_route)
-        
-        # Create tasks API
-        tasks_dir = api_dir / "tasks"
-        tasks_dir.mkdir(parents=True, exist_ok=True)
-        
-        tasks_route = '''import { NextRequest, NextResponse } from 'next/server';
-import mysql from 'mysql2/promise';
-
-const getConnection = async () => {
-  return mysql.createConnection({
-    host: process.env.DATABASE_HOST,
-    user: process.env.DATABASE_USER,
-    password: process.env.DATABASE_PASSWORD,
-    database: process.env.DATABASE_NAME,
-  });
-};
-
-export async function GET() {
-  try {
-    const connection = await getConnection();
-    const [rows] = await connection.execute(`
-      SELECT t.*, p.name as project_name, a.name as agent_name 
-      FROM tasks t 
-      LEFT JOIN projects p ON t.project_id = p.id 
-      LEFT JOIN agents a ON t.assigned_agent_id = a.id 
-      ORDER BY t.created_at DESC
-    `);
-    await connection.end();
-    
-    return NextResponse.json({ success: true, tasks: rows });
-  } catch (error) {
-    console.error('Error fetching tasks:', error);
-    return NextResponse.json({ 
-      success: false, 
-      error: 'Failed to fetch tasks' 
-    }, { status: 500 });
-  }
-}
-
-export async function POST(request: NextRequest) {
-  try {
-    const { title, description, project_id, assigned_agent_id, priority, due_date } = await request.json();
-    
-    const connection = await getConnection();
-    const [result] = await connection.execute(`
-      INSERT INTO tasks (title, description, project_id, assigned_agent_id, priority, due_date, status) 
-      VALUES (?, ?, ?, ?, ?, ?, 'pending')
-    `, [title, description, project_id, assigned_agent_id, priority, due_date]);
-    await connection.end();
-    
-    return NextResponse.json({ 
-      success: true,
-      message: 'Task created successfully',
-      id: result.insertId 
-    });
-  } catch (error) {
-    console.error('Error creating task:', error);
-    return NextResponse.json({ 
-      success: false, 
-      error: 'Failed to create task' 
-    }, { status: 500 });
-  }
-}'''
-
-        with open(tasks_dir / "route.ts", "w") as f:
-            f.write(tasks_route)
-        
+        """Create CRUD API routes for the tables opted in to the API using template generation"""
+        # Imported here so `status` does not pay for the schema parser and templates
+        from template_engine import TemplateEngine
+        result = TemplateEngine(self.project_root).generate(components=False)
+        record_action(self.name, "create_api_routes", "API routes generated", "success", {
+            "written": result["written"], "elapsed_ms": result["elapsed_ms"]
+        })
         return {
             "success": True,
             "message": "API routes created successfully",
-            "routes": ["agents", "tasks"]
+            "routes": result["tables"],
+            "written": result["written"],
+            "unchanged": result["unchanged"],
+            "elapsed_ms": result["elapsed_ms"]
         }
     
     def setup_database_connection(self):
         """Create database connection utility"""
-        lib_dir = self.project_root / "src/lib"
-        lib_dir.mkdir(parents=True, exist_ok=True)
-        
         db_config = '''import mysql from 'mysql2/promise';
 
 export interface DatabaseConfig {
@@ -265,16 +148,17 @@ export class DatabaseManager {
 
 export const db = new DatabaseManager();'''
 
-        with open(lib_dir / "database.ts", "w") as f:
-            f.write(db_config)
+        result = WriteSet(self.project_root).add("src/lib/database.ts", db_config).commit()
         
-        return {"success": True, "message": "Database connection utility created"}
+        record_action(self.name, "setup_database_connection", "Database connection utility created", "success")
+        return {"success": True, "message": "Database connection utility created", "written": result["written"]}
 
+    @traced("hybrid.initialize_git_repo")
     def initialize_git_repo(self):
         """Initialize Git repository with proper setup"""
+        files = WriteSet(self.project_root)
+        created_repo = False
         try:
-            os.chdir(self.project_root)
-            
             # Create .gitignore
             gitignore_content = '''# Dependencies
 node_modules/
@@ -310,18 +194,27 @@ Thumbs.db
 build/
 coverage/'''
 
-            with open(self.project_root / ".gitignore", "w") as f:
-                f.write(gitignore_content)
+            files.add(".gitignore", gitignore_content).commit()
             
             # Initialize git if not already done
-            if not (self.project_root / ".git").exists():
-                subprocess.run(["git", "init"], check=True)
-                subprocess.run(["git", "add", "."], check=True)
-                subprocess.run(["git", "commit", "-m", "🚀 Initial Command Center setup with Anders"], check=True)
+            git = get_git_engine(self.project_root)
+            if not git.is_repo():
+                created_repo = not (self.project_root / ".git").exists()
+                with span("git.init"):
+                    git.init()
+                with span("git.commit"):
+                    git.commit("🚀 Initial Command Center setup with Anders")
             
+            record_action(self.name, "initialize_git_repo", "Git repository initialized", "success")
             return {"success": True, "message": "Git repository initialized"}
             
         except Exception as e:
+            # Leave the tree as it was if git could not take the initial commit
+            files.rollback()
+            if created_repo:
+                # Otherwise is_repo() is true from now on and the initial commit is never retried
+                shutil.rmtree(self.project_root / ".git", ignore_errors=True)
+            record_action(self.name, "initialize_git_repo", str(e), "error")
             return {"success": False, "error": str(e)}
 
 if __name__ == "__main__":
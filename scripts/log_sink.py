@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Log Sink for Anders
+Write-behind buffer that batches agent_logs (or token_usage) rows into multi-row INSERTs
+"""
+
+import atexit
+import json
+import os
+import queue
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+
+from agent_db import AgentDatabase, get_database, percentile
+
+COLUMNS = ("agent_id", "task_id", "action", "message", "level", "metadata")
+_STOP = object()
+
+
+class LogSink:
+    """Collects rows for one table from any thread and writes them from one background thread
+
+    A row's first column is an agent id; rows may carry the agent's name instead, resolved at write time.
+    """
+
+    def __init__(self, database, batch_size=None, flush_interval=None, max_queue=None, put_timeout=5.0,
+                 table="agent_logs", columns=COLUMNS):
+        self.database = database
+        self.table = table
+        self.columns = columns
+        self.batch_size = batch_size or int(os.getenv('ANDERS_LOG_BATCH', '500'))
+        self.flush_interval = flush_interval or float(os.getenv('ANDERS_LOG_FLUSH_INTERVAL', '0.5'))
+        self.put_timeout = put_timeout
+        self.queue = queue.Queue(maxsize=max_queue or int(os.getenv('ANDERS_LOG_QUEUE', '50000')))
+        # Rows per statement, bounded by the driver's placeholder limit
+        self.statement_rows = min(self.batch_size, database.backend.max_params // len(columns))
+        self.statements = {}
+        self.counters = {"enqueued": 0, "written": 0, "batches": 0, "blocked": 0,
+                         "dropped": 0, "failed": 0, "unknown_agent": 0}
+        self.counter_lock = threading.Lock()
+        self.flush_ms = deque(maxlen=1000)
+        self.closed = False
+        self.thread = threading.Thread(target=self.writer_loop, name=f"anders-sink-{table}", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def count(self, name, n=1):
+        with self.counter_lock:
+            self.counters[name] += n
+
+    def emit(self, agent, action, message=None, level="info", metadata=None, task_id=None):
+        """Queue one agent_logs row; blocks for up to put_timeout when the writer falls behind"""
+        return self.put((agent, task_id, action, message, level,
+                         json.dumps(metadata) if metadata is not None else None))
+
+    def put(self, row):
+        """Queue one row in `columns` order; False if the sink is closed or the row had to be dropped"""
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait(row)
+        except queue.Full:
+            self.count("blocked")
+            try:
+                self.queue.put(row, timeout=self.put_timeout)
+            except queue.Full:
+                self.count("dropped")
+                return False
+        self.count("enqueued")
+        return True
+
+    def insert_sql(self, rows):
+        if rows not in self.statements:
+            values = ", ".join(["(" + ", ".join("?" * len(self.columns)) + ")"] * rows)
+            self.statements[rows] = f"INSERT INTO {self.table} ({', '.join(self.columns)}) VALUES {values}"
+        return self.statements[rows]
+
+    def resolve(self, batch):
+        rows = []
+        for agent, *rest in batch:
+            agent_id = agent if isinstance(agent, int) else self.database.agent_id(agent)
+            if agent_id is None:
+                self.count("unknown_agent")
+                continue
+            rows.append((agent_id, *rest))
+        return rows
+
+    def write(self, batch):
+        started = time.perf_counter()
+        rows, written = batch, 0
+        try:
+            rows = self.resolve(batch)
+            for start in range(0, len(rows), self.statement_rows):
+                chunk = rows[start:start + self.statement_rows]
+                params = [value for row in chunk for value in row]
+                self.database.run(self.insert_sql(len(chunk)), params, transaction=True)
+                written += len(chunk)
+                self.count("written", len(chunk))
+        except Exception as e:
+            # Chunks before the failing one are committed; the rest is lost, logging must never take an agent down
+            self.count("failed", len(rows) - written)
+            print(f"⚠️ {self.table} sink flush failed ({len(rows) - written} rows): {e}", file=sys.stderr)
+        self.count("batches")
+        self.flush_ms.append((time.perf_counter() - started) * 1000)
+
+    def writer_loop(self):
+        batch = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is None or item is _STOP or isinstance(item, threading.Event):
+                if batch:
+                    self.write(batch)
+                    batch = []
+                deadline = None
+                if isinstance(item, threading.Event):
+                    item.set()
+                if item is _STOP:
+                    return
+                continue
+
+            batch.append(item)
+            if deadline is None:
+                deadline = time.monotonic() + self.flush_interval
+            if len(batch) >= self.batch_size:
+                self.write(batch)
+                batch = []
+                deadline = None
+
+    def flush(self, timeout=None):
+        """Block until everything queued before this call has been written; False if `timeout` ran out
+
+        Waiting for room in a full queue is bounded by put_timeout when no timeout is given.
+        """
+        if self.closed:
+            return True
+        started = time.monotonic()
+        done = threading.Event()
+        try:
+            self.queue.put(done, timeout=self.put_timeout if timeout is None else timeout)
+        except queue.Full:
+            return False
+        return done.wait(None if timeout is None else max(0.0, timeout - (time.monotonic() - started)))
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self.queue.put(_STOP, timeout=self.put_timeout)
+        except queue.Full:
+            # The writer is wedged; it is a daemon thread, so exit does not wait for it
+            print(f"⚠️ {self.table} sink closed with {self.queue.qsize()} rows unwritten", file=sys.stderr)
+            return
+        self.thread.join()
+
+    def stats(self):
+        with self.counter_lock:
+            counters = dict(self.counters)
+        flush_ms = list(self.flush_ms)
+        return {
+            **counters,
+            "queued": self.queue.qsize(),
+            "avg_batch": round(counters["written"] / counters["batches"], 1) if counters["batches"] else 0,
+            "flush_ms": {
+                "p50": round(percentile(flush_ms, 0.5), 3),
+                "p95": round(percentile(flush_ms, 0.95), 3),
+                "max": round(max(flush_ms, default=0.0), 3)
+            }
+        }
+
+
+_shared_sinks = {}
+_shared_lock = threading.Lock()
+
+
+def get_sink(table="agent_logs", columns=COLUMNS):
+    """Shared sink for `table` over the shared database, or None when no database is configured"""
+    with _shared_lock:
+        if table not in _shared_sinks:
+            database = get_database()
+            if not database:
+                return None
+            _shared_sinks[table] = LogSink(database, table=table, columns=columns)
+        return _shared_sinks[table]
+
+
+def record_action(agent, action, message=None, level="info", metadata=None, task_id=None):
+    """Best-effort action log for the agent classes; never lets logging break a command"""
+    try:
+        sink = get_sink()
+        if sink:
+            sink.emit(agent, action, message, level, metadata, task_id)
+    except Exception as e:
+        print(f"⚠️ Could not record {action}: {e}", file=sys.stderr)
+
+
+def benchmark(events=50000, producers=4):
+    """Compare one INSERT per event against the write-behind sink on a scratch SQLite database"""
+    with tempfile.TemporaryDirectory() as tmp:
+        database = AgentDatabase(f"sqlite:///{tmp}/bench.db")
+        database.ensure_schema()
+        agent_id = database.agent_id("Anders")
+        direct_events = min(events, 5000)
+
+        started = time.perf_counter()
+        for i in range(direct_events):
+            database.log_action(agent_id, "bench", f"event {i}", "info", {"i": i})
+        direct = direct_events / (time.perf_counter() - started)
+
+        sink = LogSink(database)
+
+        def produce(count):
+            for i in range(count):
+                sink.emit(agent_id, "bench", f"event {i}", "info", {"i": i})
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=produce, args=(events // producers,)) for _ in range(producers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        enqueued = time.perf_counter() - started
+        sink.close()
+        drained = time.perf_counter() - started
+
+        stats = sink.stats()
+        database.close()
+        return {
+            "events": stats["written"],
+            "producers": producers,
+            "direct_events_per_sec": round(direct),
+            "enqueue_events_per_sec": round(stats["enqueued"] / enqueued),
+            "sustained_events_per_sec": round(stats["written"] / drained),
+            "sink": stats
+        }
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "bench"
+    if command == "bench":
+        events = int(sys.argv[2]) if len(sys.argv) > 2 else 50000
+        print("📝 Log Sink Benchmark:")
+        print(json.dumps(benchmark(events), indent=2))
+    else:
+        print(f"❌ Unknown command: {command}")
+        print("Usage: python3 log_sink.py bench [events]")
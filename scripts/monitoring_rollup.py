@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Monitoring Rollup for Anders
+Folds raw site_monitoring checks into 1m/1h/1d buckets and enforces retention
+"""
+
+import json
+import math
+import os
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+from agent_db import get_database
+
+WATERMARK = "site_monitoring_rollup"
+BUCKETS = {"1m": 60, "1h": 3600, "1d": 86400}
+STAMP = "%Y-%m-%d %H:%M:%S"
+# Most missing ids remembered below the watermark; rows that commit later than that many newer ones are lost
+MAX_GAPS = 500
+
+
+class LatencySketch:
+    """Log-bucketed histogram: quantiles within `accuracy` relative error, merged by adding counts"""
+
+    def __init__(self, accuracy=0.01, bins=None):
+        self.accuracy = accuracy
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.bins = defaultdict(int, bins or {})
+
+    @property
+    def count(self):
+        return sum(self.bins.values())
+
+    def add(self, value_ms, n=1):
+        # Bin 0 holds sub-millisecond values; everything else lands in ceil(log_gamma(v))
+        index = math.ceil(math.log(value_ms) / self.log_gamma) if value_ms >= 1 else 0
+        self.bins[index] += n
+
+    def merge(self, other):
+        for index, n in other.bins.items():
+            self.bins[index] += n
+        return self
+
+    def quantile(self, q):
+        total = self.count
+        if not total:
+            return None
+        rank = q * (total - 1)
+        seen = 0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen > rank:
+                if index == 0:
+                    return 0
+                # Midpoint of (gamma^(i-1), gamma^i] keeps the error within `accuracy` both ways
+                return round(2 * self.gamma ** index / (self.gamma + 1))
+        return None
+
+    def to_json(self):
+        return json.dumps({"accuracy": self.accuracy, "bins": {str(k): v for k, v in self.bins.items()}})
+
+    @classmethod
+    def from_json(cls, data):
+        if not data:
+            return cls()
+        if isinstance(data, (str, bytes)):
+            data = json.loads(data)
+        return cls(data.get("accuracy", 0.01), {int(k): v for k, v in data.get("bins", {}).items()})
+
+
+def parse_stamp(value):
+    """site_monitoring timestamps come back as datetimes (MySQL) or 'YYYY-MM-DD HH:MM:SS' text (SQLite)"""
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=None)
+    return datetime.strptime(str(value)[:19], STAMP)
+
+
+def stamp(value):
+    return value.strftime(STAMP) if isinstance(value, datetime) else str(value)[:19]
+
+
+def bucket_start(moment, size):
+    seconds = BUCKETS[size]
+    epoch = int(moment.replace(tzinfo=timezone.utc).timestamp())
+    return datetime.fromtimestamp(epoch - epoch % seconds, timezone.utc).replace(tzinfo=None)
+
+
+class MonitoringRollup:
+    """Incremental rollups keyed by raw row id, so each check is aggregated exactly once
+
+    Auto-increment ids are handed out at INSERT but become visible at COMMIT, so a
+    lower id can appear after the watermark has passed it. The ids skipped when the
+    watermark advances are kept with it and re-scanned for `overlap_seconds`.
+    """
+
+    def __init__(self, database, chunk_size=5000, raw_days=None, minute_days=None, hour_days=None,
+                 overlap_seconds=None):
+        self.database = database
+        self.chunk_size = chunk_size
+        self.overlap_seconds = float(overlap_seconds or os.getenv('ANDERS_ROLLUP_OVERLAP_SECONDS', '600'))
+        # Raw checks, 1m and 1h buckets are pruned; 1d buckets are kept for good
+        self.retention = {
+            "raw": float(raw_days or os.getenv('ANDERS_ROLLUP_RAW_DAYS', '7')),
+            "1m": float(minute_days or os.getenv('ANDERS_ROLLUP_MINUTE_DAYS', '2')),
+            "1h": float(hour_days or os.getenv('ANDERS_ROLLUP_HOUR_DAYS', '90'))
+        }
+
+    def watermark(self, tx):
+        """(last_id, {skipped id: first seen epoch}), with the row locked until the transaction ends
+
+        Concurrent runs queue on the lock instead of aggregating the same rows twice.
+        """
+        mysql = tx.database.dialect == "mysql"
+        tx.execute(f"INSERT {'IGNORE' if mysql else 'OR IGNORE'} INTO rollup_watermarks (name, last_id) "
+                   "VALUES (?, 0)", (WATERMARK,))
+        last_id, gaps = tx.fetchone(
+            f"SELECT last_id, gaps FROM rollup_watermarks WHERE name = ?{' FOR UPDATE' if mysql else ''}",
+            (WATERMARK,)
+        )
+        if isinstance(gaps, (str, bytes)):
+            gaps = json.loads(gaps)
+        return last_id, {int(row_id): seen for row_id, seen in (gaps or {}).items()}
+
+    def aggregate(self, rows):
+        """{(url, size, bucket_start): bucket} for one chunk of raw checks"""
+        buckets = {}
+        for _, site_name, url, response_time_ms, is_up, last_check in rows:
+            moment = parse_stamp(last_check)
+            for size in BUCKETS:
+                key = (url, size, stamp(bucket_start(moment, size)))
+                bucket = buckets.get(key)
+                if bucket is None:
+                    bucket = buckets[key] = {"site_name": site_name, "checks": 0, "up_checks": 0,
+                                             "sketch": LatencySketch()}
+                bucket["checks"] += 1
+                if is_up:
+                    bucket["up_checks"] += 1
+                if response_time_ms is not None:
+                    bucket["sketch"].add(response_time_ms)
+        return buckets
+
+    def merge_into_table(self, tx, buckets):
+        """Merge chunk buckets with stored ones; existing rows are updated, new ones inserted"""
+        inserts, updates = [], []
+        for size in BUCKETS:
+            keys = [key for key in buckets if key[1] == size]
+            if not keys:
+                continue
+            starts = [key[2] for key in keys]
+            existing = {
+                (url, size, stamp(start)): (row_id, checks, up_checks, sketch)
+                for row_id, url, start, checks, up_checks, sketch in tx.fetchall(
+                    "SELECT id, url, bucket_start, checks, up_checks, latency_sketch FROM site_monitoring_rollups "
+                    "WHERE bucket_size = ? AND bucket_start >= ? AND bucket_start <= ?",
+                    (size, min(starts), max(starts))
+                )
+            }
+            for key in keys:
+                bucket = buckets[key]
+                sketch = bucket["sketch"]
+                checks, up_checks = bucket["checks"], bucket["up_checks"]
+                stored = existing.get(key)
+                if stored:
+                    sketch = LatencySketch.from_json(stored[3]).merge(sketch)
+                    checks += stored[1]
+                    up_checks += stored[2]
+                values = (checks, up_checks, sketch.quantile(0.5), sketch.quantile(0.95), sketch.quantile(0.99),
+                          sketch.to_json())
+                if stored:
+                    updates.append(values + (stored[0],))
+                else:
+                    inserts.append((bucket["site_name"], key[0], key[1], key[2]) + values)
+
+        if inserts:
+            tx.executemany(
+                "INSERT INTO site_monitoring_rollups (site_name, url, bucket_size, bucket_start, checks, up_checks, "
+                "p50_ms, p95_ms, p99_ms, latency_sketch) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", inserts
+            )
+        if updates:
+            tx.executemany(
+                "UPDATE site_monitoring_rollups SET checks = ?, up_checks = ?, p50_ms = ?, p95_ms = ?, p99_ms = ?, "
+                "latency_sketch = ? WHERE id = ?", updates
+            )
+        return len(inserts), len(updates)
+
+    def run(self):
+        """Process raw rows past the watermark, plus late commits below it, one transaction per chunk"""
+        started = time.perf_counter()
+        processed = inserted = updated = late = 0
+        columns = ("SELECT id, site_name, url, response_time_ms, is_up, last_check FROM site_monitoring "
+                   "WHERE last_check IS NOT NULL AND (status_code IS NOT NULL OR error_message IS NOT NULL) ")
+        while True:
+            with self.database.transaction() as tx:
+                last_id, gaps = self.watermark(tx)
+                now = time.time()
+                gaps = {row_id: seen for row_id, seen in gaps.items() if now - seen < self.overlap_seconds}
+                rows = tx.fetchall(columns + "AND id > ? ORDER BY id LIMIT ?", (last_id, self.chunk_size))
+                filled = tx.fetchall(
+                    columns + f"AND id IN ({', '.join('?' * len(gaps))})", list(gaps)
+                ) if gaps else []
+                for row in filled:
+                    del gaps[row[0]]
+
+                top = rows[-1][0] if rows else last_id
+                seen_ids = {row[0] for row in rows}
+                for row_id in range(max(last_id + 1, top - MAX_GAPS), top):
+                    if row_id not in seen_ids:
+                        gaps[row_id] = now
+                gaps = dict(sorted(gaps.items())[-MAX_GAPS:])
+
+                new = changed = 0
+                if rows or filled:
+                    new, changed = self.merge_into_table(tx, self.aggregate(filled + rows))
+                tx.execute("UPDATE rollup_watermarks SET last_id = ?, gaps = ? WHERE name = ?",
+                           (top, json.dumps({str(k): v for k, v in gaps.items()}), WATERMARK))
+            processed += len(rows) + len(filled)
+            late += len(filled)
+            inserted += new
+            updated += changed
+            if len(rows) < self.chunk_size:
+                break
+        return {
+            "processed": processed,
+            "late_rows": late,
+            "buckets_inserted": inserted,
+            "buckets_updated": updated,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)
+        }
+
+    def enforce_retention(self, now=None):
+        """Delete aggregated raw rows and fine buckets past their retention window
+
+        Raw rows are only deleted once rolled up, and each URL keeps its latest
+        row because site_monitor registers sites by their presence in the table.
+        """
+        now = now or datetime.now(timezone.utc).replace(tzinfo=None)
+        deleted = {}
+        with self.database.transaction() as tx:
+            last_id, _ = self.watermark(tx)
+            cutoff = stamp(now - timedelta(days=self.retention["raw"]))
+            deleted["raw"] = tx.execute(
+                "DELETE FROM site_monitoring WHERE id <= ? AND last_check < ? AND id NOT IN "
+                "(SELECT id FROM (SELECT MAX(id) AS id FROM site_monitoring GROUP BY url) latest)",
+                (last_id, cutoff)
+            )["rowcount"]
+            for size in ("1m", "1h"):
+                cutoff = stamp(now - timedelta(days=self.retention[size]))
+                deleted[size] = tx.execute(
+                    "DELETE FROM site_monitoring_rollups WHERE bucket_size = ? AND bucket_start < ?", (size, cutoff)
+                )["rowcount"]
+        return deleted
+
+    def uptime(self, days=30, url=None, now=None):
+        """Uptime and latency per site over `days`, read from at most `days` daily buckets per site"""
+        now = now or datetime.now(timezone.utc).replace(tzinfo=None)
+        since = stamp(bucket_start(now - timedelta(days=days - 1), "1d"))
+        query = ("SELECT site_name, url, checks, up_checks, latency_sketch FROM site_monitoring_rollups "
+                 "WHERE bucket_size = '1d' AND bucket_start >= ?")
+        params = [since]
+        if url:
+            query += " AND url = ?"
+            params.append(url)
+        rows = self.database.fetchall(query, params)
+
+        sites = {}
+        for site_name, site_url, checks, up_checks, sketch in rows:
+            site = sites.setdefault(site_url, {"site_name": site_name, "checks": 0, "up_checks": 0,
+                                               "sketch": LatencySketch()})
+            site["checks"] += checks
+            site["up_checks"] += up_checks
+            site["sketch"].merge(LatencySketch.from_json(sketch))
+
+        return {
+            "days": days,
+            "rows_read": len(rows),
+            "sites": [
+                {
+                    "site_name": site["site_name"],
+                    "url": site_url,
+                    "checks": site["checks"],
+                    "uptime_pct": round(100 * site["up_checks"] / site["checks"], 3) if site["checks"] else None,
+                    "p50_ms": site["sketch"].quantile(0.5),
+                    "p95_ms": site["sketch"].quantile(0.95),
+                    "p99_ms": site["sketch"].quantile(0.99)
+                }
+                for site_url, site in sorted(sites.items())
+            ]
+        }
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "run"
+    database = get_database()
+    if database is None:
+        print("❌ No database configured. Set ANDERS_DATABASE_URL (e.g. sqlite:///anders.db) or DATABASE_HOST.")
+        sys.exit(1)
+    rollup = MonitoringRollup(database)
+
+    if command == "run":
+        print("📊 Rollup:")
+        print(json.dumps({**rollup.run(), "deleted": rollup.enforce_retention()}, indent=2))
+    elif command == "uptime":
+        days = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+        print(f"📈 Uptime ({days} days):")
+        print(json.dumps(rollup.uptime(days), indent=2))
+    else:
+        print(f"❌ Unknown command: {command}")
+        print("Usage: python3 monitoring_rollup.py [run|uptime [days]]")
@@ -5,16 +5,56 @@ Handles OpenAI API calls including device authentication
 """
 
 import os
+import sys
 import json
-import requests
 import time
+import asyncio
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from pathlib import Path
+
+from code_blocks import CodeBlockExtractor
+from context_packer import get_packer
+from log_sink import record_action
+from rate_limiter import AsyncRateLimiter
+from project_scanner import get_scanner
+from response_cache import cache_key, get_shared_cache
+from single_flight import flight_key, get_flight
+from token_budget import PromptTooLarge, TokenBudget, get_ledger
+from tracing import span, traced
+from worker_pool import postprocess_outputs
+from workspace_manager import default_project_root
+from write_set import new_file_mode
+
+
+class StreamError(Exception):
+    """A streamed completion that could not start: no API key or a non-200 response"""
+
 
 class OpenAIIntegration:
-    def __init__(self):
+    def __init__(self, http_client=None, cache=None):
         self.api_key = os.getenv('OPENAI_API_KEY')
-        self.base_url = "https://api.openai.com/v1"
+        self.base_url = os.getenv('OPENAI_BASE_URL', "https://api.openai.com/v1")
         self.device_auth_url = "https://auth.openai.com/codex/device"
+        self.http_client = http_client
+        self.model = "gpt-4"
+        self.max_tokens = int(os.getenv('ANDERS_MAX_COMPLETION_TOKENS', '2000'))
+        self.temperature = 0.3
+        if cache is None and os.getenv('ANDERS_NO_CACHE') != '1':
+            cache = get_shared_cache()
+        self.cache = cache
+        self.last_stream_stats = {}
+        # Per thread: generate_many and the daemon call code_generation on one instance from several threads
+        self.local = threading.local()
+        self.budget = None
+        # Fill an empty context from the project index (see context_packer.py)
+        self.auto_context = os.getenv('ANDERS_AUTO_CONTEXT') == '1'
+        self.context_budget = int(os.getenv('ANDERS_CONTEXT_BUDGET', '1500'))
+        # Identical requests in flight at the same time share one upstream call (see single_flight.py)
+        self.coalesce = os.getenv('ANDERS_SINGLE_FLIGHT', '1') == '1'
+        self.flight = get_flight("openai.code_generation")
         
     def device_auth_flow(self):
         """
@@ -38,18 +78,28 @@ class OpenAIIntegration:
             "message": "Complete authentication in browser"
         }
     
-    def code_generation(self, prompt, context=""):
-        """Generate code using OpenAI API"""
-        if not self.api_key:
-            return "❌ OpenAI API key not configured. Set OPENAI_API_KEY environment variable."
-        
-        try:
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
-            
-            system_msg = f"""You are Anders, Simon's coding agent for the Command Center project.
+    def build_headers(self):
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+
+    @property
+    def http(self):
+        # requests (and its TLS stack) is only imported once a call actually goes to the network
+        if self.http_client is None:
+            from http_client import get_shared_client
+            self.http_client = get_shared_client()
+        return self.http_client
+
+    def token_budget(self):
+        if self.budget is None or self.budget.model != self.model \
+                or self.budget.max_completion_tokens != self.max_tokens:
+            self.budget = TokenBudget(self.model, max_completion_tokens=self.max_tokens)
+        return self.budget
+
+    def build_messages(self, prompt, context=""):
+        system_msg = f"""You are Anders, Simon's coding agent for the Command Center project.
             
 Project Context:
 - Next.js 15 + TypeScript + Tailwind CSS
@@ -60,30 +110,311 @@ Current context: {context}
 
 Generate practical, working code that follows TypeScript/Next.js best practices."""
 
-            data = {
-                "model": "gpt-4",
-                "messages": [
-                    {"role": "system", "content": system_msg},
-                    {"role": "user", "content": prompt}
-                ],
-                "max_tokens": 2000,
-                "temperature": 0.3
-            }
-            
-            response = requests.post(
+        return [
+            {"role": "system", "content": system_msg},
+            {"role": "user", "content": prompt}
+        ]
+
+    def pack_context(self, prompt, project_root=None):
+        """The project snippets most relevant to `prompt`, within self.context_budget tokens"""
+        return get_packer(project_root).pack(prompt, self.context_budget)["context"]
+
+    def plan_request(self, prompt, context="", auto_context=None):
+        """Chat payload with `context` trimmed to the prompt budget and max_tokens sized to the room left"""
+        if not context and (self.auto_context if auto_context is None else auto_context):
+            context = self.pack_context(prompt)
+        messages, plan = self.token_budget().plan(self.build_messages, prompt, context)
+        return {
+            "model": self.model,
+            "messages": messages,
+            "max_tokens": plan["max_tokens"],
+            "temperature": self.temperature
+        }, plan
+
+    def build_chat_request(self, prompt, context=""):
+        """Build the chat completion payload for a code generation prompt"""
+        return self.plan_request(prompt, context)[0]
+
+    def account(self, data, plan, content, usage=None, task_id=None):
+        """Record a billed call; without a usage block the tokens are estimated locally"""
+        usage = usage or {}
+        estimated = usage.get("prompt_tokens") is None
+        prompt_tokens = plan["prompt_tokens"] if estimated else usage["prompt_tokens"]
+        completion_tokens = (self.token_budget().tokenizer.count(content) if estimated
+                             else usage.get("completion_tokens", 0))
+        usage = get_ledger().record("Anders", data["model"], prompt_tokens, completion_tokens, task_id, estimated)
+        usage["context_trimmed_from"] = plan["context_trimmed_from"]
+        self.local.usage = usage
+        return usage
+
+    @property
+    def last_usage(self):
+        """Usage of the latest call made from the current thread"""
+        return getattr(self.local, "usage", {})
+
+    def generate_code(self, prompt, context="", use_cache=True, refresh=False, task_id=None, auto_context=None):
+        """code_generation plus that call's token usage and cost: {"content", "usage"}"""
+        self.local.usage = {}
+        content = self.code_generation(prompt, context, use_cache, refresh, task_id, auto_context)
+        return {"content": content, "usage": self.last_usage}
+
+    @traced("openai.code_generation")
+    def code_generation(self, prompt, context="", use_cache=True, refresh=False, task_id=None, auto_context=None):
+        """Generate code using OpenAI API; generate_code() also returns the call's token usage and cost
+
+        With auto_context (default: ANDERS_AUTO_CONTEXT) an empty context is packed from the project.
+        """
+        if not self.api_key:
+            return "❌ OpenAI API key not configured. Set OPENAI_API_KEY environment variable."
+        
+        try:
+            data, plan = self.plan_request(prompt, context, auto_context)
+            cache = self.cache if use_cache else None
+            key = cache_key(data) if cache else None
+            if cache and not refresh:
+                cached = cache.get(key)
+                if cached is not None:
+                    get_ledger().cache_hit("Anders", data["model"])
+                    self.local.usage = {"cached": True, "total_tokens": 0, "cost_usd": 0.0}
+                    record_action("Anders", "code_generation", prompt[:200], "info", {"cached": True},
+                                  task_id=task_id)
+                    return cached
+
+            if not self.coalesce:
+                return self.request_completion(prompt, data, plan, cache, key, task_id)
+            content, shared = self.flight.do(flight_key(self.base_url, data), self.request_completion,
+                                             prompt, data, plan, cache, key, task_id)
+            if shared:
+                # The leader billed and logged the call; this caller only shares its reply
+                get_ledger().coalesced("Anders", data["model"])
+                self.local.usage = {"coalesced": True, "total_tokens": 0, "cost_usd": 0.0}
+                record_action("Anders", "code_generation", prompt[:200], "info", {"coalesced": True},
+                              task_id=task_id)
+            return content
+                
+        except Exception as e:
+            return f"❌ Error: {str(e)}"
+
+    def request_completion(self, prompt, data, plan, cache, key, task_id=None):
+        """One chat completion call: cache fill, usage accounting and action log on success"""
+        with span("openai.http", model=data["model"]) as http_span:
+            response = self.http.post(
                 f"{self.base_url}/chat/completions",
-                headers=headers,
+                headers=self.build_headers(),
                 json=data
             )
-            
-            if response.status_code == 200:
-                result = response.json()
-                return result['choices'][0]['message']['content']
-            else:
-                return f"❌ API Error: {response.status_code} - {response.text}"
-                
+            http_span.set("http.status_code", response.status_code)
+        
+        if response.status_code == 200:
+            result = response.json()
+            content = result['choices'][0]['message']['content']
+            if cache:
+                cache.set(key, content, model=data["model"])
+            usage = self.account(data, plan, content, result.get("usage"), task_id)
+            record_action("Anders", "code_generation", prompt[:200], "success", {
+                "cached": False, "model": data["model"], "usage": usage
+            }, task_id=task_id)
+            return content
+        else:
+            record_action("Anders", "code_generation", prompt[:200], "error", {
+                "status_code": response.status_code
+            }, task_id=task_id)
+            return f"❌ API Error: {response.status_code} - {response.text}"
+
+    def stream_code_generation(self, prompt, context="", use_cache=True):
+        """Yield completion tokens as they arrive over server-sent events; errors arrive as one "❌" message"""
+        try:
+            yield from self.stream_tokens(prompt, context, use_cache)
+        except StreamError as e:
+            yield f"❌ {e}"
+
+    def stream_tokens(self, prompt, context="", use_cache=True):
+        """Yield completion tokens as they arrive; raises StreamError, and request errors propagate"""
+        stats = {"time_to_first_token": None, "total_latency": None, "tokens": 0, "cached": False}
+        self.last_stream_stats = stats
+        started = time.perf_counter()
+
+        if not self.api_key:
+            raise StreamError("OpenAI API key not configured. Set OPENAI_API_KEY environment variable.")
+
+        try:
+            data, plan = self.plan_request(prompt, context)
+        except PromptTooLarge as e:
+            raise StreamError(str(e))
+        cache = self.cache if use_cache else None
+        key = cache_key(data) if cache else None
+        cached = cache.get(key) if cache else None
+        if cached is not None:
+            stats.update(time_to_first_token=time.perf_counter() - started, tokens=1, cached=True)
+            yield cached
+            stats["total_latency"] = time.perf_counter() - started
+            return
+
+        response = self.http.post(
+            f"{self.base_url}/chat/completions",
+            headers=self.build_headers(),
+            json=dict(data, stream=True),
+            stream=True
+        )
+        if response.status_code != 200:
+            message = f"API Error: {response.status_code} - {response.text}"
+            response.close()
+            raise StreamError(message)
+
+        # SSE is UTF-8 by definition; without a charset requests would decode text/event-stream as Latin-1
+        response.encoding = "utf-8"
+        pieces = []
+        try:
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                payload = line[5:].strip()
+                if payload == "[DONE]":
+                    break
+                delta = json.loads(payload)["choices"][0].get("delta", {})
+                token = delta.get("content")
+                if not token:
+                    continue
+                if stats["time_to_first_token"] is None:
+                    stats["time_to_first_token"] = time.perf_counter() - started
+                stats["tokens"] += 1
+                pieces.append(token)
+                yield token
+        finally:
+            response.close()
+            stats["total_latency"] = time.perf_counter() - started
+
+        if pieces:
+            # The stream carries no usage block, so this call is accounted from local counts
+            self.account(data, plan, "".join(pieces))
+        if cache and pieces:
+            cache.set(key, "".join(pieces), model=data["model"])
+
+    async def astream_code_generation(self, prompt, context="", use_cache=True):
+        """Async iterator over streamed tokens; the blocking SSE read runs in a worker thread"""
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        finished = object()
+
+        def pump():
+            try:
+                for token in self.stream_code_generation(prompt, context, use_cache):
+                    loop.call_soon_threadsafe(queue.put_nowait, token)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+            loop.call_soon_threadsafe(queue.put_nowait, finished)
+
+        worker = loop.run_in_executor(None, pump)
+        while True:
+            item = await queue.get()
+            if item is finished:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+        await worker
+
+    def stream_code_to_file(self, prompt, target_path, context="", use_cache=True):
+        """Stream a generation's code blocks into a temp file beside `target_path`, renamed over it on success
+
+        A missing key, API error or failure mid-stream leaves an existing target untouched.
+        """
+        target_path = Path(target_path)
+        target_path.parent.mkdir(parents=True, exist_ok=True)
+        extractor = CodeBlockExtractor()
+        bytes_written = 0
+        fd, temp = tempfile.mkstemp(prefix=f".{target_path.name}.", suffix=".anders-tmp", dir=target_path.parent)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                for token in self.stream_tokens(prompt, context, use_cache):
+                    code = extractor.feed(token)
+                    if code:
+                        f.write(code)
+                        f.flush()
+                        bytes_written += len(code)
+                code = extractor.close()
+                f.write(code)
+                bytes_written += len(code)
+            mode = target_path.stat().st_mode if target_path.exists() else new_file_mode()
+            os.chmod(temp, mode & 0o7777)
+            os.replace(temp, target_path)
         except Exception as e:
-            return f"❌ Error: {str(e)}"
+            Path(temp).unlink(missing_ok=True)
+            error = f"❌ {e}" if isinstance(e, StreamError) else f"❌ Error: {e}"
+            return {"success": False, "error": error, **self.last_stream_stats}
+        except BaseException:
+            Path(temp).unlink(missing_ok=True)
+            raise
+        return {
+            "success": True,
+            "path": str(target_path),
+            "bytes_written": bytes_written,
+            **self.last_stream_stats
+        }
+
+    async def generate_many(self, prompts, concurrency=8, context="", timeout=None,
+                            requests_per_minute=None, tokens_per_minute=None,
+                            use_cache=True, refresh=False, postprocess=False):
+        """Generate code for many prompts with N requests in flight, results in input order
+
+        With postprocess=True each reply is parsed, formatted and hashed in the
+        worker pool and returned as a worker_pool result dict instead of a string.
+        """
+        prompts = list(prompts)
+        results = [None] * len(prompts)
+        limiter = AsyncRateLimiter(requests_per_minute, tokens_per_minute)
+        semaphore = asyncio.Semaphore(concurrency)
+        self.http.ensure_pool_size(concurrency)
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="anders-gen")
+        batch_flight = get_flight("openai.generate_many")
+        deadline = loop.time() + timeout if timeout is not None else None
+
+        async def generate(prompt):
+            async with semaphore:
+                # Pre-flight estimate for the tokens-per-minute budget: sized prompt plus completion cap
+                try:
+                    _, plan = self.plan_request(prompt, context)
+                except PromptTooLarge as e:
+                    return f"❌ Error: {e}"
+                await limiter.acquire(plan["prompt_tokens"] + plan["max_tokens"])
+                return await loop.run_in_executor(executor, call, prompt)
+
+        def call(prompt):
+            # Bounded by the batch timeout, so a call still running when it expires does not outlive it
+            remaining = deadline - loop.time() if deadline is not None else None
+            with self.http.deadline(remaining):
+                return self.code_generation(prompt, context, use_cache, refresh)
+
+        async def run_one(index, prompt):
+            if not self.coalesce:
+                results[index] = await generate(prompt)
+                return
+            # Duplicates wait for the first copy without taking a slot or rate budget
+            key = flight_key(self.base_url, self.model, self.temperature, prompt, context, use_cache, refresh)
+            results[index], _ = await batch_flight.ado(key, generate, prompt)
+
+        tasks = [asyncio.ensure_future(run_one(i, p)) for i, p in enumerate(prompts)]
+        try:
+            done, pending = await asyncio.wait(tasks, timeout=timeout)
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+            for task in done:
+                # Surface unexpected failures rather than leaving silent gaps
+                if task.exception():
+                    raise task.exception()
+        finally:
+            # Queued calls are cancelled; running ones give up at the deadline and their results are discarded
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        for index, result in enumerate(results):
+            if result is None:
+                results[index] = f"❌ Error: generation timed out after {timeout}s"
+        if postprocess:
+            return await loop.run_in_executor(None, postprocess_outputs, results)
+        return results
     
     def analyze_project(self, project_path):
         """Analyze current project status"""
@@ -105,9 +436,9 @@ Generate practical, working code that follows TypeScript/Next.js best practices.
             ".github/workflows/deploy.yml"
         ]
         
+        scanner = get_scanner(project_path)
         for file in key_files:
-            file_path = os.path.join(project_path, file)
-            if os.path.exists(file_path):
+            if scanner.exists(file):
                 analysis["files_found"].append(file)
         
         # Determine next steps based on what's missing
@@ -122,12 +453,35 @@ Generate practical, working code that follows TypeScript/Next.js best practices.
 
 if __name__ == "__main__":
     integration = OpenAIIntegration()
+
+    if len(sys.argv) > 2 and sys.argv[1] == "generate":
+        # python3 openai_integration.py generate "<prompt>" [--no-cache] [--refresh] [--context]
+        flags = sys.argv[3:]
+        code = integration.code_generation(
+            sys.argv[2],
+            use_cache="--no-cache" not in flags,
+            refresh="--refresh" in flags,
+            auto_context=True if "--context" in flags else None
+        )
+        print(code)
+        sys.exit(0)
+
+    if len(sys.argv) > 2 and sys.argv[1] == "stream":
+        # python3 openai_integration.py stream "<prompt>" [target_file]
+        if len(sys.argv) > 3:
+            result = integration.stream_code_to_file(sys.argv[2], sys.argv[3])
+            print(json.dumps(result, indent=2))
+        else:
+            for token in integration.stream_code_generation(sys.argv[2]):
+                print(token, end="", flush=True)
+            print(f"\n\n⏱️ {json.dumps(integration.last_stream_stats)}")
+        sys.exit(0)
     
     # Test device auth flow
     auth_result = integration.device_auth_flow()
     print(json.dumps(auth_result, indent=2))
     
     # Analyze project
-    project_analysis = integration.analyze_project("/home/ubuntu/simon-command-center")
+    project_analysis = integration.analyze_project(str(default_project_root()))
     print("\n📊 Project Analysis:")
     print(json.dumps(project_analysis, indent=2))
\ No newline at end of file
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Project Scanner for Anders
+Single-pass tree scan with a directory-mtime cache and a cached git status
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+from git_engine import GitError, get_git_engine
+from workspace_manager import default_project_root
+
+# Listed as entries but never descended into
+SKIP_DIRS = {".git", "node_modules", ".next", "out", "__pycache__", ".venv"}
+
+
+class ProjectScanner:
+    def __init__(self, root, min_interval=1.0, git_max_age=10.0):
+        self.root = Path(root)
+        self.min_interval = min_interval
+        self.git_max_age = git_max_age
+        self.lock = threading.RLock()
+        # relative dir -> (mtime_ns, {name: is_dir})
+        self.dirs = {}
+        self.last_refresh = 0.0
+        self.generation = 0
+        self.git_key = None
+        self.git_checked = 0.0
+        self.git_cache = None
+        self.stats = {"refreshes": 0, "dirs_stat": 0, "dirs_scanned": 0, "git_runs": 0}
+
+    def scan_dir(self, rel, mtime_ns):
+        entries = {}
+        with os.scandir(self.root / rel if rel else self.root) as it:
+            for entry in it:
+                try:
+                    # A symlinked directory is listed but not descended into: no cycles, no scans outside the root
+                    entries[entry.name] = entry.is_dir(follow_symlinks=False)
+                except OSError:
+                    continue
+        self.dirs[rel] = (mtime_ns, entries)
+        self.stats["dirs_scanned"] += 1
+        return entries
+
+    def refresh(self):
+        """Stat every known directory; re-list only those whose mtime moved"""
+        with self.lock:
+            seen = set()
+            changed = False
+            stack = [""]
+            while stack:
+                rel = stack.pop()
+                try:
+                    mtime_ns = os.stat(self.root / rel if rel else self.root).st_mtime_ns
+                except FileNotFoundError:
+                    continue
+                self.stats["dirs_stat"] += 1
+                seen.add(rel)
+                cached = self.dirs.get(rel)
+                if cached and cached[0] == mtime_ns:
+                    entries = cached[1]
+                else:
+                    entries = self.scan_dir(rel, mtime_ns)
+                    changed = True
+                for name, is_dir in entries.items():
+                    if is_dir and name not in SKIP_DIRS:
+                        stack.append(f"{rel}/{name}" if rel else name)
+
+            for rel in set(self.dirs) - seen:
+                del self.dirs[rel]
+                changed = True
+            if changed:
+                self.generation += 1
+            self.last_refresh = time.monotonic()
+            self.stats["refreshes"] += 1
+            return changed
+
+    def ensure_fresh(self):
+        if time.monotonic() - self.last_refresh >= self.min_interval or not self.dirs:
+            self.refresh()
+
+    def lookup(self, relative_path):
+        """Return True (dir), False (file) or None (missing) for a path relative to root"""
+        self.ensure_fresh()
+        parent, _, name = str(relative_path).strip("/").rpartition("/")
+        with self.lock:
+            cached = self.dirs.get(parent)
+            if cached is not None:
+                return cached[1].get(name)
+        # Inside a skipped directory: fall back to a direct stat
+        path = self.root / relative_path
+        if path.is_dir():
+            return True
+        return False if path.exists() else None
+
+    def exists(self, relative_path):
+        return self.lookup(relative_path) is not None
+
+    def is_dir(self, relative_path):
+        return self.lookup(relative_path) is True
+
+    def is_file(self, relative_path):
+        return self.lookup(relative_path) is False
+
+    def files(self, relative_dir=""):
+        """Every file under `relative_dir` from the cached tree (skipped dirs excluded)"""
+        self.ensure_fresh()
+        prefix = str(relative_dir).strip("/")
+        found = []
+        with self.lock:
+            for rel, (_, entries) in self.dirs.items():
+                if prefix and rel != prefix and not rel.startswith(prefix + "/"):
+                    continue
+                found.extend(f"{rel}/{name}" if rel else name for name, is_dir in entries.items() if not is_dir)
+        return sorted(found)
+
+    def git_index_key(self):
+        git_dir = self.root / ".git"
+        key = []
+        for name in ("index", "HEAD"):
+            try:
+                key.append(os.stat(git_dir / name).st_mtime_ns)
+            except (FileNotFoundError, NotADirectoryError):
+                key.append(None)
+        return tuple(key)
+
+    def git_status(self):
+        """Cached `git status`, re-run when the index/HEAD or the tree shape changes
+
+        Edits to already-tracked files touch neither, so the result is also
+        refreshed after `git_max_age` seconds.
+        """
+        self.ensure_fresh()
+        with self.lock:
+            if not self.exists(".git"):
+                return {"state": "no_git", "changes": []}
+            key = (self.git_index_key(), self.generation)
+            fresh = time.monotonic() - self.git_checked < self.git_max_age
+            if self.git_cache is not None and key == self.git_key and fresh:
+                return self.git_cache
+
+            try:
+                changes = get_git_engine(self.root).status()
+            except GitError:
+                return {"state": "no_git", "changes": []}
+            self.stats["git_runs"] += 1
+
+            self.git_cache = {"state": "changes" if changes else "clean", "changes": changes}
+            # Re-read the key: git status may refresh the index stat cache itself
+            self.git_key = (self.git_index_key(), self.generation)
+            self.git_checked = time.monotonic()
+            return self.git_cache
+
+
+_scanners = {}
+_scanners_lock = threading.Lock()
+
+
+def get_scanner(root=None):
+    """Shared scanner per project root so every status method reuses one cache"""
+    root = str(Path(root or default_project_root()).resolve())
+    with _scanners_lock:
+        if root not in _scanners:
+            _scanners[root] = ProjectScanner(root)
+        return _scanners[root]
+
+
+if __name__ == "__main__":
+    scanner = get_scanner(sys.argv[1] if len(sys.argv) > 1 else None)
+    started = time.perf_counter()
+    scanner.refresh()
+    cold = time.perf_counter() - started
+    started = time.perf_counter()
+    scanner.refresh()
+    warm = time.perf_counter() - started
+    print("🔎 Project Scan:")
+    print(json.dumps({
+        "root": str(scanner.root),
+        "directories": len(scanner.dirs),
+        "cold_ms": round(cold * 1000, 2),
+        "warm_ms": round(warm * 1000, 2),
+        "git": scanner.git_status()["state"],
+        **scanner.stats
+    }, indent=2))
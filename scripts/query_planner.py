@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Query Planner for Anders
+Recommends secondary indexes for the access paths the generated routes use
+"""
+
+import json
+import sqlite3
+import sys
+from pathlib import Path
+
+from schema_parser import default_schema_path, load_schema, schema_hash, to_sqlite
+from template_engine import API_TABLES
+
+# Access paths beyond the generic list/join ones derived from the schema
+EXTRA_ACCESS_PATHS = [
+    {
+        "table": "agent_logs",
+        "columns": ["agent_id", "created_at"],
+        "query": "SELECT * FROM agent_logs WHERE agent_id = ? ORDER BY created_at DESC LIMIT 50",
+        "source": "agent activity feed"
+    },
+    {
+        "table": "tasks",
+        "columns": ["status", "priority", "due_date"],
+        "query": "SELECT * FROM tasks WHERE status = 'pending' ORDER BY priority, due_date LIMIT 32",
+        "source": "task scheduler dispatch"
+    },
+    {
+        "table": "site_monitoring",
+        "columns": ["url", "last_check"],
+        "query": "SELECT * FROM site_monitoring WHERE url = ? ORDER BY last_check DESC LIMIT 1",
+        "source": "latest check per site"
+    }
+]
+
+
+def access_paths(schema):
+    """Queries issued against each table by the generated routes and agents"""
+    paths = []
+    for table in schema.tables.values():
+        # Only API_TABLES get a generated route (template_engine orders its GET by created_at)
+        if table.name in API_TABLES and table.column("created_at"):
+            paths.append({
+                "table": table.name,
+                "columns": ["created_at"],
+                "query": f"SELECT * FROM {table.name} ORDER BY created_at DESC LIMIT 50",
+                "source": f"GET /api/{table.name}"
+            })
+        for fk in table.foreign_keys:
+            paths.append({
+                "table": table.name,
+                "columns": [fk.column],
+                "query": f"SELECT * FROM {table.name} WHERE {fk.column} = ?",
+                "source": f"join/ON DELETE {fk.on_delete or 'RESTRICT'} from {fk.ref_table}"
+            })
+    paths.extend(path for path in EXTRA_ACCESS_PATHS if path["table"] in schema.tables)
+    return paths
+
+
+def recommend_indexes(schema, dialect="mysql"):
+    """Indexes needed by the access paths and not already provided by the schema
+
+    MySQL counts the index InnoDB creates for every foreign key; SQLite does not.
+    """
+    portable = dialect != "mysql"
+    wanted = {}
+    for path in access_paths(schema):
+        table = schema.table(path["table"])
+        columns = tuple(path["columns"])
+        if table.covered_by_index(columns, portable=portable):
+            continue
+        wanted.setdefault(table.name, {}).setdefault(columns, []).append(path["source"])
+
+    recommendations = []
+    for table_name, candidates in wanted.items():
+        # Widest first: a composite index also serves queries on its leading columns
+        kept = {}
+        for columns in sorted(candidates, key=len, reverse=True):
+            wider = next((k for k in kept if k[:len(columns)] == columns), None)
+            if wider:
+                kept[wider].extend(candidates[columns])
+            else:
+                kept[columns] = list(candidates[columns])
+        for columns, sources in kept.items():
+            recommendations.append({
+                "table": table_name,
+                "name": f"idx_{table_name}_{'_'.join(columns)}",
+                "columns": list(columns),
+                "serves": sorted(set(sources))
+            })
+    return recommendations
+
+
+def create_index_sql(name, table, columns):
+    """CREATE INDEX that is skipped when the index exists (MySQL has no CREATE INDEX IF NOT EXISTS)"""
+    return "\n".join([
+        "SET @ddl = IF((SELECT COUNT(*) FROM information_schema.STATISTICS",
+        f"             WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = '{table}' AND INDEX_NAME = '{name}') = 0,",
+        f"            'CREATE INDEX {name} ON {table} ({', '.join(columns)})', 'DO 0');",
+        "PREPARE ddl FROM @ddl; EXECUTE ddl; DEALLOCATE PREPARE ddl;"
+    ])
+
+
+def migration_sql(schema, recommendations, source_hash=None):
+    """Migration adding `recommendations` to a database built from `schema`
+
+    Deterministic for a given schema.sql (the hash in the header identifies it) and safe to re-run.
+    """
+    lines = [
+        "-- Recommended secondary indexes for Command Center",
+        "-- Generated by Anders query_planner.py",
+    ]
+    if source_hash:
+        lines.append(f"-- schema.sql sha256: {source_hash}")
+    lines.append("")
+    lines.append("USE command_center;")
+    for rec in recommendations:
+        lines.append("")
+        lines.append(f"-- Serves: {'; '.join(rec['serves'])}")
+        lines.append(create_index_sql(rec["name"], rec["table"], rec["columns"]))
+    return "\n".join(lines) + "\n"
+
+
+def explain_sqlite(schema):
+    """EXPLAIN QUERY PLAN for every access path, before and after the recommended indexes"""
+    db = sqlite3.connect(":memory:")
+    db.executescript(to_sqlite(schema))
+    paths = access_paths(schema)
+
+    def plans():
+        result = []
+        for path in paths:
+            params = [None] * path["query"].count("?")
+            rows = db.execute(f"EXPLAIN QUERY PLAN {path['query']}", params).fetchall()
+            result.append(" | ".join(row[-1] for row in rows))
+        return result
+
+    before = plans()
+    recommendations = recommend_indexes(schema, dialect="sqlite")
+    for rec in recommendations:
+        db.execute(f"CREATE INDEX {rec['name']} ON {rec['table']} ({', '.join(rec['columns'])})")
+    after = plans()
+    db.close()
+
+    return [
+        {"table": path["table"], "source": path["source"], "query": path["query"],
+         "before": plan_before, "after": plan_after}
+        for path, plan_before, plan_after in zip(paths, before, after)
+    ]
+
+
+def format_report(rows):
+    lines = []
+    for row in rows:
+        changed = "✅" if row["before"] != row["after"] else "  "
+        lines.append(f"{changed} {row['table']}: {row['source']}")
+        lines.append(f"     {row['query']}")
+        lines.append(f"     before: {row['before']}")
+        lines.append(f"     after:  {row['after']}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    command = args[0] if args and not args[0].startswith("--") else "report"
+    schema_path = Path(args[args.index("--schema") + 1]) if "--schema" in args else default_schema_path()
+    schema = load_schema(schema_path)
+
+    if command == "report":
+        print("📈 Access path plan (SQLite EXPLAIN QUERY PLAN):")
+        print(format_report(explain_sqlite(schema)))
+        print("\n🗂️ Recommended indexes (MySQL):")
+        print(json.dumps(recommend_indexes(schema), indent=2))
+    elif command == "migration":
+        sql = migration_sql(schema, recommend_indexes(schema), schema_hash(schema_path))
+        if "--write" in args:
+            target = Path(args[args.index("--write") + 1])
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_text(sql)
+            print(f"✅ Migration written to {target}")
+        else:
+            print(sql)
+    else:
+        print(f"❌ Unknown command: {command}")
+        print("Usage: python3 query_planner.py [report|migration] [--schema path] [--write file]")
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Rate limiting for Anders
+Async token buckets for requests-per-minute and tokens-per-minute budgets
+"""
+
+import asyncio
+import time
+
+
+class TokenBucket:
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        """Seconds until `amount` tokens are available (0 if available now)"""
+        self.refill()
+        # A single request larger than the bucket is allowed once the bucket is full
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount):
+        self.tokens -= min(amount, self.capacity)
+
+
+class AsyncRateLimiter:
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None):
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.lock = asyncio.Lock()
+        self.waited = 0.0
+
+    async def acquire(self, tokens=0):
+        """Block until both the request and token budgets allow one more call"""
+        async with self.lock:
+            while True:
+                delay = 0.0
+                if self.request_bucket:
+                    delay = max(delay, self.request_bucket.wait_time(1))
+                if self.token_bucket and tokens:
+                    delay = max(delay, self.token_bucket.wait_time(tokens))
+                if delay <= 0:
+                    break
+                self.waited += delay
+                await asyncio.sleep(delay)
+            if self.request_bucket:
+                self.request_bucket.consume(1)
+            if self.token_bucket and tokens:
+                self.token_bucket.consume(tokens)
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Response cache for Anders
+Content-addressed on-disk cache for code generation responses
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+
+def default_cache_dir():
+    return Path(os.getenv('ANDERS_CACHE_DIR', Path.home() / ".cache" / "anders")).expanduser()
+
+
+def cache_key(payload):
+    """Hash of everything that determines a completion: model, messages, temperature, max_tokens"""
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class ResponseCache:
+    """SQLite-backed LRU with an in-memory front; hit bookkeeping is written lazily
+
+    A hit only updates in-memory counters. Access times, per-entry hit counts and the hit/miss totals go to disk
+    in one transaction every `flush_every` lookups or `flush_seconds`, before eviction and on exit.
+    """
+
+    def __init__(self, path=None, max_bytes=None, max_entries=None, ttl_seconds=None, memory_entries=256,
+                 flush_every=64, flush_seconds=5.0):
+        self.path = Path(path) if path else default_cache_dir() / "responses.db"
+        self.max_bytes = max_bytes or int(os.getenv('ANDERS_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+        self.max_entries = max_entries or int(os.getenv('ANDERS_CACHE_MAX_ENTRIES', '10000'))
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv('ANDERS_CACHE_TTL', str(7 * 24 * 3600)))
+        self.memory_entries = memory_entries
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.flush_every = flush_every
+        self.flush_seconds = flush_seconds
+        self.touched = {}   # key -> [accessed_at, hits not yet written]
+        self.pending = {"hits": 0, "misses": 0}
+        self.last_flush = time.monotonic()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                hits INTEGER DEFAULT 0
+            )""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS stats (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            )""")
+
+    def is_expired(self, created_at, now):
+        return self.ttl_seconds > 0 and now - created_at > self.ttl_seconds
+
+    def get(self, key):
+        """Return the cached response for `key`, or None on miss/expiry"""
+        now = time.time()
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry and not self.is_expired(entry[1], now):
+                self.memory.move_to_end(key)
+                self.record(hit=True, key=key, now=now)
+                return entry[0]
+
+            row = self.db.execute(
+                "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or self.is_expired(row[1], now):
+                if row is not None:
+                    self.db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.memory.pop(key, None)
+                self.record(hit=False)
+                return None
+
+            self.remember(key, row[0], row[1])
+            self.record(hit=True, key=key, now=now)
+            return row[0]
+
+    def set(self, key, value, model=None):
+        now = time.time()
+        with self.lock:
+            self.touched.pop(key, None)
+            self.db.execute(
+                """INSERT OR REPLACE INTO responses (key, model, value, size, created_at, accessed_at, hits)
+                   VALUES (?, ?, ?, ?, ?, ?, 0)""",
+                (key, model, value, len(value.encode()), now, now)
+            )
+            self.remember(key, value, now)
+            self.write_pending()
+            self.evict()
+
+    def remember(self, key, value, created_at):
+        self.memory[key] = (value, created_at)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+    def record(self, hit, key=None, now=None):
+        if hit:
+            self.hits += 1
+            self.pending["hits"] += 1
+            touch = self.touched.setdefault(key, [now, 0])
+            touch[0] = now
+            touch[1] += 1
+        else:
+            self.misses += 1
+            self.pending["misses"] += 1
+        if (sum(self.pending.values()) >= self.flush_every
+                or time.monotonic() - self.last_flush >= self.flush_seconds):
+            self.write_pending()
+
+    def write_pending(self):
+        """Write buffered hit bookkeeping in one transaction; the caller holds self.lock"""
+        self.last_flush = time.monotonic()
+        if not self.touched and not any(self.pending.values()):
+            return
+        self.db.execute("BEGIN")
+        try:
+            self.db.executemany(
+                "UPDATE responses SET accessed_at = MAX(accessed_at, ?), hits = hits + ? WHERE key = ?",
+                [(accessed_at, hits, key) for key, (accessed_at, hits) in self.touched.items()]
+            )
+            self.db.executemany(
+                """INSERT INTO stats (name, value) VALUES (?, ?)
+                   ON CONFLICT(name) DO UPDATE SET value = value + excluded.value""",
+                [(name, count) for name, count in self.pending.items() if count]
+            )
+            self.db.execute("COMMIT")
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+        self.touched = {}
+        self.pending = {"hits": 0, "misses": 0}
+
+    def flush(self):
+        with self.lock:
+            self.write_pending()
+
+    def evict(self):
+        """Drop least recently used entries until size and count bounds hold"""
+        count, total = self.db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return 0
+        evicted = 0
+        for key, size in self.db.execute(
+            "SELECT key, size FROM responses ORDER BY accessed_at ASC"
+        ).fetchall():
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            self.db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self.memory.pop(key, None)
+            count -= 1
+            total -= size
+            evicted += 1
+        return evicted
+
+    def purge_expired(self):
+        if self.ttl_seconds <= 0:
+            return 0
+        with self.lock:
+            self.write_pending()
+            cursor = self.db.execute(
+                "DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+            )
+            self.memory.clear()
+            return cursor.rowcount
+
+    def clear(self):
+        with self.lock:
+            self.db.execute("DELETE FROM responses")
+            self.db.execute("DELETE FROM stats")
+            self.memory.clear()
+            self.touched = {}
+            self.pending = {"hits": 0, "misses": 0}
+
+    def entries(self, limit=20):
+        self.flush()
+        return [
+            {
+                "key": key[:16],
+                "model": model,
+                "size": size,
+                "age_seconds": round(time.time() - created_at, 1),
+                "hits": hits
+            }
+            for key, model, size, created_at, hits in self.db.execute(
+                """SELECT key, model, size, created_at, hits FROM responses
+                   ORDER BY accessed_at DESC LIMIT ?""", (limit,)
+            )
+        ]
+
+    def stats(self):
+        self.flush()
+        count, total = self.db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        persisted = dict(self.db.execute("SELECT name, value FROM stats").fetchall())
+        lifetime_hits = persisted.get("hits", 0)
+        lifetime_misses = persisted.get("misses", 0)
+        lookups = lifetime_hits + lifetime_misses
+        return {
+            "path": str(self.path),
+            "entries": count,
+            "bytes": total,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "session_hits": self.hits,
+            "session_misses": self.misses,
+            "hits": lifetime_hits,
+            "misses": lifetime_misses,
+            "hit_rate": round(lifetime_hits / lookups, 3) if lookups else 0.0
+        }
+
+
+_shared_cache = None
+
+
+def get_shared_cache():
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = ResponseCache()
+        atexit.register(_shared_cache.flush)
+    return _shared_cache
+
+
+if __name__ == "__main__":
+    cache = ResponseCache()
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+
+    if command == "stats":
+        print("🗃️ Response Cache:")
+        print(json.dumps(cache.stats(), indent=2))
+    elif command == "list":
+        print(json.dumps(cache.entries(int(sys.argv[2]) if len(sys.argv) > 2 else 20), indent=2))
+    elif command == "purge":
+        print(f"🧹 Purged {cache.purge_expired()} expired entries")
+    elif command == "clear":
+        cache.clear()
+        print("🧹 Cache cleared")
+    else:
+        print(f"❌ Unknown command: {command}")
+        print("Available: stats, list [n], purge, clear")
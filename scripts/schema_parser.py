@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Schema Parser for Anders
+Loads database/schema.sql into table, column, foreign key and enum models
+"""
+
+import hashlib
+import json
+import re
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from workspace_manager import default_project_root
+
+CREATE_TABLE = re.compile(r"CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?`?(\w+)`?\s*\((.*?)\)\s*;", re.I | re.S)
+FOREIGN_KEY = re.compile(
+    r"FOREIGN\s+KEY\s*\(`?(\w+)`?\)\s*REFERENCES\s+`?(\w+)`?\s*\(`?(\w+)`?\)"
+    r"(?:\s+ON\s+DELETE\s+(CASCADE|SET\s+NULL|RESTRICT|NO\s+ACTION))?", re.I
+)
+COLUMN = re.compile(r"`?(\w+)`?\s+(\w+)(\([^)]*\))?(.*)", re.S)
+CREATE_INDEX = re.compile(
+    r"CREATE\s+(UNIQUE\s+)?INDEX\s+`?(\w+)`?\s+ON\s+`?(\w+)`?\s*\((.*?)\)\s*;", re.I | re.S
+)
+INLINE_INDEX = re.compile(r"(UNIQUE\s+)?(?:KEY|INDEX)\s+`?(\w+)`?\s*\((.*)\)\s*$", re.I | re.S)
+# Whole words only, so columns like `checks` or `key_name` are not mistaken for constraints
+CONSTRAINT = re.compile(r"(PRIMARY\s+KEY|FOREIGN\s+KEY|UNIQUE|KEY|INDEX|CONSTRAINT|CHECK)\b", re.I)
+
+# load_schema caches: sha256 -> parsed Schema, and path -> ((mtime_ns, size), sha256)
+_parsed = {}
+_stat_keys = {}
+
+
+@dataclass
+class Column:
+    name: str
+    sql_type: str
+    length: str = None
+    enum_values: list = field(default_factory=list)
+    nullable: bool = True
+    default: str = None
+    primary_key: bool = False
+    auto_increment: bool = False
+    unique: bool = False
+    on_update: str = None
+
+    @property
+    def is_enum(self):
+        return self.sql_type == "ENUM"
+
+    @property
+    def is_json(self):
+        return self.sql_type == "JSON"
+
+    @property
+    def server_generated(self):
+        """Filled in by the database rather than the caller"""
+        return self.auto_increment or (self.default or "").upper() == "CURRENT_TIMESTAMP"
+
+
+@dataclass
+class ForeignKey:
+    column: str
+    ref_table: str
+    ref_column: str
+    on_delete: str = None
+
+
+@dataclass
+class Index:
+    name: str
+    columns: list
+    unique: bool = False
+    implicit: str = None  # why the engine maintains it without a declaration, if it does
+
+
+@dataclass
+class Table:
+    name: str
+    columns: list = field(default_factory=list)
+    foreign_keys: list = field(default_factory=list)
+    indexes: list = field(default_factory=list)
+
+    def column(self, name):
+        for column in self.columns:
+            if column.name == name:
+                return column
+        return None
+
+    @property
+    def primary_key(self):
+        return next((c.name for c in self.columns if c.primary_key), None)
+
+    def all_indexes(self):
+        """Declared indexes plus the ones MySQL/InnoDB creates on its own"""
+        indexes = list(self.indexes)
+        if self.primary_key:
+            indexes.append(Index("PRIMARY", [self.primary_key], unique=True, implicit="primary key"))
+        for column in self.columns:
+            if column.unique and not column.primary_key:
+                indexes.append(Index(column.name, [column.name], unique=True, implicit="unique column"))
+        for fk in self.foreign_keys:
+            # InnoDB adds an index for a foreign key unless one already leads with its column
+            if not any(index.columns[:1] == [fk.column] for index in indexes):
+                indexes.append(Index(fk.column, [fk.column], implicit="InnoDB foreign key"))
+        return indexes
+
+    def covered_by_index(self, columns, portable=False):
+        """True if some index starts with `columns`; portable ignores InnoDB-only FK indexes"""
+        for index in self.all_indexes():
+            if portable and index.implicit == "InnoDB foreign key":
+                continue
+            if index.columns[:len(columns)] == list(columns):
+                return True
+        return False
+
+
+@dataclass
+class Schema:
+    tables: dict = field(default_factory=dict)
+
+    def table(self, name):
+        return self.tables[name]
+
+    def to_dict(self):
+        return {
+            name: {
+                "columns": [vars(c) for c in table.columns],
+                "foreign_keys": [vars(fk) for fk in table.foreign_keys],
+                "indexes": [vars(index) for index in table.indexes]
+            }
+            for name, table in self.tables.items()
+        }
+
+
+def strip_comments(sql):
+    sql = re.sub(r"/\*.*?\*/", "", sql, flags=re.S)
+    return re.sub(r"--[^\n]*", "", sql)
+
+
+def split_definitions(body):
+    """Split a CREATE TABLE body on top-level commas (ENUM lists contain commas too)"""
+    parts, depth, current, quote = [], 0, [], None
+    for char in body:
+        if quote:
+            current.append(char)
+            if char == quote:
+                quote = None
+            continue
+        if char in ("'", '"'):
+            quote = char
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            parts.append("".join(current).strip())
+            current = []
+            continue
+        current.append(char)
+    if "".join(current).strip():
+        parts.append("".join(current).strip())
+    return parts
+
+
+def parse_column(definition):
+    match = COLUMN.match(definition)
+    name, sql_type, args, rest = match.group(1), match.group(2).upper(), match.group(3), match.group(4)
+    column = Column(name=name, sql_type=sql_type)
+    if args and sql_type == "ENUM":
+        column.enum_values = re.findall(r"'((?:[^']|'')*)'", args)
+    elif args:
+        column.length = args.strip("()")
+
+    upper = rest.upper()
+    column.nullable = "NOT NULL" not in upper
+    column.primary_key = "PRIMARY KEY" in upper
+    column.auto_increment = "AUTO_INCREMENT" in upper
+    column.unique = bool(re.search(r"\bUNIQUE\b", upper))
+    if column.primary_key:
+        column.nullable = False
+
+    default = re.search(r"DEFAULT\s+('(?:[^']|'')*'|\S+)", rest, re.I)
+    if default:
+        column.default = default.group(1).strip("'")
+    on_update = re.search(r"ON\s+UPDATE\s+(\S+)", rest, re.I)
+    if on_update:
+        column.on_update = on_update.group(1)
+    return column
+
+
+def parse_schema(sql):
+    """Parse every CREATE TABLE statement in `sql`"""
+    schema = Schema()
+    for name, body in CREATE_TABLE.findall(strip_comments(sql)):
+        table = Table(name=name)
+        for definition in split_definitions(body):
+            upper = definition.upper()
+            if CONSTRAINT.match(definition):
+                fk = FOREIGN_KEY.search(definition)
+                if fk:
+                    on_delete = re.sub(r"\s+", " ", fk.group(4).upper()) if fk.group(4) else None
+                    table.foreign_keys.append(ForeignKey(fk.group(1), fk.group(2), fk.group(3), on_delete))
+                elif upper.startswith("PRIMARY KEY"):
+                    for key in re.findall(r"\w+", definition[definition.index("(") :]):
+                        if table.column(key):
+                            table.column(key).primary_key = True
+                elif INLINE_INDEX.match(definition):
+                    unique, index_name, columns = INLINE_INDEX.match(definition).groups()
+                    table.indexes.append(Index(index_name, index_columns(columns), unique=bool(unique)))
+                continue
+            table.columns.append(parse_column(definition))
+        schema.tables[name] = table
+
+    for unique, index_name, table_name, columns in CREATE_INDEX.findall(strip_comments(sql)):
+        if table_name in schema.tables:
+            schema.tables[table_name].indexes.append(Index(index_name, index_columns(columns), unique=bool(unique)))
+    return schema
+
+
+def index_columns(columns):
+    # Drop prefix lengths and sort order: "url(191) DESC" -> "url"
+    return [re.match(r"`?(\w+)", part.strip()).group(1) for part in split_definitions(columns) if part.strip()]
+
+
+SQLITE_TYPES = {
+    "INT": "INTEGER", "BIGINT": "INTEGER", "SMALLINT": "INTEGER", "TINYINT": "INTEGER",
+    "BOOLEAN": "INTEGER", "BOOL": "INTEGER",
+    "DECIMAL": "NUMERIC", "FLOAT": "REAL", "DOUBLE": "REAL"
+}
+
+
+def sqlite_default(value):
+    if value.upper() in ("CURRENT_TIMESTAMP", "NULL"):
+        return value.upper()
+    if value.upper() in ("TRUE", "FALSE"):
+        return "1" if value.upper() == "TRUE" else "0"
+    if re.fullmatch(r"-?\d+(\.\d+)?", value):
+        return value
+    return "'" + value.replace("'", "''") + "'"
+
+
+def to_sqlite(schema):
+    """Translate the MySQL schema into SQLite DDL for local testing and query planning"""
+    statements = []
+    for table in schema.tables.values():
+        lines = []
+        for column in table.columns:
+            if column.primary_key and column.auto_increment:
+                lines.append(f"    {column.name} INTEGER PRIMARY KEY AUTOINCREMENT")
+                continue
+            parts = [column.name, SQLITE_TYPES.get(column.sql_type, "TEXT")]
+            if column.primary_key:
+                parts.append("PRIMARY KEY")
+            if not column.nullable and not column.primary_key:
+                parts.append("NOT NULL")
+            if column.unique:
+                parts.append("UNIQUE")
+            if column.default is not None:
+                parts.append(f"DEFAULT {sqlite_default(column.default)}")
+            lines.append("    " + " ".join(parts))
+        for fk in table.foreign_keys:
+            on_delete = f" ON DELETE {fk.on_delete}" if fk.on_delete else ""
+            lines.append(f"    FOREIGN KEY ({fk.column}) REFERENCES {fk.ref_table}({fk.ref_column}){on_delete}")
+        statements.append(f"CREATE TABLE IF NOT EXISTS {table.name} (\n" + ",\n".join(lines) + "\n);")
+        for index in table.indexes:
+            unique = "UNIQUE " if index.unique else ""
+            statements.append(
+                f"CREATE {unique}INDEX IF NOT EXISTS {index.name} ON {table.name} ({', '.join(index.columns)});"
+            )
+    return "\n".join(statements)
+
+
+def default_schema_path():
+    """schema.sql of the configured project, else the one in the repository this script lives in"""
+    path = default_project_root() / "database/schema.sql"
+    if path.exists():
+        return path
+    return Path(__file__).resolve().parent.parent / "database/schema.sql"
+
+
+def load_schema(path=None):
+    """Parse schema.sql, reusing the previous result while the file's hash is unchanged"""
+    path = Path(path or default_schema_path())
+    stat = path.stat()
+    stat_key = (stat.st_mtime_ns, stat.st_size)
+    cached = _stat_keys.get(str(path))
+    if cached and cached[0] == stat_key:
+        return _parsed[cached[1]]
+
+    data = path.read_bytes()
+    digest = hashlib.sha256(data).hexdigest()
+    _stat_keys[str(path)] = (stat_key, digest)
+    if digest not in _parsed:
+        _parsed[digest] = parse_schema(data.decode())
+    return _parsed[digest]
+
+
+def schema_hash(path=None):
+    path = Path(path or default_schema_path())
+    load_schema(path)
+    return _stat_keys[str(path)][1]
+
+
+if __name__ == "__main__":
+    schema = load_schema(sys.argv[1] if len(sys.argv) > 1 else None)
+    print(json.dumps(schema.to_dict(), indent=2))
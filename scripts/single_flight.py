@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Single Flight for Anders
+Concurrent identical calls share one upstream execution, from threads and asyncio tasks alike
+"""
+
+import asyncio
+import hashlib
+import json
+import sys
+import threading
+import time
+from concurrent.futures import Future
+
+
+def normalize(text):
+    """Prompt text as it matters for deduplication: no CRLF, no trailing whitespace, no outer blank lines"""
+    return "\n".join(line.rstrip() for line in text.replace("\r\n", "\n").strip().split("\n"))
+
+
+def canonical(value):
+    if isinstance(value, str):
+        return normalize(value)
+    if isinstance(value, dict):
+        return {str(k): canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [canonical(v) for v in value]
+    return value
+
+
+def flight_key(*parts):
+    """Hash of the call's parameters with every string in them normalized"""
+    text = json.dumps(canonical(parts), sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class SingleFlight:
+    """Per-key table of in-flight calls: the first caller runs, callers arriving meanwhile wait for its result
+
+    Results (and exceptions) are shared, not copied. The leader's Future is a concurrent.futures.Future,
+    so threads block on it and coroutines await it through asyncio.wrap_future; either kind can lead.
+    A blocking do() must not wait on a coroutine leader running on its own event loop thread.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.lock = threading.Lock()
+        self.flights = {}
+        self.stats = {"calls": 0, "executions": 0, "collapsed": 0, "errors": 0, "max_waiters": 0}
+
+    def join(self, key):
+        """(future, leader): an existing flight to wait on, or a new one this caller must complete"""
+        with self.lock:
+            self.stats["calls"] += 1
+            flight = self.flights.get(key)
+            if flight is not None:
+                flight["waiters"] += 1
+                self.stats["collapsed"] += 1
+                self.stats["max_waiters"] = max(self.stats["max_waiters"], flight["waiters"])
+                return flight["future"], False
+            future = Future()
+            self.flights[key] = {"future": future, "waiters": 0}
+            self.stats["executions"] += 1
+            return future, True
+
+    def land(self, key, future, result=None, error=None):
+        # Unregister before publishing so a caller arriving after the result starts a fresh flight
+        with self.lock:
+            del self.flights[key]
+            if error is not None:
+                self.stats["errors"] += 1
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key, fn, *args, **kwargs):
+        """Call fn(*args, **kwargs) unless an identical call is in flight; returns (result, shared)"""
+        future, leader = self.join(key)
+        if not leader:
+            return future.result(), True
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            self.land(key, future, error=e)
+            raise
+        self.land(key, future, result)
+        return result, False
+
+    async def ado(self, key, fn, *args, **kwargs):
+        """Await fn(*args, **kwargs) unless an identical call is in flight; returns (result, shared)
+
+        The leader's work runs as its own task, so cancelling any one caller (the leader included)
+        does not cancel the call the others are waiting on.
+        """
+        future, leader = self.join(key)
+        if leader:
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+
+            def finished(task):
+                if task.cancelled():
+                    self.land(key, future, error=asyncio.CancelledError())
+                elif task.exception() is not None:
+                    self.land(key, future, error=task.exception())
+                else:
+                    self.land(key, future, task.result())
+
+            task.add_done_callback(finished)
+        return await asyncio.shield(asyncio.wrap_future(future)), not leader
+
+    def in_flight(self):
+        with self.lock:
+            return len(self.flights)
+
+    def snapshot(self):
+        with self.lock:
+            stats = dict(self.stats, in_flight=len(self.flights))
+        stats["collapse_ratio"] = round(stats["collapsed"] / stats["calls"], 3) if stats["calls"] else 0.0
+        return stats
+
+
+_groups = {}
+_groups_lock = threading.Lock()
+
+
+def get_flight(name):
+    """Process-wide group per call site, so separate integration instances still coalesce"""
+    with _groups_lock:
+        if name not in _groups:
+            _groups[name] = SingleFlight(name)
+        return _groups[name]
+
+
+def flight_stats():
+    with _groups_lock:
+        groups = list(_groups.values())
+    return {group.name: group.snapshot() for group in groups}
+
+
+def benchmark(callers=8, latency=0.2):
+    """`callers` threads and then `callers` asyncio tasks ask code_generation the same thing at once"""
+    import os
+    import tempfile
+    from concurrent.futures import ThreadPoolExecutor
+    from stub_openai_server import StubOpenAIServer
+    server = StubOpenAIServer(latency=latency)
+    base_url = server.start()
+    saved = {name: os.environ.get(name) for name in ("OPENAI_BASE_URL", "OPENAI_API_KEY", "ANDERS_CACHE_DIR")}
+    results = {"callers": callers, "latency_ms": latency * 1000}
+    try:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            os.environ.update(OPENAI_BASE_URL=base_url, OPENAI_API_KEY="bench", ANDERS_CACHE_DIR=cache_dir)
+            from openai_integration import OpenAIIntegration
+            openai = OpenAIIntegration(cache=False)
+
+            for label, coalesce in (("threads_uncoalesced", False), ("threads", True)):
+                openai.coalesce = coalesce
+                before = server.request_count
+                started = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=callers) as executor:
+                    list(executor.map(lambda _: openai.code_generation("Create a status badge"), range(callers)))
+                results[label] = {"upstream_requests": server.request_count - before,
+                                  "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)}
+
+            before = server.request_count
+            started = time.perf_counter()
+            asyncio.run(openai.generate_many(["Create a status badge"] * callers, concurrency=callers,
+                                             use_cache=False))
+            results["asyncio"] = {"upstream_requests": server.request_count - before,
+                                  "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)}
+    finally:
+        server.stop()
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+    # Run as a script this module is __main__; the integrations registered their groups in `single_flight`
+    from single_flight import flight_stats as shared_stats
+    results["groups"] = shared_stats()
+    return results
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "bench"
+    if command == "bench":
+        print("🛬 Single Flight Benchmark:")
+        print(json.dumps(benchmark(int(sys.argv[2]) if len(sys.argv) > 2 else 8), indent=2))
+    else:
+        print(f"❌ Unknown command: {command}")
+        print("Usage: python3 single_flight.py [bench [callers]]")
@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+Site Monitor for Anders
+Probes every URL in site_monitoring concurrently and records one row per check
+"""
+
+import asyncio
+import json
+import os
+import random
+import ssl
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from agent_db import get_database, percentile
+
+USER_AGENT = "Anders-SiteMonitor/1.0"
+MAX_BODY = 256 * 1024  # larger bodies are not worth draining; the connection is closed instead
+
+
+class ProbeError(Exception):
+    pass
+
+
+def host_timeouts_from_env():
+    """ANDERS_MONITOR_HOST_TIMEOUTS="dolk.dk=20,pejs.dk=5" -> {"dolk.dk": 20.0, "pejs.dk": 5.0}"""
+    timeouts = {}
+    for item in os.getenv('ANDERS_MONITOR_HOST_TIMEOUTS', '').split(","):
+        if "=" in item:
+            host, seconds = item.split("=", 1)
+            timeouts[host.strip()] = float(seconds)
+    return timeouts
+
+
+class AsyncHTTPPool:
+    """Minimal HTTP/1.1 client keeping idle keep-alive connections per (scheme, host, port)"""
+
+    def __init__(self, per_host=6, concurrency=500):
+        self.per_host = per_host
+        self.limits = defaultdict(lambda: asyncio.Semaphore(self.per_host))
+        self.slots = asyncio.Semaphore(concurrency)
+        self.idle = defaultdict(list)
+        self.ssl_context = ssl.create_default_context()
+        self.opened = 0
+        self.reused = 0
+
+    async def connect(self, key):
+        scheme, host, port = key
+        if scheme == "https":
+            conn = await asyncio.open_connection(host, port, ssl=self.ssl_context, server_hostname=host)
+        else:
+            conn = await asyncio.open_connection(host, port)
+        self.opened += 1
+        return conn
+
+    async def get(self, url, timeout):
+        """(status code, response time in ms) of a GET to `url`; raises ProbeError, OSError or asyncio.TimeoutError"""
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ProbeError(f"Unsupported URL: {url}")
+        key = (parts.scheme, parts.hostname, parts.port or (443 if parts.scheme == "https" else 80))
+        target = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        request = (
+            f"GET {target} HTTP/1.1\r\nHost: {parts.netloc}\r\nUser-Agent: {USER_AGENT}\r\n"
+            f"Accept: */*\r\nConnection: keep-alive\r\n\r\n"
+        ).encode()
+        async with self.limits[key], self.slots:
+            # Timed from here so waiting for a per-host slot does not count as site latency
+            started = time.perf_counter()
+            status = await asyncio.wait_for(self.exchange(key, request), timeout)
+            return status, round((time.perf_counter() - started) * 1000)
+
+    async def exchange(self, key, request):
+        idle = self.idle[key]
+        while True:
+            reused = bool(idle)
+            reader, writer = idle.pop() if reused else await self.connect(key)
+            try:
+                writer.write(request)
+                await writer.drain()
+                status, keep_alive = await self.read_response(reader)
+            except (ConnectionError, asyncio.IncompleteReadError) as e:
+                writer.close()
+                if reused:
+                    continue  # the server closed an idle connection; retry on a fresh one
+                raise ProbeError(f"Connection dropped: {e}") from e
+            except BaseException:
+                writer.close()
+                raise
+            if reused:
+                self.reused += 1
+            if keep_alive:
+                idle.append((reader, writer))
+            else:
+                writer.close()
+            return status
+
+    async def read_response(self, reader):
+        """Read status and drain the body so the connection can be reused; returns (status, keep_alive)"""
+        head = await reader.readuntil(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            version, status = lines[0].split(" ", 2)[:2]
+            status = int(status)
+        except ValueError:
+            raise ProbeError(f"Malformed status line: {lines[0][:80]!r}")
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip().lower()
+
+        keep_alive = version == "HTTP/1.1" and headers.get("connection") != "close"
+        if status in (204, 304) or 100 <= status < 200:
+            return status, keep_alive
+        if headers.get("transfer-encoding") == "chunked":
+            received = 0
+            while True:
+                size = int((await reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                if size == 0:
+                    await reader.readuntil(b"\r\n")
+                    return status, keep_alive
+                received += size
+                if received > MAX_BODY:
+                    return status, False
+                await reader.readexactly(size + 2)
+        if "content-length" in headers:
+            length = int(headers["content-length"])
+            if length > MAX_BODY:
+                return status, False
+            await reader.readexactly(length)
+            return status, keep_alive
+        return status, False  # body runs to EOF; nothing to reuse
+
+    def close(self):
+        for connections in self.idle.values():
+            for _, writer in connections:
+                writer.close()
+        self.idle.clear()
+
+
+@dataclass
+class Site:
+    site_name: str
+    url: str
+    interval: float
+    next_due: float = 0.0
+    failures: int = 0
+
+
+class SiteMonitor:
+    """Checks due sites in one concurrent sweep; failing sites are re-checked sooner"""
+
+    def __init__(self, database=None, interval=None, min_interval=None, timeout=None, host_timeouts=None,
+                 concurrency=None, per_host=None):
+        self.database = database
+        self.interval = interval or float(os.getenv('ANDERS_MONITOR_INTERVAL', '300'))
+        self.min_interval = min_interval or float(os.getenv('ANDERS_MONITOR_MIN_INTERVAL', '30'))
+        self.timeout = timeout or float(os.getenv('ANDERS_MONITOR_TIMEOUT', '10'))
+        self.host_timeouts = host_timeouts if host_timeouts is not None else host_timeouts_from_env()
+        self.concurrency = concurrency or int(os.getenv('ANDERS_MONITOR_CONCURRENCY', '500'))
+        self.per_host = per_host or int(os.getenv('ANDERS_MONITOR_PER_HOST', '6'))
+        self.sites = {}
+        self.pool = None
+        self.cycles = 0
+
+    def add_site(self, site_name, url):
+        if url not in self.sites:
+            self.sites[url] = Site(site_name, url, self.interval)
+        return self.sites[url]
+
+    def load_sites(self):
+        """Registered sites are the distinct URLs in site_monitoring"""
+        rows = self.database.fetchall("SELECT MIN(site_name), url FROM site_monitoring GROUP BY url")
+        for site_name, url in rows:
+            self.add_site(site_name, url)
+        return len(rows)
+
+    def register(self, site_name, url):
+        if not self.database.fetchone("SELECT 1 FROM site_monitoring WHERE url = ? LIMIT 1", (url,)):
+            self.database.execute("INSERT INTO site_monitoring (site_name, url) VALUES (?, ?)", (site_name, url))
+        return self.add_site(site_name, url)
+
+    def timeout_for(self, url):
+        return self.host_timeouts.get(urlsplit(url).hostname, self.timeout)
+
+    async def check(self, site):
+        status_code, response_time_ms, error = None, None, None
+        try:
+            status_code, response_time_ms = await self.pool.get(site.url, self.timeout_for(site.url))
+        except asyncio.TimeoutError:
+            error = f"Timed out after {self.timeout_for(site.url):g}s"
+        except (ProbeError, OSError, ValueError, asyncio.LimitOverrunError) as e:
+            # LimitOverrunError: a header block or chunk-size line longer than the stream buffer
+            error = str(e) or type(e).__name__
+        is_up = status_code is not None and status_code < 400
+        if status_code is not None and not is_up:
+            error = f"HTTP {status_code}"
+        return {
+            "site_name": site.site_name,
+            "url": site.url,
+            "status_code": status_code,
+            "response_time_ms": response_time_ms,
+            "is_up": is_up,
+            "last_check": datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
+            "error_message": error
+        }
+
+    def reschedule(self, site, result, now):
+        """Halve the interval on every consecutive failure (down to min_interval), back off on recovery"""
+        if result["is_up"]:
+            site.failures = 0
+            site.interval = min(self.interval, site.interval * 2)
+        else:
+            site.failures += 1
+            site.interval = max(self.min_interval, site.interval / 2)
+        # A little jitter keeps sites that failed together from being probed in lockstep forever
+        site.next_due = now + site.interval * random.uniform(0.95, 1.05)
+
+    def due(self, now=None):
+        now = time.monotonic() if now is None else now
+        return [site for site in self.sites.values() if site.next_due <= now]
+
+    def record(self, results):
+        """One transaction per sweep; every check becomes a history row"""
+        if not self.database or not results:
+            return 0
+        self.database.executemany(
+            "INSERT INTO site_monitoring (site_name, url, status_code, response_time_ms, is_up, last_check, "
+            "error_message) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(r["site_name"], r["url"], r["status_code"], r["response_time_ms"], r["is_up"], r["last_check"],
+              r["error_message"]) for r in results]
+        )
+        return len(results)
+
+    async def run_cycle(self, sites=None):
+        if self.pool is None:
+            self.pool = AsyncHTTPPool(self.per_host, self.concurrency)
+        sites = self.due() if sites is None else sites
+        started = time.perf_counter()
+        results = await asyncio.gather(*(self.check(site) for site in sites))
+        elapsed = time.perf_counter() - started
+        now = time.monotonic()
+        for site, result in zip(sites, results):
+            self.reschedule(site, result, now)
+        recorded = self.record(results)
+        self.cycles += 1
+
+        latencies = [r["response_time_ms"] for r in results if r["is_up"]]
+        return {
+            "checked": len(results),
+            "up": sum(1 for r in results if r["is_up"]),
+            "down": sum(1 for r in results if not r["is_up"]),
+            "recorded": recorded,
+            "elapsed_ms": round(elapsed * 1000, 1),
+            "checks_per_sec": round(len(results) / elapsed) if elapsed else 0,
+            "latency_ms": {"p50": percentile(latencies, 0.5), "p95": percentile(latencies, 0.95)},
+            "connections": {"opened": self.pool.opened, "reused": self.pool.reused},
+            "results": results
+        }
+
+    async def run_forever(self, reload_every=10):
+        while True:
+            if self.database and self.cycles % reload_every == 0:
+                self.load_sites()
+            if self.due():
+                summary = await self.run_cycle()
+                print(f"🌐 {summary['checked']} checked, {summary['up']} up, {summary['down']} down "
+                      f"in {summary['elapsed_ms']}ms")
+                for result in summary["results"]:
+                    if not result["is_up"]:
+                        print(f"   ❌ {result['url']}: {result['error_message']}")
+            next_due = min((site.next_due for site in self.sites.values()), default=time.monotonic() + self.interval)
+            await asyncio.sleep(max(1.0, next_due - time.monotonic()))
+
+    def close(self):
+        if self.pool:
+            self.pool.close()
+            self.pool = None
+
+
+def benchmark(urls=2000, hosts=50, latency=0.05, failure_rate=0.05, hang_rate=0.01, timeout=2.0):
+    """Sweep `urls` paths spread over `hosts` stub ports served from a separate process"""
+    stub = subprocess.Popen(
+        [sys.executable, str(Path(__file__).resolve().parent / "stub_site_server.py"), "--port", "0",
+         "--ports", str(hosts), "--latency", str(latency), "--failure-rate", str(failure_rate),
+         "--hang-rate", str(hang_rate)],
+        stdout=subprocess.PIPE, text=True
+    )
+    try:
+        ports = stub.stdout.readline().rsplit(" ", 1)[1].strip().split(",")
+        monitor = SiteMonitor(timeout=timeout, host_timeouts={})
+        for i in range(urls):
+            port = ports[i % len(ports)]
+            monitor.add_site(f"site-{i}", f"http://127.0.0.1:{port}/site/{i}")
+
+        async def sweep():
+            cold = await monitor.run_cycle(list(monitor.sites.values()))
+            warm = await monitor.run_cycle(list(monitor.sites.values()))
+            monitor.close()
+            return cold, warm
+
+        cpu_started = time.process_time()
+        cold, warm = asyncio.run(sweep())
+        cpu_seconds = time.process_time() - cpu_started
+        for summary in (cold, warm):
+            summary.pop("results")
+        return {"urls": urls, "hosts": hosts, "timeout": timeout, "cold": cold, "warm": warm,
+                "monitor_cpu_seconds": round(cpu_seconds, 2)}
+    finally:
+        stub.terminate()
+        stub.wait()
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "once"
+
+    if command == "bench":
+        count = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+        print("🌐 Site Monitor Benchmark:")
+        print(json.dumps(benchmark(count), indent=2))
+        sys.exit(0)
+
+    database = get_database()
+    monitor = SiteMonitor(database)
+    if command == "check":
+        # Ad-hoc probe of the given URLs, nothing recorded
+        monitor.database = None
+        for url in sys.argv[2:]:
+            monitor.add_site(urlsplit(url).hostname, url)
+        print(json.dumps(asyncio.run(monitor.run_cycle())["results"], indent=2))
+    elif database is None:
+        print("❌ No database configured. Set ANDERS_DATABASE_URL (e.g. sqlite:///anders.db) or DATABASE_HOST.")
+        sys.exit(1)
+    elif command == "add" and len(sys.argv) == 4:
+        monitor.register(sys.argv[2], sys.argv[3])
+        print(f"✅ Registered {sys.argv[3]}")
+    elif command == "once":
+        monitor.load_sites()
+        summary = asyncio.run(monitor.run_cycle())
+        results = summary.pop("results")
+        print("🌐 Site Check:")
+        print(json.dumps(summary, indent=2))
+        for result in results:
+            if not result["is_up"]:
+                print(f"   ❌ {result['url']}: {result['error_message']}")
+    elif command == "run":
+        try:
+            asyncio.run(monitor.run_forever())
+        except KeyboardInterrupt:
+            print("\n👋 Site monitor stopped")
+    else:
+        print(f"❌ Unknown command: {command}")
+        print("Usage: python3 site_monitor.py [once|run|add <name> <url>|check <url>...|bench [n]]")
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Local FTP stub for Anders
+Threaded passive-mode FTP server over a directory, with injectable per-command latency
+"""
+
+import argparse
+import os
+import shutil
+import socket
+import socketserver
+import tempfile
+import threading
+import time
+from pathlib import Path, PurePosixPath
+
+
+class FTPHandler(socketserver.StreamRequestHandler):
+    """One control connection; enough of RFC 959 for ftplib's login, MKD/RMD/DELE, STOR/RETR and SIZE"""
+
+    def setup(self):
+        super().setup()
+        self.cwd = PurePosixPath("/")
+        self.data_listener = None
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+        self.wfile.flush()
+
+    def local(self, path):
+        """Resolve a client path inside the served root; '..' cannot escape it"""
+        virtual = PurePosixPath(os.path.normpath(str(self.cwd / path))) if path else self.cwd
+        return Path(self.server.root, *virtual.parts[1:]), virtual
+
+    def handle(self):
+        self.server.connection_count += 1
+        self.reply("220 Anders stub FTP ready")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                break
+            command, _, argument = line.decode("utf-8", "replace").rstrip("\r\n").partition(" ")
+            command = command.upper()
+            self.server.command_count += 1
+            if self.server.latency:
+                time.sleep(self.server.latency)
+            handler = getattr(self, f"cmd_{command}", None)
+            if handler is None:
+                self.reply(f"502 {command} not implemented")
+                continue
+            try:
+                if handler(argument) is False:
+                    break
+            except OSError as e:
+                self.reply(f"550 {e.strerror or e}")
+
+    def cmd_USER(self, argument):
+        self.reply("331 Password required")
+
+    def cmd_PASS(self, argument):
+        self.reply("230 Logged in")
+
+    def cmd_SYST(self, argument):
+        self.reply("215 UNIX Type: L8")
+
+    def cmd_TYPE(self, argument):
+        self.reply("200 Type set")
+
+    def cmd_NOOP(self, argument):
+        self.reply("200 OK")
+
+    def cmd_QUIT(self, argument):
+        self.reply("221 Bye")
+        return False
+
+    def cmd_PWD(self, argument):
+        self.reply(f'257 "{self.cwd}"')
+
+    def cmd_CWD(self, argument):
+        path, virtual = self.local(argument)
+        if not path.is_dir():
+            self.reply("550 No such directory")
+            return
+        self.cwd = virtual
+        self.reply("250 OK")
+
+    def cmd_MKD(self, argument):
+        path, virtual = self.local(argument)
+        path.mkdir()
+        self.reply(f'257 "{virtual}" created')
+
+    def cmd_RMD(self, argument):
+        self.local(argument)[0].rmdir()
+        self.reply("250 Removed")
+
+    def cmd_DELE(self, argument):
+        self.local(argument)[0].unlink()
+        self.reply("250 Deleted")
+
+    def cmd_SIZE(self, argument):
+        path = self.local(argument)[0]
+        if not path.is_file():
+            self.reply("550 No such file")
+            return
+        self.reply(f"213 {path.stat().st_size}")
+
+    def cmd_PASV(self, argument):
+        if self.data_listener:
+            self.data_listener.close()
+        self.data_listener = socket.create_server((self.server.host, 0))
+        host, port = self.data_listener.getsockname()
+        self.reply(f"227 Entering Passive Mode ({host.replace('.', ',')},{port >> 8},{port & 0xff})")
+
+    def cmd_EPSV(self, argument):
+        if self.data_listener:
+            self.data_listener.close()
+        self.data_listener = socket.create_server((self.server.host, 0))
+        self.reply(f"229 Entering Extended Passive Mode (|||{self.data_listener.getsockname()[1]}|)")
+
+    def data_connection(self):
+        if self.data_listener is None:
+            self.reply("425 Use PASV first")
+            return None
+        self.reply("150 Opening data connection")
+        connection, _ = self.data_listener.accept()
+        self.data_listener.close()
+        self.data_listener = None
+        return connection
+
+    def cmd_STOR(self, argument):
+        path = self.local(argument)[0]
+        if not path.parent.is_dir():
+            self.reply("553 No such directory")
+            return
+        connection = self.data_connection()
+        if connection is None:
+            return
+        with connection, open(path, "wb") as f:
+            while True:
+                chunk = connection.recv(65536)
+                if not chunk:
+                    break
+                f.write(chunk)
+        self.server.bytes_received += path.stat().st_size
+        self.reply("226 Transfer complete")
+
+    def cmd_RETR(self, argument):
+        path = self.local(argument)[0]
+        if not path.is_file():
+            self.reply("550 No such file")
+            return
+        connection = self.data_connection()
+        if connection is None:
+            return
+        with connection, open(path, "rb") as f:
+            connection.sendfile(f)
+        self.reply("226 Transfer complete")
+
+    def cmd_NLST(self, argument):
+        path = self.local(argument)[0]
+        connection = self.data_connection()
+        if connection is None:
+            return
+        with connection:
+            connection.sendall("".join(f"{name}\r\n" for name in sorted(os.listdir(path))).encode())
+        self.reply("226 Transfer complete")
+
+
+class StubFTPServer(socketserver.ThreadingTCPServer):
+    """Serves `root` (a temporary directory by default) on 127.0.0.1; any user and password log in"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, root=None, host="127.0.0.1", port=0, latency=0.0):
+        self.owns_root = root is None
+        self.root = Path(root or tempfile.mkdtemp(prefix="anders-ftp-"))
+        self.host = host
+        self.latency = latency
+        self.connection_count = 0
+        self.command_count = 0
+        self.bytes_received = 0
+        self.thread = None
+        super().__init__((host, port), FTPHandler)
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self.port
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self.owns_root:
+            shutil.rmtree(self.root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local FTP stub for delta deploy tests")
+    parser.add_argument("--root", help="Directory to serve (default: a temporary directory)")
+    parser.add_argument("--port", type=int, default=2121)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every command")
+    args = parser.parse_args()
+
+    server = StubFTPServer(args.root, port=args.port, latency=args.latency)
+    print(f"📡 Stub FTP serving {server.root} on ftp://127.0.0.1:{server.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
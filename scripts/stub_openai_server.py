@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Local OpenAI API stub for Anders
+Mimics /v1/chat/completions so integrations can be exercised offline
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; with Nagle on, the body waits ~40ms for the client's delayed ACK
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def write_chunk(self, data):
+        self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def send_stream(self, request, content):
+        """Answer with server-sent events, one chunk per whitespace-delimited token"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        created = int(time.time())
+        tokens = re.findall(r"\S+\s*|\s+", content)
+        for index, token in enumerate(tokens):
+            if index and self.server.token_latency:
+                time.sleep(self.server.token_latency)
+            event = {
+                "id": f"chatcmpl-stub-{self.server.request_count}",
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": request.get("model", "gpt-4"),
+                "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]
+            }
+            self.write_chunk(f"data: {json.dumps(event)}\n\n".encode())
+        self.write_chunk(b"data: [DONE]\n\n")
+        self.write_chunk(b"")
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        self.server.record_request(request)
+
+        if self.path.rstrip("/") != "/v1/chat/completions":
+            self.send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        if self.server.should_fail():
+            self.send_json(
+                self.server.failure_status,
+                {"error": {"message": "Rate limit reached (stub)"}},
+                headers={"Retry-After": str(self.server.retry_after)}
+            )
+            return
+
+        prompt = request.get("messages", [{}])[-1].get("content", "")
+        content = self.server.completion_for(prompt)
+        if request.get("stream"):
+            self.send_stream(request, content)
+            return
+
+        prompt_tokens = sum(len(m.get("content", "").split()) for m in request.get("messages", []))
+        completion_tokens = len(content.split())
+        self.send_json(200, {
+            "id": f"chatcmpl-stub-{self.server.request_count}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "gpt-4"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+        })
+
+
+class StubOpenAIServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, failure_rate=0.0,
+                 failure_status=429, retry_after=0, verbose=False, token_latency=0.0):
+        super().__init__((host, port), StubOpenAIHandler)
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self.retry_after = retry_after
+        self.verbose = verbose
+        self.token_latency = token_latency
+        self.request_count = 0
+        self.requests = []
+        self.lock = threading.Lock()
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def record_request(self, request):
+        with self.lock:
+            self.request_count += 1
+            self.requests.append(request)
+
+    def should_fail(self):
+        return self.failure_rate and random.random() < self.failure_rate
+
+    def completion_for(self, prompt):
+        return f"```ts\n// Generated by stub for: {prompt[:60]}\nexport const ok = true;\n```"
+
+    def start(self):
+        """Serve in a background thread and return the base URL"""
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self.base_url
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local OpenAI API stub")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds of delay per request")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--retry-after", type=int, default=0)
+    parser.add_argument("--token-latency", type=float, default=0.0, help="Seconds between streamed tokens")
+    args = parser.parse_args()
+
+    server = StubOpenAIServer(args.host, args.port, args.latency, args.failure_rate,
+                              retry_after=args.retry_after, verbose=True,
+                              token_latency=args.token_latency)
+    print(f"🧪 Stub OpenAI API on {server.base_url}")
+    print(f"   export OPENAI_BASE_URL={server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
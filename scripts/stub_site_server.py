@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Local site stub for Anders
+Keep-alive HTTP server on one or more ports with injectable latency and failures
+"""
+
+import argparse
+import asyncio
+import random
+import re
+import threading
+
+STATUS_TEXT = {200: "OK", 404: "Not Found", 500: "Internal Server Error", 503: "Service Unavailable"}
+PATH_STATUS = re.compile(r"/status/(\d{3})")
+PATH_DELAY = re.compile(r"/delay/(\d+)")
+
+
+class StubSiteServer:
+    """Answers GET/HEAD on every path; /status/<code> and /delay/<ms> override the defaults"""
+
+    def __init__(self, host="127.0.0.1", ports=(0,), latency=0.0, failure_rate=0.0, hang_rate=0.0,
+                 body_size=512):
+        self.host = host
+        self.requested_ports = list(ports)
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.hang_rate = hang_rate
+        self.body = b"<html>" + b"x" * max(0, body_size - 13) + b"</html>"
+        self.request_count = 0
+        self.connection_count = 0
+        self.ports = []
+        self.servers = []
+        self.loop = None
+        self.thread = None
+        self.ready = threading.Event()
+
+    def urls(self, paths_per_port=1):
+        return [f"http://{self.host}:{port}/site/{i}" for i in range(paths_per_port) for port in self.ports]
+
+    async def handle(self, reader, writer):
+        self.connection_count += 1
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                method, path = head.split(b" ", 2)[:2]
+                path = path.decode()
+                self.request_count += 1
+
+                status, delay = 200, self.latency
+                if PATH_STATUS.match(path):
+                    status = int(PATH_STATUS.match(path).group(1))
+                if PATH_DELAY.match(path):
+                    delay = int(PATH_DELAY.match(path).group(1)) / 1000
+                if self.hang_rate and random.random() < self.hang_rate:
+                    delay = 3600
+                elif self.failure_rate and random.random() < self.failure_rate:
+                    status = 503
+                if delay:
+                    await asyncio.sleep(delay)
+
+                body = self.body if method != b"HEAD" else b""
+                writer.write(
+                    f"HTTP/1.1 {status} {STATUS_TEXT.get(status, 'Status')}\r\n"
+                    f"Content-Type: text/html\r\nContent-Length: {len(self.body)}\r\n\r\n".encode() + body
+                )
+                await writer.drain()
+                if b"connection: close" in head.lower():
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def listen(self):
+        for port in self.requested_ports:
+            server = await asyncio.start_server(self.handle, self.host, port, backlog=1024)
+            self.servers.append(server)
+            self.ports.append(server.sockets[0].getsockname()[1])
+        self.ready.set()
+        return self.ports
+
+    async def serve(self):
+        if not self.servers:
+            await self.listen()
+        await asyncio.gather(*(server.serve_forever() for server in self.servers))
+
+    def start(self):
+        """Serve from a background thread; returns the bound ports"""
+        def run():
+            self.loop = asyncio.new_event_loop()
+            try:
+                self.loop.run_until_complete(self.serve())
+            except asyncio.CancelledError:
+                pass
+
+        self.thread = threading.Thread(target=run, daemon=True)
+        self.thread.start()
+        self.ready.wait()
+        return self.ports
+
+    def stop(self):
+        if self.loop:
+            for server in self.servers:
+                self.loop.call_soon_threadsafe(server.close)
+            for task in asyncio.all_tasks(self.loop):
+                self.loop.call_soon_threadsafe(task.cancel)
+            self.thread.join(timeout=5)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local site stub")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8780, help="First port")
+    parser.add_argument("--ports", type=int, default=1, help="Number of consecutive ports (one 'host' each)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds of delay per request")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="Fraction of requests that never answer")
+    args = parser.parse_args()
+
+    ports = [args.port + i if args.port else 0 for i in range(args.ports)]
+    server = StubSiteServer(args.host, ports, args.latency, args.failure_rate, args.hang_rate)
+
+    async def main():
+        bound = await server.listen()
+        print(f"🧪 Stub sites on {args.host} ports {','.join(map(str, bound))}", flush=True)
+        await server.serve()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Task Scheduler for Anders
+Claims pending tasks by priority and deadline and dispatches them to agent workers
+"""
+
+import heapq
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from agent_db import get_database, percentile
+from log_sink import record_action
+
+NO_DEADLINE = "9999-12-31 23:59:59"
+STAMP = "%Y-%m-%d %H:%M:%S"
+
+# Task titles naming a built-in hybrid step (a hybrid_coding_agent.py command); anything else becomes a codex prompt
+HYBRID_COMMANDS = {"create_api", "setup_db", "init_git"}
+HYBRID_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "hybrid_coding_agent.py")
+
+
+def utc_stamp(offset_seconds=0):
+    return (datetime.now(timezone.utc) + timedelta(seconds=offset_seconds)).strftime(STAMP)
+
+
+class TaskExecutor:
+    """Runs one claimed task as a hybrid step or a codex prompt; returns (ok, detail)
+
+    Both kinds run in child processes that are killed at `timeout`, so a worker thread never outlives its task.
+    """
+
+    def __init__(self, project_root=None, auto_approve=False):
+        self.project_root = project_root
+        self.auto_approve = auto_approve
+        self.codex = None
+        self.lock = threading.Lock()
+
+    def codex_integration(self):
+        # Imported on first use so the scheduler itself starts without the agent stack
+        with self.lock:
+            if self.codex is None:
+                from codex_integration import CodexIntegration
+                self.codex = CodexIntegration(project_root=self.project_root)
+        return self.codex
+
+    def run_hybrid(self, command, timeout):
+        env = dict(os.environ)
+        if self.project_root:
+            env["ANDERS_PROJECT_ROOT"] = str(self.project_root)
+        try:
+            completed = subprocess.run([sys.executable, HYBRID_SCRIPT, command], capture_output=True, text=True,
+                                       env=env, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            return False, f"{command} timed out after {timeout:g}s"
+        # The command prints a header line, then its result as JSON
+        output = completed.stdout
+        try:
+            result = json.loads(output[output.index("{"):])
+        except ValueError:
+            return False, (completed.stderr or output).strip()[-500:] or f"{command} exited {completed.returncode}"
+        return bool(result.get("success")), result.get("error") or result.get("message")
+
+    def __call__(self, task, timeout):
+        command = task["title"].strip().lower()
+        if command in HYBRID_COMMANDS:
+            return self.run_hybrid(command, timeout)
+        prompt = task["title"] if not task["description"] else f"{task['title']}\n\n{task['description']}"
+        result = self.codex_integration().run_codex_command(prompt, auto_approve=self.auto_approve, timeout=timeout)
+        return result["status"] == "success", result.get("error") or result["status"]
+
+
+class TaskScheduler:
+    """Heap of pending tasks ordered by (priority, due_date, id), drained into a worker pool"""
+
+    def __init__(self, database, executor=None, agent="Anders", workers=None, timeout=None, max_attempts=None,
+                 retry_delay=None, poll_interval=None, prefetch=None):
+        self.database = database
+        self.executor = executor or TaskExecutor()
+        self.agent = agent
+        self.agent_id = database.agent_id(agent)
+        self.workers = workers or int(os.getenv('ANDERS_SCHEDULER_WORKERS', '4'))
+        self.timeout = timeout or float(os.getenv('ANDERS_TASK_TIMEOUT', '600'))
+        self.max_attempts = max_attempts or int(os.getenv('ANDERS_TASK_MAX_ATTEMPTS', '3'))
+        self.retry_delay = retry_delay if retry_delay is not None else float(os.getenv('ANDERS_TASK_RETRY_DELAY', '30'))
+        self.poll_interval = poll_interval or float(os.getenv('ANDERS_SCHEDULER_POLL', '2'))
+        self.prefetch = prefetch or self.workers * 8
+        # An in_progress row's run_after is its lease; renewed while it runs, requeued by anyone once it lapses
+        self.lease = float(os.getenv('ANDERS_TASK_LEASE', str(self.timeout + 60)))
+        self.pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="anders-task")
+
+        self.heap = []
+        self.queued = {}    # task id -> task row, while in the heap
+        self.running = {}   # task id -> (future, task, deadline, lease expiry)
+        self.wake = threading.Event()
+        self.stopping = False
+        self.last_poll = 0.0
+        self.dispatch_ms = deque(maxlen=1000)
+        self.run_ms = deque(maxlen=1000)
+        self.counters = {"claimed": 0, "claim_conflicts": 0, "completed": 0, "retried": 0,
+                         "failed": 0, "timed_out": 0, "reclaimed": 0}
+
+    def reclaim_expired(self):
+        """Requeue in_progress tasks whose lease lapsed (their scheduler died); exhausted ones go to review"""
+        now = utc_stamp()
+        expired = "status = 'in_progress' AND run_after IS NOT NULL AND run_after <= ?"
+        failed = self.database.execute(
+            f"UPDATE tasks SET status = 'review', run_after = NULL, updated_at = CURRENT_TIMESTAMP "
+            f"WHERE {expired} AND attempts >= ?", (now, self.max_attempts)
+        )["rowcount"]
+        requeued = self.database.execute(
+            f"UPDATE tasks SET status = 'pending', run_after = NULL, updated_at = CURRENT_TIMESTAMP WHERE {expired}",
+            (now,)
+        )["rowcount"]
+        if failed or requeued:
+            self.counters["reclaimed"] += failed + requeued
+            record_action(self.agent, "tasks_reclaimed", f"{requeued} requeued, {failed} to review", "warning",
+                          {"requeued": requeued, "review": failed})
+        return failed + requeued
+
+    def renew_leases(self):
+        """Push out the lease of every task still running here once half of it has passed"""
+        now = time.monotonic()
+        for task_id, (future, task, deadline, lease_until) in list(self.running.items()):
+            if lease_until - now < self.lease / 2:
+                self.database.execute(
+                    "UPDATE tasks SET run_after = ? WHERE id = ? AND status = 'in_progress' AND attempts = ?",
+                    (utc_stamp(self.lease), task_id, task["attempts"])
+                )
+                self.running[task_id] = (future, task, deadline, now + self.lease)
+
+    def refill(self):
+        """Pull the best pending tasks for this agent whose retry backoff has passed into the heap"""
+        self.reclaim_expired()
+        rows = self.database.fetchall(
+            "SELECT id, title, description, priority, due_date, attempts FROM tasks "
+            "WHERE status = 'pending' AND (assigned_agent_id IS NULL OR assigned_agent_id = ?) "
+            "AND (run_after IS NULL OR run_after <= ?) "
+            "ORDER BY priority, due_date IS NULL, due_date, id LIMIT ?",
+            (self.agent_id, utc_stamp(), self.prefetch)
+        )
+        for task_id, title, description, priority, due_date, attempts in rows:
+            if task_id in self.queued or task_id in self.running:
+                continue
+            task = {"id": task_id, "title": title, "description": description, "priority": priority,
+                    "due_date": str(due_date) if due_date else None, "attempts": attempts or 0,
+                    "seen_at": time.perf_counter()}
+            self.queued[task_id] = task
+            heapq.heappush(self.heap, (priority if priority is not None else 3, task["due_date"] or NO_DEADLINE,
+                                       task_id))
+        self.last_poll = time.monotonic()
+        return len(rows)
+
+    def claim(self, task):
+        """Atomically move a task from pending to in_progress; False if another worker got it first
+
+        Matching on the attempt count we read also rejects a task that was run
+        and re-queued by another scheduler since our refill.
+        """
+        params = (utc_stamp(self.lease), self.agent_id, task["id"], task["attempts"])
+        assign = ("UPDATE tasks SET status = 'in_progress', attempts = attempts + 1, run_after = ?, "
+                  "assigned_agent_id = COALESCE(assigned_agent_id, ?), updated_at = CURRENT_TIMESTAMP "
+                  "WHERE id = ? AND status = 'pending' AND attempts = ?")
+        if self.database.dialect == "mysql":
+            with self.database.transaction() as tx:
+                if not tx.fetchone("SELECT id FROM tasks WHERE id = ? AND status = 'pending' AND attempts = ? "
+                                   "FOR UPDATE SKIP LOCKED", params[2:]):
+                    return False
+                tx.execute(assign, params)
+        elif self.database.execute(assign, params)["rowcount"] != 1:
+            return False
+        task["attempts"] += 1
+        return True
+
+    def dispatch(self):
+        """Start the best queued tasks while workers are free"""
+        started = 0
+        while self.heap and len(self.running) < self.workers:
+            _, _, task_id = heapq.heappop(self.heap)
+            task = self.queued.pop(task_id)
+            if not self.claim(task):
+                self.counters["claim_conflicts"] += 1
+                continue
+            self.counters["claimed"] += 1
+            self.dispatch_ms.append((time.perf_counter() - task["seen_at"]) * 1000)
+            future = self.pool.submit(self.execute, task)
+            future.add_done_callback(lambda _: self.wake.set())
+            # Jobs are killed at `timeout`; the grace covers their cleanup
+            now = time.monotonic()
+            self.running[task_id] = (future, task, now + self.timeout + 30, now + self.lease)
+            started += 1
+        return started
+
+    def execute(self, task):
+        started = time.perf_counter()
+        try:
+            return self.executor(task, self.timeout)
+        except Exception as e:
+            return False, str(e)
+        finally:
+            self.run_ms.append((time.perf_counter() - started) * 1000)
+
+    def finish(self, task, ok, detail):
+        """Settle a run; a row whose lease lapsed and was requeued meanwhile is no longer ours and is left alone"""
+        task_id = task["id"]
+        owned = " WHERE id = ? AND status = 'in_progress' AND attempts = ?"
+        if ok:
+            self.database.execute(
+                "UPDATE tasks SET status = 'completed', completed_at = CURRENT_TIMESTAMP, run_after = NULL, "
+                "updated_at = CURRENT_TIMESTAMP" + owned, (task_id, task["attempts"])
+            )
+            self.counters["completed"] += 1
+            record_action(self.agent, "task_completed", task["title"][:200], "success", task_id=task_id)
+        elif task["attempts"] < self.max_attempts:
+            # Back to pending; no scheduler picks it up again until the backoff has passed
+            delay = self.retry_delay * 2 ** (task["attempts"] - 1)
+            self.database.execute(
+                "UPDATE tasks SET status = 'pending', run_after = ?, updated_at = CURRENT_TIMESTAMP" + owned,
+                (utc_stamp(delay), task_id, task["attempts"])
+            )
+            self.counters["retried"] += 1
+            record_action(self.agent, "task_retry", f"{task['title'][:150]}: {detail}", "warning",
+                          {"attempt": task["attempts"], "retry_in_seconds": delay}, task_id=task_id)
+        else:
+            # Out of attempts: park it for a human
+            self.database.execute(
+                "UPDATE tasks SET status = 'review', run_after = NULL, updated_at = CURRENT_TIMESTAMP" + owned,
+                (task_id, task["attempts"])
+            )
+            self.counters["failed"] += 1
+            record_action(self.agent, "task_failed", f"{task['title'][:150]}: {detail}", "error",
+                          {"attempts": self.max_attempts}, task_id=task_id)
+
+    def reap(self):
+        """Settle finished tasks; an overdue one keeps its slot and row until its worker actually returns
+
+        Settling it early would free the slot (oversubscribing the pool) and requeue a task that is still running.
+        """
+        now = time.monotonic()
+        for task_id, (future, task, deadline, lease_until) in list(self.running.items()):
+            if future.done():
+                del self.running[task_id]
+                ok, detail = future.result()
+                self.finish(task, ok, detail)
+            elif now > deadline and not task.get("overdue"):
+                task["overdue"] = True
+                self.counters["timed_out"] += 1
+                record_action(self.agent, "task_overdue", task["title"][:200], "warning",
+                              {"timeout_seconds": self.timeout}, task_id=task_id)
+        self.renew_leases()
+
+    def run_once(self):
+        self.reap()
+        free = self.workers - len(self.running)
+        if free and (len(self.heap) < free or time.monotonic() - self.last_poll >= self.poll_interval):
+            self.refill()
+        return self.dispatch()
+
+    def run(self, until_idle=False, report_every=30.0):
+        """Scheduling loop; with until_idle it returns once nothing is queued, running or pending"""
+        last_report = time.monotonic()
+        while not self.stopping:
+            self.wake.clear()
+            self.run_once()
+            if until_idle and not self.heap and not self.running and not self.has_pending():
+                break
+            if report_every and time.monotonic() - last_report >= report_every:
+                print(f"🗓️ {json.dumps(self.stats())}")
+                last_report = time.monotonic()
+            self.wake.wait(self.poll_interval)
+        return self.stats()
+
+    def has_pending(self):
+        """Pending work for this agent, including tasks still waiting out a retry backoff"""
+        return self.database.fetchone(
+            "SELECT 1 FROM tasks WHERE status = 'pending' AND (assigned_agent_id IS NULL OR assigned_agent_id = ?) "
+            "LIMIT 1", (self.agent_id,)
+        ) is not None
+
+    def stop(self):
+        self.stopping = True
+        self.wake.set()
+
+    def close(self):
+        self.stop()
+        self.pool.shutdown(wait=True)
+
+    def stats(self):
+        dispatch_ms, run_ms = list(self.dispatch_ms), list(self.run_ms)
+        return {
+            **self.counters,
+            "queue_depth": len(self.heap),
+            "running": len(self.running),
+            "workers": self.workers,
+            "dispatch_latency_ms": {"p50": round(percentile(dispatch_ms, 0.5), 2),
+                                    "p95": round(percentile(dispatch_ms, 0.95), 2)},
+            "run_ms": {"p50": round(percentile(run_ms, 0.5), 1), "p95": round(percentile(run_ms, 0.95), 1)}
+        }
+
+
+def pending_summary(database):
+    """Tasks per status and priority, straight from the table"""
+    rows = database.fetchall("SELECT status, priority, COUNT(*) FROM tasks GROUP BY status, priority")
+    summary = {}
+    for status, priority, count in rows:
+        summary.setdefault(status, {})[f"p{priority}"] = count
+    return summary
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    database = get_database()
+    if database is None:
+        print("❌ No database configured. Set ANDERS_DATABASE_URL (e.g. sqlite:///anders.db) or DATABASE_HOST.")
+        sys.exit(1)
+
+    if command in ("run", "drain"):
+        scheduler = TaskScheduler(database, TaskExecutor(auto_approve="--auto-approve" in sys.argv))
+        print(f"🗓️ Scheduler for {scheduler.agent} with {scheduler.workers} workers")
+        try:
+            result = scheduler.run(until_idle=command == "drain")
+            print(json.dumps(result, indent=2))
+        except KeyboardInterrupt:
+            print("\n👋 Scheduler stopped")
+        finally:
+            scheduler.close()
+    elif command == "stats":
+        print("🗓️ Task Queue:")
+        print(json.dumps(pending_summary(database), indent=2))
+    else:
+        print(f"❌ Unknown command: {command}")
+        print("Usage: python3 task_scheduler.py [run|drain|stats] [--auto-approve]")
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Template Engine for Anders
+Renders CRUD API routes and dashboard components for the tables opted in to the API in one pass
+"""
+
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+from schema_parser import load_schema
+from tracing import span, traced
+from workspace_manager import default_project_root
+from write_set import WriteSet
+
+TEMPLATE_DIR = Path(__file__).resolve().parent / "templates"
+PLACEHOLDER = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+TS_TYPES = {
+    "INT": "number", "BIGINT": "number", "SMALLINT": "number", "TINYINT": "number",
+    "DECIMAL": "number", "FLOAT": "number", "DOUBLE": "number",
+    "BOOLEAN": "boolean", "BOOL": "boolean",
+    "JSON": "unknown"
+}
+TIMESTAMP_COLUMNS = {"created_at", "updated_at"}
+
+# Tables exposed through generated routes and components, opt-in: "read" is the GET column list, "write"
+# the fields POST accepts. users and the job-owned tables (token_usage, rollups, watermarks, agent_logs,
+# deployments) are deliberately absent; agents/tasks mirror the hand-written routes' columns.
+API_TABLES = {
+    "projects": {
+        "read": ["id", "name", "description", "domain", "status", "priority", "start_date", "deadline",
+                 "created_at"],
+        "write": ["name", "description", "domain", "priority", "start_date", "deadline"]
+    },
+    "agents": {
+        "read": ["id", "name", "type", "description", "status", "capabilities", "last_seen", "created_at"],
+        "write": ["name", "type", "description", "capabilities"]
+    },
+    "tasks": {
+        "read": ["id", "title", "description", "project_id", "assigned_agent_id", "status", "priority",
+                 "estimated_hours", "actual_hours", "due_date", "completed_at", "created_at", "updated_at"],
+        "write": ["title", "description", "project_id", "assigned_agent_id", "priority", "due_date"]
+    },
+    "site_monitoring": {
+        "read": ["id", "site_name", "url", "status_code", "response_time_ms", "is_up", "last_check",
+                 "error_message", "created_at"],
+        "write": ["site_name", "url"]
+    }
+}
+# Never accepted from a request body, whatever API_TABLES says
+PROTECTED_COLUMNS = {"role"}
+# Routes carrying this header were generated and may be regenerated; any other existing route is hand-written
+GENERATED_MARKER = "// Generated by Anders"
+
+
+class Template:
+    """`{{ name }}` placeholders, split into literal/variable parts once at load time"""
+
+    def __init__(self, source):
+        self.parts = []
+        position = 0
+        for match in PLACEHOLDER.finditer(source):
+            self.parts.append((source[position:match.start()], match.group(1)))
+            position = match.end()
+        self.tail = source[position:]
+
+    def render(self, context):
+        out = []
+        for literal, name in self.parts:
+            out.append(literal)
+            out.append(str(context[name]))
+        out.append(self.tail)
+        return "".join(out)
+
+
+_compiled = {}
+
+
+def get_template(name):
+    """Compile each template file once per process"""
+    if name not in _compiled:
+        _compiled[name] = Template((TEMPLATE_DIR / name).read_text())
+    return _compiled[name]
+
+
+def pascal_case(name):
+    return "".join(part.capitalize() for part in name.split("_"))
+
+
+def singular(name):
+    if name.endswith("s") and not name.endswith("ss"):
+        return name[:-1]
+    return name
+
+
+def quoted_list(names):
+    return ", ".join(f"'{name}'" for name in names)
+
+
+def ts_type(column):
+    if column.is_enum:
+        return " | ".join(f"'{value}'" for value in column.enum_values)
+    return TS_TYPES.get(column.sql_type, "string")
+
+
+def join_alias(column_name):
+    """assigned_agent_id -> agent, project_id -> project (matches the hand-written routes)"""
+    alias = column_name[:-3] if column_name.endswith("_id") else column_name
+    return alias[len("assigned_"):] if alias.startswith("assigned_") else alias
+
+
+def display_column(table):
+    for name in ("name", "title", "site_name", "email"):
+        if table.column(name):
+            return name
+    return None
+
+
+class TemplateEngine:
+    def __init__(self, project_root=None, schema=None):
+        self.project_root = Path(project_root or default_project_root())
+        self.schema = schema or load_schema(self.project_root / "database/schema.sql")
+
+    def api_columns(self, table, access):
+        names = API_TABLES[table.name][access]
+        unknown = [name for name in names if not table.column(name)]
+        if unknown:
+            raise ValueError(f"API_TABLES[{table.name!r}] lists unknown columns: {', '.join(unknown)}")
+        if access == "write" and PROTECTED_COLUMNS.intersection(names):
+            raise ValueError(f"{table.name}: {', '.join(PROTECTED_COLUMNS.intersection(names))} cannot be writable")
+        return [table.column(name) for name in names]
+
+    def route_context(self, table):
+        readable = self.api_columns(table, "read")
+        select = [f"t.{column.name}" for column in readable]
+        joins = []
+        used = set()
+        for fk in table.foreign_keys:
+            if fk.column not in API_TABLES[table.name]["read"] or fk.ref_table not in API_TABLES:
+                continue
+            ref_table = self.schema.tables.get(fk.ref_table)
+            label_column = display_column(ref_table) if ref_table else None
+            if not label_column:
+                continue
+            alias = join_alias(fk.column)
+            if alias in used:
+                alias = fk.column
+            used.add(alias)
+            # Prefixed so aliases like `user` never collide with SQL keywords
+            joins.append(f"\n      LEFT JOIN {fk.ref_table} j_{alias} ON t.{fk.column} = j_{alias}.{fk.ref_column}")
+            select.append(f"j_{alias}.{label_column} as {alias}_{label_column}")
+
+        writable = self.api_columns(table, "write")
+        required = [c.name for c in writable if not c.nullable and c.default is None]
+        order_by = "t.created_at DESC" if table.column("created_at") else f"t.{table.primary_key} DESC"
+        label = table.name.replace("_", " ")
+        return {
+            "table": table.name,
+            "label": label,
+            "singular_label": singular(label),
+            "select_list": ", ".join(select),
+            "joins": "".join(joins),
+            "order_by": order_by,
+            "writable_columns": quoted_list(c.name for c in writable),
+            "required_columns": quoted_list(required),
+            "json_columns": quoted_list(c.name for c in writable if c.is_json)
+        }
+
+    def component_context(self, table):
+        readable = self.api_columns(table, "read")
+        fields = []
+        for column in readable:
+            optional = "?" if column.nullable and not column.primary_key else ""
+            fields.append(f"  {column.name}{optional}: {ts_type(column)};")
+        shown = [c.name for c in readable if not c.is_json and c.sql_type != "TEXT"]
+        label = table.name.replace("_", " ")
+        return {
+            "table": table.name,
+            "label": label,
+            "title": label.title(),
+            "type_name": pascal_case(singular(table.name)),
+            "component_name": self.component_name(table),
+            "interface_fields": "\n".join(fields),
+            "display_columns": quoted_list(shown),
+            "primary_key": table.primary_key or "id"
+        }
+
+    def component_name(self, table):
+        return f"{pascal_case(table.name)}Manager"
+
+    def render_routes(self, tables=None):
+        template = get_template("api_route.ts.tmpl")
+        rendered = {}
+        for table in self.selected(tables):
+            relative_path = f"src/app/api/{table.name}/route.ts"
+            if self.hand_written(relative_path):
+                continue
+            rendered[relative_path] = template.render(self.route_context(table))
+        return rendered
+
+    def hand_written(self, relative_path):
+        try:
+            return GENERATED_MARKER not in (self.project_root / relative_path).read_text()
+        except FileNotFoundError:
+            return False
+
+    def render_components(self, tables=None):
+        template = get_template("manager.tsx.tmpl")
+        rendered = {}
+        for table in self.selected(tables):
+            name = self.component_name(table)
+            # Hand-tuned components take precedence over the generic table view
+            if (TEMPLATE_DIR / "components" / f"{name}.tsx.tmpl").exists():
+                source = get_template(f"components/{name}.tsx.tmpl").render({})
+            else:
+                source = template.render(self.component_context(table))
+            rendered[f"src/components/dashboard/{name}.tsx"] = source
+        return rendered
+
+    def selected(self, tables):
+        names = list(API_TABLES) if tables is None else tables
+        closed = [name for name in names if name not in API_TABLES]
+        if closed:
+            raise ValueError(f"Not opted in to the API (see API_TABLES): {', '.join(closed)}")
+        return [self.schema.table(name) for name in names]
+
+    @traced("template_engine.write_if_changed")
+    def write_if_changed(self, files):
+        """Write only files whose bytes differ, all or nothing; untouched files keep their mtime"""
+        result = WriteSet(self.project_root).update(files).commit()
+        return result["written"], result["unchanged"]
+
+    def generate(self, routes=True, components=True, tables=None):
+        """Render everything in memory, then touch only files that changed"""
+        started = time.perf_counter()
+        files = {}
+        with span("template_engine.render"):
+            if routes:
+                files.update(self.render_routes(tables))
+            if components:
+                files.update(self.render_components(tables))
+        written, unchanged = self.write_if_changed(files)
+        kept = [f"src/app/api/{table.name}/route.ts" for table in self.selected(tables)
+                if routes and self.hand_written(f"src/app/api/{table.name}/route.ts")]
+        return {
+            "success": True,
+            "tables": [table.name for table in self.selected(tables)],
+            "written": written,
+            "unchanged": unchanged,
+            "hand_written": kept,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)
+        }
+
+
+if __name__ == "__main__":
+    engine = TemplateEngine(sys.argv[1] if len(sys.argv) > 1 else None)
+    print("🧩 Template Generation:")
+    print(json.dumps(engine.generate(), indent=2))
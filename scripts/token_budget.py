@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Token Budget for Anders
+Prompt-size budgeting before code_generation calls and per-agent token/cost accounting after them
+"""
+
+import functools
+import json
+import math
+import os
+import re
+import sys
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+from agent_db import get_database
+from log_sink import LogSink, get_sink
+
+# USD per 1K tokens (prompt, completion); override with ANDERS_MODEL_PRICES="gpt-4=0.03/0.06,..."
+MODEL_PRICES = {
+    "gpt-4": (0.03, 0.06),
+    "gpt-4-32k": (0.06, 0.12),
+    "gpt-4-turbo": (0.01, 0.03),
+    "gpt-4o": (0.0025, 0.01),
+    "gpt-4o-mini": (0.00015, 0.0006),
+    "gpt-3.5-turbo": (0.0005, 0.0015)
+}
+CONTEXT_WINDOWS = {
+    "gpt-4": 8192,
+    "gpt-4-32k": 32768,
+    "gpt-4-turbo": 128000,
+    "gpt-4o": 128000,
+    "gpt-4o-mini": 128000,
+    "gpt-3.5-turbo": 16385
+}
+USAGE_COLUMNS = ("agent_id", "task_id", "model", "prompt_tokens", "completion_tokens", "cost_usd", "estimated")
+MESSAGE_OVERHEAD = 4    # role and separators per chat message
+REPLY_PRIMER = 3        # every reply is primed with <|start|>assistant<|message|>
+
+# Heuristic pieces: a word or a punctuation mark with its leading whitespace, or a bare whitespace run
+PIECE = re.compile(r"\s*\w+|\s*[^\w\s]|\s+")
+# Lines kept when a context is summarized: declarations, schema statements, headings, imports
+OUTLINE = re.compile(r"^\s*(?:(?:export\s+)?(?:default\s+)?(?:async\s+)?(?:def|class|function|interface|type|enum)\s"
+                     r"|export\s|(?:CREATE|ALTER)\s|#{1,6}\s|import\s|from\s+\S+\s+import\s|[\w.]+\s*=\s*\(|@)",
+                     re.IGNORECASE)
+
+
+def model_prices():
+    prices = dict(MODEL_PRICES)
+    for item in os.getenv('ANDERS_MODEL_PRICES', '').split(","):
+        if "=" in item and "/" in item:
+            model, rates = item.split("=", 1)
+            prompt_rate, completion_rate = rates.split("/", 1)
+            prices[model.strip()] = (float(prompt_rate), float(completion_rate))
+    return prices
+
+
+def base_model(model, table):
+    """Longest known prefix, so dated snapshots like gpt-4o-2024-08-06 resolve to gpt-4o"""
+    matches = [name for name in table if model == name or model.startswith(name + "-")]
+    return max(matches, key=len) if matches else None
+
+
+def estimate_cost(model, prompt_tokens, completion_tokens, prices=None):
+    prices = prices or model_prices()
+    name = base_model(model, prices)
+    if name is None:
+        return None
+    prompt_rate, completion_rate = prices[name]
+    return round(prompt_tokens / 1000 * prompt_rate + completion_tokens / 1000 * completion_rate, 6)
+
+
+class Tokenizer:
+    """tiktoken when installed, otherwise a word-piece estimate that errs on the high side"""
+
+    def __init__(self, model="gpt-4"):
+        self.model = model
+        try:
+            import tiktoken
+            try:
+                self.encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                self.encoding = tiktoken.get_encoding("cl100k_base")
+        except ImportError:
+            self.encoding = None
+        # The system prompt and repeated prompts are counted on every call; remember recent counts
+        self.count = functools.lru_cache(maxsize=512)(self.count)
+
+    @property
+    def exact(self):
+        return self.encoding is not None
+
+    def pieces(self, text):
+        """Heuristic token count per piece: short words are one token, long ones one per ~4 characters"""
+        return [(piece, max(1, math.ceil(len(piece.strip()) / 4))) for piece in PIECE.findall(text)]
+
+    def count(self, text):
+        if not text:
+            return 0
+        if self.encoding is not None:
+            return len(self.encoding.encode(text, disallowed_special=()))
+        return sum(n for _, n in self.pieces(text))
+
+    def count_messages(self, messages):
+        return sum(MESSAGE_OVERHEAD + self.count(m.get("content", "")) for m in messages) + REPLY_PRIMER
+
+    def truncate(self, text, max_tokens):
+        """Longest prefix of `text` within `max_tokens`"""
+        if max_tokens <= 0:
+            return ""
+        if self.encoding is not None:
+            tokens = self.encoding.encode(text, disallowed_special=())
+            return text if len(tokens) <= max_tokens else self.encoding.decode(tokens[:max_tokens])
+        kept, used = [], 0
+        for piece, n in self.pieces(text):
+            if used + n > max_tokens:
+                break
+            kept.append(piece)
+            used += n
+        return "".join(kept)
+
+
+_tokenizers = {}
+
+
+def get_tokenizer(model="gpt-4"):
+    # tiktoken loads its BPE ranks on first use; share one encoder per model
+    if model not in _tokenizers:
+        _tokenizers[model] = Tokenizer(model)
+    return _tokenizers[model]
+
+
+def outline(text):
+    """Extractive summary: keep declaration lines, collapse everything else into '...' markers"""
+    lines, skipped = [], False
+    for line in text.splitlines():
+        if OUTLINE.match(line):
+            lines.append(line.rstrip())
+            skipped = False
+        elif line.strip() and not skipped:
+            lines.append("    ...")
+            skipped = True
+    return "\n".join(lines)
+
+
+class PromptTooLarge(ValueError):
+    """The prompt by itself does not fit the model's context window"""
+
+
+class TokenBudget:
+    """Fits a chat request into the model's window: trims context and sizes max_tokens to what is left"""
+
+    def __init__(self, model="gpt-4", max_prompt_tokens=None, max_completion_tokens=None, context_window=None):
+        self.model = model
+        self.tokenizer = get_tokenizer(model)
+        window = context_window or CONTEXT_WINDOWS.get(base_model(model, CONTEXT_WINDOWS), 8192)
+        self.max_completion_tokens = max_completion_tokens or int(os.getenv('ANDERS_MAX_COMPLETION_TOKENS', '2000'))
+        self.max_prompt_tokens = min(
+            max_prompt_tokens or int(os.getenv('ANDERS_PROMPT_BUDGET', '6000')),
+            window - self.max_completion_tokens
+        )
+        self.window = window
+        # The heuristic can undercount; keep 10% headroom unless the count is exact
+        self.margin = 1.0 if self.tokenizer.exact else 1.1
+
+    def count(self, text):
+        return math.ceil(self.tokenizer.count(text) * self.margin)
+
+    def fit_context(self, context, budget):
+        """Return (context, trimmed_from): unchanged if it fits, else outlined, else cut to `budget` tokens"""
+        size = self.count(context)
+        if size <= budget:
+            return context, None
+        marker = f"\n... [context trimmed from {size} tokens]"
+        room = max(0, budget - self.count(marker))
+        summary = outline(context)
+        if self.count(summary) <= room:
+            return summary + marker, size
+        return self.tokenizer.truncate(summary or context, int(room / self.margin)) + marker, size
+
+    def plan(self, build_messages, prompt, context=""):
+        """Size a request built by `build_messages(prompt, context)`; returns (messages, plan dict)"""
+        empty = self.tokenizer.count_messages(build_messages(prompt, ""))
+        context_budget = self.max_prompt_tokens - math.ceil(empty * self.margin)
+        context, trimmed_from = self.fit_context(context or "", max(0, context_budget))
+        messages = build_messages(prompt, context)
+        # Context is spliced into the system message, so its count adds to the empty request's
+        prompt_tokens = math.ceil((empty + self.tokenizer.count(context)) * self.margin)
+        if prompt_tokens >= self.window:
+            # Context was already trimmed to nothing; the prompt alone leaves no room for a reply
+            raise PromptTooLarge(f"Prompt needs ~{prompt_tokens} tokens but the {self.window}-token context window "
+                                 f"leaves no room for a reply; shorten the prompt")
+        return messages, {
+            "prompt_tokens": prompt_tokens,
+            "max_tokens": max(1, min(self.max_completion_tokens, self.window - prompt_tokens)),
+            "context_trimmed_from": trimmed_from,
+            "exact": self.tokenizer.exact
+        }
+
+
+class UsageLedger:
+    """Running token and cost totals per agent and model, each billed call also queued for token_usage
+
+    Rows go through a write-behind LogSink, so billing a call never waits on the database.
+    """
+
+    def __init__(self, database=None):
+        self.database = database
+        self.sink = None
+        self.lock = threading.Lock()
+        self.totals = defaultdict(lambda: {"calls": 0, "cache_hits": 0, "coalesced": 0, "prompt_tokens": 0,
+                                           "completion_tokens": 0, "cost_usd": 0.0})
+
+    def record(self, agent, model, prompt_tokens, completion_tokens, task_id=None, estimated=False):
+        cost = estimate_cost(model, prompt_tokens, completion_tokens)
+        with self.lock:
+            totals = self.totals[(agent, model)]
+            totals["calls"] += 1
+            totals["prompt_tokens"] += prompt_tokens
+            totals["completion_tokens"] += completion_tokens
+            totals["cost_usd"] = round(totals["cost_usd"] + (cost or 0.0), 6)
+        try:
+            sink = self.usage_sink()
+            if sink:
+                sink.put((agent, task_id, model, prompt_tokens, completion_tokens, cost or 0.0, estimated))
+        except Exception as e:
+            print(f"⚠️ Could not record token usage: {e}", file=sys.stderr)
+        return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens, "cost_usd": cost, "estimated": estimated}
+
+    def usage_sink(self):
+        if self.database is None:
+            return get_sink("token_usage", USAGE_COLUMNS)
+        with self.lock:
+            if self.sink is None:
+                self.sink = LogSink(self.database, table="token_usage", columns=USAGE_COLUMNS)
+            return self.sink
+
+    def cache_hit(self, agent, model):
+        with self.lock:
+            self.totals[(agent, model)]["cache_hits"] += 1
+
+    def coalesced(self, agent, model):
+        with self.lock:
+            self.totals[(agent, model)]["coalesced"] += 1
+
+    def stats(self):
+        with self.lock:
+            return {f"{agent}/{model}": dict(totals) for (agent, model), totals in self.totals.items()}
+
+
+_ledger = None
+_ledger_lock = threading.Lock()
+
+
+def get_ledger():
+    global _ledger
+    with _ledger_lock:
+        if _ledger is None:
+            _ledger = UsageLedger()
+        return _ledger
+
+
+def since_stamp(days):
+    return (datetime.now(timezone.utc) - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def usage_report(database, days=30, group_by_task=False):
+    """Tokens and cost per agent and model (or per task) over the last `days` days"""
+    key = "u.task_id" if group_by_task else "a.name, u.model"
+    rows = database.fetchall(
+        f"SELECT {key}, COUNT(*), SUM(u.prompt_tokens), SUM(u.completion_tokens), SUM(u.cost_usd) "
+        "FROM token_usage u JOIN agents a ON a.id = u.agent_id WHERE u.created_at >= ? "
+        f"GROUP BY {key} ORDER BY SUM(u.cost_usd) DESC",
+        (since_stamp(days),)
+    )
+    report = []
+    for row in rows:
+        group, (calls, prompt_tokens, completion_tokens, cost) = row[:-4], row[-4:]
+        entry = {"task_id": group[0]} if group_by_task else {"agent": group[0], "model": group[1]}
+        entry.update(calls=calls, prompt_tokens=int(prompt_tokens or 0),
+                     completion_tokens=int(completion_tokens or 0), cost_usd=round(float(cost or 0), 4))
+        report.append(entry)
+    return report
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "report"
+    if command == "count":
+        # python3 token_budget.py count <file> [model]
+        model = sys.argv[3] if len(sys.argv) > 3 else "gpt-4"
+        tokenizer = get_tokenizer(model)
+        with open(sys.argv[2]) as f:
+            text = f.read()
+        print(json.dumps({"model": model, "tokens": tokenizer.count(text), "exact": tokenizer.exact,
+                          "outline_tokens": tokenizer.count(outline(text))}, indent=2))
+    elif command in ("report", "tasks"):
+        database = get_database()
+        if database is None:
+            print("❌ No database configured. Set ANDERS_DATABASE_URL (e.g. sqlite:///anders.db) or DATABASE_HOST.")
+            sys.exit(1)
+        days = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+        print(f"💰 Token Usage ({days} days):")
+        print(json.dumps(usage_report(database, days, group_by_task=command == "tasks"), indent=2))
+    else:
+        print(f"❌ Unknown command: {command}")
+        print("Usage: python3 token_budget.py [report [days]|tasks [days]|count <file> [model]]")
@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+Tracing for Anders
+Lightweight spans exported as OpenTelemetry JSON and Prometheus text, off unless ANDERS_TRACE=1
+"""
+
+import atexit
+import contextvars
+import functools
+import inspect
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+from agent_db import percentile
+
+# Histogram bounds in seconds: cache hits and file checks at the bottom, codex runs at the top
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+RECENT = 1024   # durations kept per span name for p50/p95
+
+_current = contextvars.ContextVar("anders_span", default=None)
+
+
+def default_trace_file():
+    return Path(os.getenv('ANDERS_TRACE_FILE', Path.home() / ".cache" / "anders" / "traces.jsonl")).expanduser()
+
+
+def failed(result):
+    """The agents report most failures by return value rather than by raising"""
+    if isinstance(result, dict):
+        return result.get("success") is False or result.get("status") in ("error", "failed", "timeout")
+    return isinstance(result, str) and result.startswith("❌")
+
+
+def otel_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class NoopSpan:
+    """What span() hands out while tracing is off"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, key, value):
+        pass
+
+    def fail(self, message=""):
+        pass
+
+
+NOOP_SPAN = NoopSpan()
+
+
+class Span:
+    """One timed operation; nested spans share the trace id of the span they run inside"""
+
+    __slots__ = ("tracer", "name", "attributes", "trace_id", "span_id", "parent_id", "start_ns", "end_ns",
+                 "error", "token")
+
+    def __init__(self, tracer, name, attributes):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+        self.error = None
+
+    def __enter__(self):
+        parent = _current.get()
+        # Random, not cryptographic ids: the OpenTelemetry SDKs make the same trade for speed
+        self.trace_id = parent.trace_id if parent else f"{random.getrandbits(128):032x}"
+        self.parent_id = parent.span_id if parent else ""
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.token = _current.set(self)
+        self.start_ns = time.time_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end_ns = time.time_ns()
+        _current.reset(self.token)
+        if exc_type is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        self.tracer.finish(self)
+        return False
+
+    def set(self, key, value):
+        self.attributes[key] = value
+
+    def fail(self, message=""):
+        self.error = message or "failed"
+
+    @property
+    def duration(self):
+        return (self.end_ns - self.start_ns) / 1e9
+
+    def to_otel(self):
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id,
+            "name": self.name,
+            "kind": 1,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": k, "value": otel_value(v)} for k, v in self.attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1}
+        }
+
+
+class SpanStats:
+    """Prometheus-style cumulative histogram plus recent durations for percentiles"""
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.buckets = [0] * len(BUCKETS)
+        self.recent = deque(maxlen=RECENT)
+
+    def add(self, seconds, error):
+        self.count += 1
+        self.total += seconds
+        if error:
+            self.errors += 1
+        for index, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[index] += 1
+                break
+        self.recent.append(seconds)
+
+    def summary(self):
+        recent = list(self.recent)
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "mean_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "p50_ms": round(percentile(recent, 0.5) * 1000, 3),
+            "p95_ms": round(percentile(recent, 0.95) * 1000, 3)
+        }
+
+
+class Tracer:
+    """Collects finished spans: per-name stats in memory, span records appended to a JSON lines file"""
+
+    def __init__(self, enabled=None, path=None, service="anders", flush_every=256):
+        self.enabled = os.getenv('ANDERS_TRACE') == '1' if enabled is None else enabled
+        # ANDERS_TRACE_FILE= (empty) keeps metrics in memory without writing spans
+        if path is None and os.getenv('ANDERS_TRACE_FILE') != "":
+            path = default_trace_file()
+        self.path = Path(path) if path else None
+        self.service = service
+        self.flush_every = flush_every
+        self.lock = threading.Lock()
+        self.pending = []
+        self.spans = {}
+        self.server = None
+        atexit.register(self.flush)
+
+    def span(self, name, **attributes):
+        if not self.enabled:
+            return NOOP_SPAN
+        return Span(self, name, attributes)
+
+    def finish(self, span):
+        with self.lock:
+            stats = self.spans.get(span.name)
+            if stats is None:
+                stats = self.spans[span.name] = SpanStats()
+            stats.add(span.duration, span.error)
+            if self.path is None:
+                return
+            self.pending.append(span.to_otel())
+            if len(self.pending) < self.flush_every:
+                return
+            batch, self.pending = self.pending, []
+        self.write(batch)
+
+    def flush(self):
+        with self.lock:
+            batch, self.pending = self.pending, []
+        if batch:
+            self.write(batch)
+
+    def write(self, spans):
+        """One OTLP ExportTraceServiceRequest per line, the layout of the OpenTelemetry file exporter"""
+        record = {"resourceSpans": [{
+            "resource": {"attributes": [
+                {"key": "service.name", "value": {"stringValue": self.service}},
+                {"key": "process.pid", "value": {"intValue": str(os.getpid())}}
+            ]},
+            "scopeSpans": [{"scope": {"name": "anders.tracing"}, "spans": spans}]
+        }]}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a") as f:
+            f.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+    def stats(self):
+        with self.lock:
+            return {name: stats.summary() for name, stats in sorted(self.spans.items())}
+
+    def prometheus(self):
+        """Prometheus text exposition: duration histogram, error counter and p50/p95 summary per span"""
+        with self.lock:
+            spans = sorted(self.spans.items())
+            lines = ["# HELP anders_span_duration_seconds Duration of traced Anders operations",
+                     "# TYPE anders_span_duration_seconds histogram"]
+            for name, stats in spans:
+                cumulative = 0
+                for bound, count in zip(BUCKETS, stats.buckets):
+                    cumulative += count
+                    lines.append(f'anders_span_duration_seconds_bucket{{span="{name}",le="{bound:g}"}} {cumulative}')
+                lines.append(f'anders_span_duration_seconds_bucket{{span="{name}",le="+Inf"}} {stats.count}')
+                lines.append(f'anders_span_duration_seconds_sum{{span="{name}"}} {stats.total:.6f}')
+                lines.append(f'anders_span_duration_seconds_count{{span="{name}"}} {stats.count}')
+            lines += ["# HELP anders_span_errors_total Traced operations that raised or reported failure",
+                      "# TYPE anders_span_errors_total counter"]
+            lines += [f'anders_span_errors_total{{span="{name}"}} {stats.errors}' for name, stats in spans]
+            lines += [f"# HELP anders_span_latency_seconds Span duration quantiles over the last {RECENT} calls",
+                      "# TYPE anders_span_latency_seconds summary"]
+            for name, stats in spans:
+                recent = list(stats.recent)
+                for q in (0.5, 0.95):
+                    lines.append(f'anders_span_latency_seconds{{span="{name}",quantile="{q}"}} '
+                                 f'{percentile(recent, q):.6f}')
+                lines.append(f'anders_span_latency_seconds_sum{{span="{name}"}} {stats.total:.6f}')
+                lines.append(f'anders_span_latency_seconds_count{{span="{name}"}} {stats.count}')
+        return "\n".join(lines) + "\n"
+
+    def serve_metrics(self, port, host="127.0.0.1"):
+        """Serve /metrics (Prometheus text) and /spans (JSON summary) from a background thread"""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        tracer = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body, content_type = tracer.prometheus().encode(), "text/plain; version=0.0.4"
+                elif self.path == "/spans":
+                    body, content_type = json.dumps(tracer.stats()).encode(), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer((host, port), MetricsHandler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return f"http://{host}:{self.server.server_address[1]}/metrics"
+
+    def stop_metrics(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+_tracer = Tracer()
+
+
+def get_tracer():
+    return _tracer
+
+
+def span(name, **attributes):
+    """`with span("git.commit"):` times the block when tracing is on and costs one check when it is off"""
+    if not _tracer.enabled:
+        return NOOP_SPAN
+    return Span(_tracer, name, attributes)
+
+
+def traced(name=None):
+    """Decorator form of span(); also marks the span failed when the call returns an error result"""
+    def decorate(func):
+        span_name = name or func.__qualname__
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if not _tracer.enabled:
+                    return await func(*args, **kwargs)
+                with Span(_tracer, span_name, {}) as current:
+                    result = await func(*args, **kwargs)
+                    if failed(result):
+                        current.fail(str(result.get("error", "")) if isinstance(result, dict) else result[:200])
+                    return result
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _tracer.enabled:
+                return func(*args, **kwargs)
+            with Span(_tracer, span_name, {}) as current:
+                result = func(*args, **kwargs)
+                if failed(result):
+                    current.fail(str(result.get("error", "")) if isinstance(result, dict) else result[:200])
+                return result
+        return wrapper
+    return decorate
+
+
+def summarize_file(path=None):
+    """Per-span p50/p95 from an exported trace file, for runs of the short-lived CLIs"""
+    spans = {}
+    with open(path or default_trace_file()) as f:
+        for line in f:
+            for resource in json.loads(line)["resourceSpans"]:
+                for scope in resource["scopeSpans"]:
+                    for record in scope["spans"]:
+                        seconds = (int(record["endTimeUnixNano"]) - int(record["startTimeUnixNano"])) / 1e9
+                        stats = spans.get(record["name"])
+                        if stats is None:
+                            stats = spans[record["name"]] = SpanStats()
+                            stats.recent = deque()
+                        stats.add(seconds, record["status"].get("code") == 2)
+    return {name: stats.summary() for name, stats in sorted(spans.items())}
+
+
+def overhead(calls=200000):
+    """Per-call cost of a traced no-op function with tracing off and on"""
+    @traced("overhead.noop")
+    def noop():
+        return None
+
+    def plain():
+        return None
+
+    def timed(func):
+        started = time.perf_counter()
+        for _ in range(calls):
+            func()
+        return (time.perf_counter() - started) / calls * 1e9
+
+    enabled, path = _tracer.enabled, _tracer.path
+    try:
+        baseline = timed(plain)
+        _tracer.enabled = False
+        disabled = timed(noop)
+        _tracer.enabled, _tracer.path = True, None
+        active = timed(noop)
+    finally:
+        _tracer.enabled, _tracer.path = enabled, path
+        with _tracer.lock:
+            _tracer.spans.pop("overhead.noop", None)
+    return {"calls": calls, "plain_call_ns": round(baseline, 1),
+            "disabled_overhead_ns": round(disabled - baseline, 1),
+            "enabled_overhead_ns": round(active - baseline, 1)}
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "summary"
+    if command == "summary":
+        path = Path(sys.argv[2]) if len(sys.argv) > 2 else default_trace_file()
+        if not path.exists():
+            print(f"❌ No trace file at {path}. Run the agents with ANDERS_TRACE=1.")
+            sys.exit(1)
+        print(f"🔭 Spans in {path}:")
+        print(json.dumps(summarize_file(path), indent=2))
+    elif command == "overhead":
+        print("🔭 Tracing Overhead:")
+        print(json.dumps(overhead(), indent=2))
+    else:
+        print(f"❌ Unknown command: {command}")
+        print("Usage: python3 tracing.py [summary [trace_file]|overhead]")
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Worker Pool for Anders
+Process pool for CPU-bound post-processing of generated code (parse, format, hash, diff)
+"""
+
+import atexit
+import difflib
+import hashlib
+import json
+import math
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from code_blocks import extract_code_blocks
+
+
+# Job protocol: {"kind": <name in JOB_HANDLERS>, "payload": {...}} -> {"kind", "ok", "result" | "error", "elapsed_ms"}
+
+def job_hash(payload):
+    return hashlib.sha256(payload["text"].encode()).hexdigest()
+
+
+def job_code_blocks(payload):
+    return extract_code_blocks(payload["text"])
+
+
+def job_format(payload):
+    """Whitespace normalisation for generated source: tabs to spaces, no trailing blanks, one final newline"""
+    indent = " " * payload.get("indent", 2)
+    lines = [line.replace("\t", indent).rstrip() for line in payload["text"].splitlines()]
+    while lines and not lines[-1]:
+        lines.pop()
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+def job_diff(payload):
+    before = payload.get("before") or ""
+    after = payload["after"]
+    path = payload.get("path", "file")
+    diff = list(difflib.unified_diff(
+        before.splitlines(keepends=True), after.splitlines(keepends=True), f"a/{path}", f"b/{path}"
+    ))
+    return {
+        "diff": "".join(diff),
+        "added": sum(1 for line in diff if line.startswith("+") and not line.startswith("+++")),
+        "removed": sum(1 for line in diff if line.startswith("-") and not line.startswith("---"))
+    }
+
+
+def job_postprocess(payload):
+    """Everything a code_generation reply goes through before it is written: extract, format, hash, diff"""
+    blocks = extract_code_blocks(payload["text"]) or [payload["text"]]
+    code = job_format({"text": "\n".join(blocks), "indent": payload.get("indent", 2)})
+    result = {"code": code, "blocks": len(blocks), "sha256": job_hash({"text": code})}
+    if "before" in payload:
+        result.update(job_diff({"before": payload["before"], "after": code, "path": payload.get("path", "file")}))
+    return result
+
+
+JOB_HANDLERS = {
+    "hash": job_hash,
+    "code_blocks": job_code_blocks,
+    "format": job_format,
+    "diff": job_diff,
+    "postprocess": job_postprocess
+}
+
+
+def run_job(job):
+    started = time.perf_counter()
+    try:
+        result = {"kind": job["kind"], "ok": True, "result": JOB_HANDLERS[job["kind"]](job["payload"])}
+    except Exception as e:
+        result = {"kind": job.get("kind"), "ok": False, "error": f"{type(e).__name__}: {e}"}
+    result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 3)
+    return result
+
+
+def run_chunk(jobs):
+    """One round trip per chunk instead of per job keeps IPC overhead off small jobs"""
+    return [run_job(job) for job in jobs]
+
+
+def worker_init():
+    # Ctrl-C goes to the parent, which shuts the pool down in order
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+class WorkerPool:
+    """ProcessPoolExecutor with chunked dispatch and workers recycled after `max_tasks_per_worker` chunks
+
+    Recycling swaps in a fresh executor once the current one has run
+    workers * max_tasks_per_worker chunks; the old one drains and exits.
+    (ProcessPoolExecutor's own max_tasks_per_child deadlocks on Python 3.11.)
+    """
+
+    def __init__(self, workers=None, max_tasks_per_worker=None):
+        self.workers = workers or int(os.getenv('ANDERS_WORKERS', '0')) or os.cpu_count() or 1
+        self.max_tasks_per_worker = max_tasks_per_worker or int(os.getenv('ANDERS_WORKER_MAX_TASKS', '200'))
+        self.executor = None
+        self.executor_chunks = 0
+        self.lock = threading.Lock()
+        self.jobs_done = 0
+        self.chunks_done = 0
+        self.recycled = 0
+
+    def start(self, chunks=0):
+        """Executor to submit `chunks` more chunks to, recycling the current one if it is used up"""
+        with self.lock:
+            if self.executor is not None and self.executor_chunks >= self.workers * self.max_tasks_per_worker:
+                self.executor.shutdown(wait=False)
+                self.executor = None
+                self.recycled += 1
+            if self.executor is None:
+                # forkserver children start clean instead of inheriting the parent's threads and pools
+                self.executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("forkserver"),
+                    initializer=worker_init
+                )
+                self.executor_chunks = 0
+            self.executor_chunks += chunks
+            return self.executor
+
+    def chunk_size(self, count):
+        return max(1, math.ceil(count / (self.workers * 4)))
+
+    def submit(self, job):
+        return self.start(1).submit(run_job, job)
+
+    def map(self, jobs, chunk_size=None):
+        """Run jobs in chunks across the pool; results come back in input order"""
+        jobs = list(jobs)
+        if not jobs:
+            return []
+        size = chunk_size or self.chunk_size(len(jobs))
+        chunks = [jobs[i:i + size] for i in range(0, len(jobs), size)]
+        executor = self.start(len(chunks))
+        futures = [executor.submit(run_chunk, chunk) for chunk in chunks]
+        results = []
+        try:
+            for future in futures:
+                results.extend(future.result())
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+        self.jobs_done += len(jobs)
+        self.chunks_done += len(futures)
+        return results
+
+    def shutdown(self, wait=True, cancel_pending=False):
+        """Let running chunks finish; with cancel_pending, queued chunks are dropped"""
+        with self.lock:
+            if self.executor is not None:
+                self.executor.shutdown(wait=wait, cancel_futures=cancel_pending)
+                self.executor = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown(cancel_pending=exc_type is not None)
+
+    def stats(self):
+        return {"workers": self.workers, "max_tasks_per_worker": self.max_tasks_per_worker,
+                "jobs": self.jobs_done, "chunks": self.chunks_done, "recycled": self.recycled,
+                "running": self.executor is not None}
+
+
+_shared_pool = None
+_shared_lock = threading.Lock()
+
+
+def get_worker_pool():
+    global _shared_pool
+    with _shared_lock:
+        if _shared_pool is None:
+            _shared_pool = WorkerPool()
+            atexit.register(_shared_pool.shutdown)
+        return _shared_pool
+
+
+def postprocess_outputs(outputs, before=None, paths=None, pool=None):
+    """Post-process many code_generation replies in parallel; error replies are passed through"""
+    jobs, indexes = [], []
+    for index, text in enumerate(outputs):
+        if text is None or text.startswith("❌"):
+            continue
+        payload = {"text": text}
+        if before is not None:
+            payload["before"] = before[index]
+        if paths is not None:
+            payload["path"] = paths[index]
+        jobs.append({"kind": "postprocess", "payload": payload})
+        indexes.append(index)
+    results = [{"ok": False, "error": text} for text in outputs]
+    for index, result in zip(indexes, (pool or get_worker_pool()).map(jobs)):
+        results[index] = result
+    return results
+
+
+def synthetic_reply(seed, functions=100, changed_every=10):
+    """A code_generation-shaped reply: prose plus a fenced TypeScript module"""
+    body = []
+    for i in range(functions):
+        step = "reverse" if i % changed_every else "sort"
+        body.append(f"\texport function handler_{seed}_{i}(input: string): string {{  ")
+        body.append(f"\t\treturn input.split('').{step}().join('') + '{seed * i}';")
+        body.append("\t}")
+    return "Here is the module:\n\n```ts\n" + "\n".join(body) + "\n```\n\nLet me know if you need changes.\n"
+
+
+def benchmark(jobs=200, worker_counts=None):
+    """Throughput of the postprocess job in-process and at increasing worker counts"""
+    replies = [synthetic_reply(seed) for seed in range(jobs)]
+    # The previous version of each file differs in one function out of ten
+    before = [job_format({"text": "\n".join(extract_code_blocks(reply))}).replace("sort()", "reverse()")
+              for reply in replies]
+    payloads = [{"kind": "postprocess", "payload": {"text": r, "before": b}} for r, b in zip(replies, before)]
+
+    started = time.perf_counter()
+    run_chunk(payloads)
+    serial = jobs / (time.perf_counter() - started)
+    results = {"jobs": jobs, "cpu_count": os.cpu_count(), "in_process_jobs_per_sec": round(serial, 1), "pool": []}
+
+    for workers in worker_counts or sorted({1, 2, 4, os.cpu_count() or 1}):
+        with WorkerPool(workers) as pool:
+            pool.map(payloads[:workers])  # start every worker before timing
+            started = time.perf_counter()
+            pool.map(payloads)
+            rate = jobs / (time.perf_counter() - started)
+        results["pool"].append({"workers": workers, "jobs_per_sec": round(rate, 1),
+                                "speedup": round(rate / serial, 2)})
+    return results
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "bench"
+    if command == "bench":
+        count = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+        print("⚙️ Worker Pool Benchmark:")
+        print(json.dumps(benchmark(count), indent=2))
+    elif command == "postprocess" and len(sys.argv) > 2:
+        texts = [Path(path).read_text() if Path(path).is_file() else f"❌ {path}: not a file" for path in sys.argv[2:]]
+        with WorkerPool() as pool:
+            for path, result in zip(sys.argv[2:], postprocess_outputs(texts, paths=sys.argv[2:], pool=pool)):
+                status = "✅" if result["ok"] else "❌"
+                detail = result["result"]["sha256"][:12] if result["ok"] else result["error"].removeprefix("❌ ")
+                print(f"{status} {path}: {detail}")
+    else:
+        print(f"❌ Unknown command: {command}")
+        print("Usage: python3 worker_pool.py [bench [jobs]|postprocess <file>...]")
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Workspace Manager for Anders
+Allocates an isolated git worktree per agent job from a pre-warmed pool
+"""
+
+import fcntl
+import itertools
+import json
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+
+def default_project_root():
+    return Path(os.getenv('ANDERS_PROJECT_ROOT', "/home/ubuntu/simon-command-center"))
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def lock_path(path):
+    """Lock file beside a pooled worktree (outside it, so `git clean` and checkouts never touch it)"""
+    path = Path(path)
+    return path.parent / f".{path.name}.lock"
+
+
+def try_lock(path):
+    """Non-blocking exclusive flock on `path`, created if missing; an open fd, or None if another process holds it"""
+    while True:
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return None
+        try:
+            # Unlinked by gc between our open and flock: that inode protects nothing, lock the new file
+            if os.stat(path).st_ino == os.fstat(fd).st_ino:
+                return fd
+        except FileNotFoundError:
+            pass
+        os.close(fd)
+
+
+class Workspace:
+    def __init__(self, path, job=None, lock_fd=None):
+        self.path = Path(path)
+        self.job = job
+        self.acquired_at = None
+        # Held for as long as this process owns the worktree, idle or in use; the OS drops it if we die
+        self.lock_fd = lock_fd
+
+    def __repr__(self):
+        return f"Workspace({self.path}, job={self.job})"
+
+
+class WorkspaceManager:
+    _ids = itertools.count(1)
+
+    def __init__(self, repo_root=None, pool_dir=None, pool_size=None):
+        self.repo_root = Path(repo_root or default_project_root())
+        self.pool_dir = Path(pool_dir or os.getenv(
+            'ANDERS_WORKTREE_DIR', self.repo_root.parent / f".{self.repo_root.name}-worktrees"
+        ))
+        self.pool_size = pool_size if pool_size is not None else int(os.getenv('ANDERS_WORKTREE_POOL', '2'))
+        self.lock = threading.Lock()
+        self.idle = []
+        self.in_use = {}
+        self.allocation_seconds = []
+        self.adopt_existing()
+
+    def git(self, *args, cwd=None):
+        return subprocess.run(
+            ["git", *args],
+            cwd=cwd or self.repo_root,
+            capture_output=True,
+            text=True,
+            check=True
+        ).stdout
+
+    def adopt_existing(self):
+        """Pick up worktrees left in the pool directory by processes that have exited
+
+        A worktree whose lock another live process holds is left alone.
+        """
+        if not self.pool_dir.is_dir():
+            return
+        registered = self.registered_worktrees()
+        for entry in sorted(self.pool_dir.iterdir()):
+            if entry.is_dir() and str(entry.resolve()) in registered:
+                fd = try_lock(lock_path(entry))
+                if fd is not None:
+                    self.idle.append(Workspace(entry, lock_fd=fd))
+
+    def registered_worktrees(self):
+        output = self.git("worktree", "list", "--porcelain")
+        return {line[len("worktree "):] for line in output.splitlines() if line.startswith("worktree ")}
+
+    def create_worktree(self, ref="HEAD"):
+        self.pool_dir.mkdir(parents=True, exist_ok=True)
+        path = self.pool_dir / f"wt-{os.getpid()}-{next(self._ids)}"
+        # Locked before the directory exists, so gc never mistakes a half-added worktree for an orphan
+        fd = try_lock(lock_path(path))
+        if fd is None:
+            raise RuntimeError(f"Worktree lock {lock_path(path)} is held by another process")
+        try:
+            self.git("worktree", "add", "--detach", str(path), ref)
+        except BaseException:
+            self.unlock(path, fd)
+            raise
+        return Workspace(path, lock_fd=fd)
+
+    def reset_worktree(self, workspace, ref="HEAD"):
+        """Bring a recycled worktree back to `ref` with no local changes"""
+        commit = self.git("rev-parse", ref).strip()
+        self.git("checkout", "--detach", "--force", commit, cwd=workspace.path)
+        self.git("clean", "-fdq", cwd=workspace.path)
+
+    def prewarm(self, count=None):
+        """Create idle worktrees until the pool holds `count` of them"""
+        count = self.pool_size if count is None else count
+        created = 0
+        while True:
+            with self.lock:
+                if len(self.idle) >= count:
+                    break
+            workspace = self.create_worktree()
+            with self.lock:
+                self.idle.append(workspace)
+            created += 1
+        return created
+
+    def acquire(self, job=None, ref="HEAD"):
+        """Hand out an isolated worktree checked out at `ref`"""
+        started = time.perf_counter()
+        with self.lock:
+            workspace = self.idle.pop() if self.idle else None
+        if workspace is None:
+            workspace = self.create_worktree(ref)
+        else:
+            try:
+                self.reset_worktree(workspace, ref)
+            except subprocess.CalledProcessError:
+                self.remove(workspace)
+                workspace = self.create_worktree(ref)
+
+        workspace.job = job
+        workspace.acquired_at = time.time()
+        with self.lock:
+            self.in_use[str(workspace.path)] = workspace
+            self.allocation_seconds.append(time.perf_counter() - started)
+        return workspace
+
+    def release(self, workspace):
+        """Return a worktree to the pool, or remove it when the pool is full"""
+        with self.lock:
+            self.in_use.pop(str(workspace.path), None)
+            keep = len(self.idle) < self.pool_size
+            if keep:
+                workspace.job = None
+                self.idle.append(workspace)
+        if not keep:
+            self.remove(workspace)
+
+    def capture(self, workspace, branch, message):
+        """Commit a job's changes in its worktree onto `branch`; returns the commit or None"""
+        if not self.git("status", "--porcelain", cwd=workspace.path).strip():
+            return None
+        self.git("add", "-A", cwd=workspace.path)
+        self.git("commit", "-q", "-m", message, cwd=workspace.path)
+        commit = self.git("rev-parse", "HEAD", cwd=workspace.path).strip()
+        self.git("branch", "-f", branch, commit)
+        return commit
+
+    @contextmanager
+    def workspace(self, job=None, ref="HEAD"):
+        workspace = self.acquire(job, ref)
+        try:
+            yield workspace
+        finally:
+            self.release(workspace)
+
+    def remove(self, workspace):
+        try:
+            self.git("worktree", "remove", "--force", str(workspace.path))
+        except subprocess.CalledProcessError:
+            shutil.rmtree(workspace.path, ignore_errors=True)
+        self.unlock(workspace.path, workspace.lock_fd)
+        workspace.lock_fd = None
+
+    def unlock(self, path, fd):
+        if fd is None:
+            return
+        # Unlink while still holding the lock; try_lock notices the swap and locks the new file
+        lock_path(path).unlink(missing_ok=True)
+        os.close(fd)
+
+    def gc(self):
+        """Trim idle worktrees beyond the pool size and prune stale registrations"""
+        with self.lock:
+            surplus = self.idle[self.pool_size:]
+            self.idle = self.idle[:self.pool_size]
+        for workspace in surplus:
+            self.remove(workspace)
+
+        # Directories git no longer tracks (e.g. a crashed job's half-created worktree). One still locked
+        # is being created right now by another process, so only unlocked ones are removed.
+        self.git("worktree", "prune")
+        registered = self.registered_worktrees()
+        orphans = 0
+        if self.pool_dir.is_dir():
+            for entry in self.pool_dir.iterdir():
+                if not entry.is_dir() or str(entry.resolve()) in registered:
+                    continue
+                fd = try_lock(lock_path(entry))
+                if fd is None:
+                    continue
+                if str(entry.resolve()) not in self.registered_worktrees():
+                    shutil.rmtree(entry, ignore_errors=True)
+                    orphans += 1
+                self.unlock(entry, fd)
+            # Lock files of worktrees whose creation never got as far as a directory
+            for entry in self.pool_dir.glob(".wt-*.lock"):
+                worktree = entry.with_name(entry.name[1:-len(".lock")])
+                fd = None if worktree.exists() else try_lock(entry)
+                if fd is not None:
+                    self.unlock(worktree, fd)
+        return {"removed_idle": len(surplus), "removed_orphans": orphans}
+
+    def stats(self):
+        with self.lock:
+            samples = list(self.allocation_seconds)
+            idle = len(self.idle)
+            in_use = len(self.in_use)
+        return {
+            "repo_root": str(self.repo_root),
+            "pool_dir": str(self.pool_dir),
+            "pool_size": self.pool_size,
+            "idle": idle,
+            "in_use": in_use,
+            "occupancy": round(in_use / max(idle + in_use, 1), 3),
+            "allocations": len(samples),
+            "allocation_p50_ms": round(percentile(samples, 0.5) * 1000, 2) if samples else None,
+            "allocation_p95_ms": round(percentile(samples, 0.95) * 1000, 2) if samples else None
+        }
+
+    def destroy(self):
+        """Remove every worktree this manager knows about"""
+        with self.lock:
+            workspaces = self.idle + list(self.in_use.values())
+            self.idle = []
+            self.in_use = {}
+        for workspace in workspaces:
+            self.remove(workspace)
+        self.git("worktree", "prune")
+
+
+if __name__ == "__main__":
+    manager = WorkspaceManager()
+    command = sys.argv[1] if len(sys.argv) > 1 else "status"
+
+    if command == "status":
+        print("🌳 Workspace Pool:")
+        print(json.dumps(manager.stats(), indent=2))
+    elif command == "prewarm":
+        count = int(sys.argv[2]) if len(sys.argv) > 2 else None
+        print(f"🔥 Pre-warmed {manager.prewarm(count)} worktrees")
+        print(json.dumps(manager.stats(), indent=2))
+    elif command == "gc":
+        print("🧹 Workspace GC:")
+        print(json.dumps(manager.gc(), indent=2))
+    elif command == "destroy":
+        manager.destroy()
+        print("🧹 All pooled worktrees removed")
+    else:
+        print(f"❌ Unknown command: {command}")
+        print("Available: status, prewarm [n], gc, destroy")